@@ -0,0 +1,66 @@
+"""
+Compares cold (one-off Chromium process) and warm (persistent browser pool) HTML render latency.
+
+Usage: python scripts/benchmark_render.py [iterations] [width] [height]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from utils.browser_pool import BrowserPool
+from utils.image_utils import get_chrome_command
+
+SAMPLE_HTML = """
+<html>
+    <body style="margin: 0; font-family: sans-serif; display: flex; align-items: center; justify-content: center;">
+        <h1>InkyWall render benchmark</h1>
+    </body>
+</html>
+"""
+
+def time_call(func):
+    start = time.perf_counter()
+    func()
+    return (time.perf_counter() - start) * 1000
+
+def cold_render(chrome_cmd, url, dimensions):
+    pool = BrowserPool(chrome_cmd)
+    try:
+        pool.screenshot(url, dimensions)
+    finally:
+        pool.close()
+
+def report(label, timings):
+    timings = sorted(timings)
+    median = timings[len(timings) // 2]
+    print(f"{label:<6} min {timings[0]:8.1f} ms | median {median:8.1f} ms | max {timings[-1]:8.1f} ms")
+
+if __name__ == "__main__":
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    dimensions = (int(sys.argv[2]), int(sys.argv[3])) if len(sys.argv) > 3 else (800, 480)
+
+    chrome_cmd = get_chrome_command(False) or get_chrome_command(True)
+    if not chrome_cmd:
+        sys.exit("No Chrome/Chromium browser found")
+
+    with tempfile.NamedTemporaryFile(suffix=".html", delete=False) as html_file:
+        html_file.write(SAMPLE_HTML.encode("utf-8"))
+    url = f"file://{html_file.name}"
+
+    try:
+        cold = [time_call(lambda: cold_render(chrome_cmd, url, dimensions)) for _ in range(iterations)]
+
+        pool = BrowserPool(chrome_cmd)
+        first = time_call(lambda: pool.screenshot(url, dimensions))
+        warm = [time_call(lambda: pool.screenshot(url, dimensions)) for _ in range(iterations)]
+        pool.close()
+    finally:
+        os.remove(html_file.name)
+
+    print(f"{chrome_cmd} at {dimensions[0]}x{dimensions[1]}, {iterations} iterations")
+    report("cold", cold)
+    print(f"first  {first:8.1f} ms (pool launch + render)")
+    report("warm", warm)
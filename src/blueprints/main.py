@@ -1,8 +1,25 @@
-from flask import Blueprint, request, jsonify, current_app, render_template
+from flask import Blueprint, request, jsonify, current_app, render_template, send_file
+from utils.app_utils import resolve_path
+import os
 
 main_bp = Blueprint("main", __name__)
 
 @main_bp.route('/')
 def main_page():
     device_config = current_app.config['DEVICE_CONFIG']
-    return render_template('inky.html', config=device_config.get_config(), plugins=device_config.get_plugins())
\ No newline at end of file
+    return render_template('inky.html', config=device_config.get_config(), plugins=device_config.get_plugins())
+
+@main_bp.route('/current_image')
+def current_image():
+    device_config = current_app.config['DEVICE_CONFIG']
+    # the first panel unless another is picked with ?panel=<name>
+    panel_configs = device_config.get_panel_configs()
+    panel_name = request.args.get("panel")
+    panel_config = next((config for config in panel_configs if config.panel_name == panel_name), panel_configs[0])
+    image_file = panel_config.current_image_file
+    if not os.path.isfile(image_file):
+        # nothing displayed since boot yet
+        image_file = resolve_path(os.path.join("static", "images", "inkypi.png"))
+    response = send_file(image_file, mimetype="image/png", max_age=0)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
@@ -4,7 +4,7 @@ import json
 from datetime import datetime, timedelta
 import os
 import logging
-from utils.app_utils import resolve_path, handle_request_files
+from utils.app_utils import resolve_path, handle_request_files, remove_unused_uploads
 
 
 logger = logging.getLogger(__name__)
@@ -155,6 +155,7 @@ def delete_playlist(playlist_name):
 
     playlist_manager.delete_playlist(playlist_name)
     device_config.write_config()
+    remove_unused_uploads(playlist_manager)
 
     return jsonify({"success": True, "message": f"Deleted playlist '{playlist_name}'!"})
 
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify, current_app, render_template, send_from_directory
 from plugins.plugin_registry import get_plugin_instance
-from utils.app_utils import resolve_path, handle_request_files
+from utils.app_utils import resolve_path, handle_request_files, remove_unused_uploads
+from utils.image_store import get_image_store
 from refresh_task import ManualRefresh, PlaylistRefresh
 import json
 import os
@@ -61,12 +62,20 @@ def delete_plugin_instance():
         if not playlist:
             return jsonify({"success": False, "message": "Playlist not found"}), 400
 
+        instance = playlist.find_plugin(plugin_id, plugin_instance)
         result = playlist.delete_plugin(plugin_id, plugin_instance)
         if not result:
             return jsonify({"success": False, "message": "Plugin instance not found"}), 400
 
+        # drop the stored images, the device's and each panel's (stored as "<panel>/<image>"),
+        # a blob is removed once no other instance shares it
+        image_path = instance.get_image_path()
+        get_image_store(device_config.plugin_image_dir).remove_matching(
+            lambda name: name == image_path or name.endswith(f"/{image_path}"))
+
         # save changes to device config file
         device_config.write_config()
+        remove_unused_uploads(playlist_manager)
 
     except Exception as e:
         logger.exception("EXCEPTION CAUGHT: " + str(e))
@@ -94,6 +103,7 @@ def update_plugin_instance(instance_name):
 
         plugin_instance.settings = plugin_settings
         device_config.write_config()
+        remove_unused_uploads(playlist_manager)
     except Exception as e:
         return jsonify({"error": f"An error occurred: {str(e)}"}), 500
     return jsonify({"success": True, "message": f"Updated plugin instance {instance_name}."})
@@ -3,6 +3,7 @@ import json
 import logging
 from dotenv import load_dotenv
 from model import PlaylistManager, RefreshInfo
+from utils.scratch import get_scratch_store
 
 logger = logging.getLogger(__name__)
 
@@ -13,17 +14,21 @@ class Config:
     # File paths relative to the script's directory
     config_file = os.path.join(BASE_DIR, "config", "device.json")
 
-    # File path for storing the current image being displayed
-    current_image_file = os.path.join(BASE_DIR, "static", "images", "current_image.png")
-
-    # Directory path for storing plugin instance images
+    # Directory of the content-addressed store for plugin instance images
     plugin_image_dir = os.path.join(BASE_DIR, "static", "images", "plugins")
 
+    # Name of the panel this config describes, None for the device itself
+    panel_name = None
+
     def __init__(self):
+        # File path for storing the current image being displayed, kept in memory-backed scratch
+        # storage, resolved here so importing the module creates no directories
+        self.current_image_file = get_scratch_store().pinned_path("current_image.png")
         self.config = self.read_config()
         self.plugins_list = self.read_plugins_list()
         self.playlist_manager = self.load_playlist_manager()
         self.refresh_info = self.load_refresh_info()
+        self.panel_configs = self.load_panel_configs()
 
     def read_config(self):
         """Reads the device config JSON file and returns it as a dictionary."""
@@ -57,6 +62,8 @@ class Config:
         logger.debug(f"Writing device config to {self.config_file}")
         self.update_value("playlist_config", self.playlist_manager.to_dict())
         self.update_value("refresh_info", self.refresh_info.to_dict())
+        for panel_config in self.panel_configs:
+            panel_config.panel["refresh_info"] = panel_config.refresh_info.to_dict()
         with open(self.config_file, 'w') as outfile:
             json.dump(self.config, outfile, indent=4)
 
@@ -117,3 +124,55 @@ class Config:
     def get_refresh_info(self):
         """Returns the refresh information."""
         return self.refresh_info
+
+    def load_panel_configs(self):
+        """Loads the configs of the panels listed under "panels", for devices driving several displays."""
+        return [PanelConfig(self, panel) for panel in self.get_config("panels", default=[])]
+
+    def get_panel_configs(self):
+        """Returns the config of every panel, or just this config for a single display device."""
+        return self.panel_configs or [self]
+
+class PanelConfig:
+    """
+    Configuration of one panel of a device driving several displays.
+
+    Keys set in the panel's entry of the device config "panels" list, such as display_type,
+    resolution, orientation, image_settings or the playlist it shows, override the device
+    config. Everything else is read from the device config. Each panel keeps its own refresh
+    info and current image.
+    """
+
+    def __init__(self, device_config, panel):
+        self.device_config = device_config
+        self.panel = panel
+        self.panel_name = panel["name"]
+        self.current_image_file = get_scratch_store().pinned_path(f"current_image_{self.panel_name}.png")
+        self.refresh_info = RefreshInfo.from_dict(panel.get("refresh_info", {}))
+
+    def __getattr__(self, name):
+        # plugins, playlists and file locations are shared by all panels
+        return getattr(self.device_config, name)
+
+    def get_config(self, key=None, default={}):
+        """Gets the panel's value of a key, falling back to the device config."""
+        if key is None:
+            return {**self.device_config.get_config(), **self.panel}
+        if key in self.panel:
+            return self.panel[key]
+        return self.device_config.get_config(key, default)
+
+    def get_resolution(self):
+        """Returns the panel resolution as a tuple (width, height)."""
+        width, height = self.get_config("resolution")
+        return (int(width), int(height))
+
+    def update_value(self, key, value, write=False):
+        """Updates a key of the panel, such as the resolution read from its driver."""
+        self.panel[key] = value
+        if write:
+            self.device_config.write_config()
+
+    def get_refresh_info(self):
+        """Returns the refresh information of the panel."""
+        return self.refresh_info
@@ -32,14 +32,58 @@ class AbstractDisplay:
 
     def display_image(self, image, image_settings=[]):
         """
-        Abstract method to display an image on the screen.  Implementations of this
-        method should handle the device specific operations.
+        Displays an image on the screen by packing it into the device framebuffer and
+        pushing that to the display.
 
         Args:
             image (PIL.Image): The image to be displayed.
             image_settings (list, optional): List of settings to modify how the image is displayed.
 
+        Raises:
+            ValueError: If no image is provided.
+        """
+        if not image:
+            raise ValueError("No image provided.")
+        self.show_framebuffer(self.get_framebuffer(image))
+
+    def get_framebuffer(self, image):
+        """
+        Abstract method to pack an image into the bytes the device driver sends to the display.
+
+        Args:
+            image (PIL.Image): The processed image, at the device resolution.
+
+        Returns:
+            bytes: The packed framebuffer.
+
+        Raises:
+            NotImplementedError: If not implemented in a subclass.
+        """
+        raise NotImplementedError("Method 'get_framebuffer(...) must be provided in a subclass.")
+
+    def show_framebuffer(self, framebuffer, regions=None):
+        """
+        Abstract method to push a framebuffer from get_framebuffer(...) to the display.
+
+        Args:
+            framebuffer (bytes): The packed framebuffer.
+            regions (list, optional): Changed (left, top, right, bottom) boxes. Displays that
+                support partial refresh only update these, others ignore them.
+
         Raises:
             NotImplementedError: If not implemented in a subclass.
         """
-        raise NotImplementedError("Method 'display_image(...) must be provided in a subclass.")
+        raise NotImplementedError("Method 'show_framebuffer(...) must be provided in a subclass.")
+
+    def get_palette(self):
+        """
+        Returns the colors the display can show as a list of (r, g, b) tuples, in the order of
+        the palette indices its driver expects, or None if images should be sent unquantized.
+        """
+        return None
+
+    def supports_partial_refresh(self):
+        """
+        Returns True if show_framebuffer(...) can update regions of the screen without a full refresh.
+        """
+        return False
@@ -0,0 +1,222 @@
+import glob
+import json
+import logging
+import os
+import shutil
+import socket
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEVICE_CONFIG_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "config", "device.json")
+# bumped when the splash artwork changes so cached framebuffers are rebuilt
+SPLASH_VERSION = 1
+# how long to wait for a network address before drawing the details without one
+ADDRESS_TIMEOUT = 120
+ADDRESS_RETRY_INTERVAL = 2
+
+class BootSplash:
+    """
+    Paints the startup splash while the rest of the app is still importing.
+
+    inkywall.py starts it on every boot before importing Flask, the blueprints and the
+    plugins. Its thread imports only the config and the panels' display drivers, and pushes
+    the splash framebuffer cached on an earlier boot straight to each driver. The splash is
+    only rendered, processed and packed, with the full display pipeline, when nothing is
+    cached for the panel's display settings.
+
+    The refresh task joins the splash before its first refresh, so a plugin frame is never
+    drawn over by it. On a normal boot the panels then get their plugin back right away.
+
+    On the first boot after install (the "startup" flag) the splash stays up instead and
+    show_details() waits for a network address off the main thread, then redraws the panels
+    still showing the splash with the host name and IP, through their display workers.
+
+    wait() hands the config and display drivers to the app, so the drivers are only
+    initialized once.
+
+    Args:
+        details (bool): The startup flag is set, the host name and IP are drawn once known.
+    """
+
+    def __init__(self, details=False):
+        self.started = time.perf_counter()
+        self.details = details
+        self.ready = threading.Event()
+        self.device_config = None
+        self.displays = None
+        # framebuffer hash and fingerprint of the splash on each panel
+        self.frames = {}
+        self.threads = []
+
+    def start(self):
+        threading.Thread(target=self._run, name="boot-splash", daemon=True).start()
+        return self
+
+    def wait(self):
+        """
+        Blocks until the displays are initialized. Returns the device config and the display
+        drivers by panel name, or (None, None) if they could not be created.
+        """
+        self.ready.wait()
+        return self.device_config, self.displays
+
+    def join(self, display_manager):
+        """
+        Waits until the splash is on the panels and records it as their current frame.
+
+        Returns:
+            list: The names of the panels showing the splash.
+        """
+        from utils.fingerprint import ImageFingerprint
+
+        for thread in self.threads:
+            thread.join()
+
+        panels = []
+        for panel in display_manager.panels:
+            if panel.name not in self.frames:
+                continue
+            frame_hash, fingerprint = self.frames[panel.name]
+            try:
+                fingerprint = ImageFingerprint.from_dict(fingerprint)
+            except (ValueError, KeyError, TypeError):
+                # the next frame is a full refresh
+                fingerprint = None
+            with panel.lock:
+                panel.last_framebuffer_hash = frame_hash
+                panel.last_fingerprint = fingerprint
+                panel.partial_count = 0
+            panels.append(panel.name)
+        return panels
+
+    def _run(self):
+        try:
+            from config import Config
+            from display.drivers import create_displays
+            self.device_config = Config()
+            self.displays = create_displays(self.device_config)
+
+            # a slow panel does not hold up the others
+            for panel_config in self.device_config.get_panel_configs():
+                name = panel_config.panel_name or "default"
+                thread = threading.Thread(target=self._show_splash, args=(name, panel_config, self.displays[name]),
+                                          name=f"boot-splash-{name}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        except Exception:
+            logger.exception("Failed to initialize the displays for the boot splash")
+            self.device_config = self.displays = None
+        finally:
+            self.ready.set()
+
+    def _show_splash(self, name, panel_config, display):
+        from display.framebuffer_cache import framebuffer_hash, get_settings_key
+        from utils.app_utils import get_cache_dir
+
+        try:
+            cache_dir = get_cache_dir("splash")
+            cache_path = os.path.join(cache_dir, f"{name}-v{SPLASH_VERSION}-{get_settings_key(panel_config, display)}")
+            frame = self._load_frame(cache_path)
+            if frame:
+                framebuffer, fingerprint = frame
+            else:
+                framebuffer, fingerprint = self._render_frame(cache_dir, cache_path, name, panel_config, display)
+            shutil.copyfile(f"{cache_path}.png", panel_config.current_image_file)
+
+            logger.info(f"Sending boot splash to panel {name} {time.perf_counter() - self.started:.2f} s after start")
+            display.show_framebuffer(framebuffer, None)
+            self.frames[name] = (framebuffer_hash(framebuffer), fingerprint)
+            logger.info(f"Boot splash shown on panel {name} {time.perf_counter() - self.started:.1f} s after start")
+        except Exception:
+            logger.exception(f"Failed to show the boot splash on panel {name}")
+
+    def _load_frame(self, cache_path):
+        """Returns the cached framebuffer and fingerprint dictionary, or None if not cached."""
+        try:
+            with open(f"{cache_path}.json") as f:
+                fingerprint = json.load(f)
+            with open(f"{cache_path}.bin", "rb") as f:
+                framebuffer = f.read()
+        except (OSError, ValueError):
+            return None
+        if not os.path.isfile(f"{cache_path}.png"):
+            return None
+        return framebuffer, fingerprint
+
+    def _render_frame(self, cache_dir, cache_path, name, panel_config, display):
+        # only without a cached splash, this loads the full display pipeline
+        from display.display_manager import Panel
+        from utils.app_utils import generate_startup_image
+
+        logger.info(f"No cached boot splash for panel {name}, rendering it")
+        image = generate_startup_image(panel_config.get_resolution(), details=False)
+        framebuffer, fingerprint = Panel(panel_config, display).prepare_frame(image)
+        self._save_frame(cache_dir, cache_path, name, image, framebuffer, fingerprint)
+        return framebuffer, fingerprint.to_dict()
+
+    def _save_frame(self, cache_dir, cache_path, panel_name, image, framebuffer, fingerprint):
+        os.makedirs(cache_dir, exist_ok=True)
+        # drop splashes packed for the panel's previous settings
+        for path in glob.glob(os.path.join(cache_dir, f"{panel_name}-*")):
+            os.remove(path)
+
+        image.save(f"{cache_path}.png")
+        with open(f"{cache_path}.bin", "wb") as f:
+            f.write(framebuffer)
+        # written last, a cache entry is only used once its fingerprint exists
+        with open(f"{cache_path}.json", "w") as f:
+            json.dump(fingerprint.to_dict(), f)
+
+    def show_details(self, refresh_task):
+        """Redraws the splash with the host name and IP once the network is up, off the calling thread."""
+        if self.displays is not None:
+            threading.Thread(target=self._show_details, args=(refresh_task,), name="boot-splash-details", daemon=True).start()
+
+    def _show_details(self, refresh_task):
+        from display.display_worker import DisplayJob
+        from utils.app_utils import generate_startup_image
+
+        hostname = socket.gethostname()
+        ip = self._wait_for_address()
+        for thread in self.threads:
+            thread.join()
+
+        for panel in refresh_task.display_manager.panels:
+            # the refresh task may have drawn a plugin over the splash already
+            if panel.name not in self.frames or panel.last_framebuffer_hash != self.frames[panel.name][0]:
+                continue
+            try:
+                image = generate_startup_image(panel.device_config.get_resolution(), hostname, ip)
+                refresh_task.display_workers[panel.name].submit(DisplayJob(image))
+            except Exception:
+                logger.exception(f"Failed to draw the startup details on panel {panel.name}")
+
+    def _wait_for_address(self):
+        from utils.app_utils import get_ip_address
+
+        deadline = time.monotonic() + ADDRESS_TIMEOUT
+        while True:
+            try:
+                return get_ip_address()
+            except OSError:
+                if time.monotonic() >= deadline:
+                    logger.warning(f"No network address after {ADDRESS_TIMEOUT} s, showing the host name only")
+                    return None
+                time.sleep(ADDRESS_RETRY_INTERVAL)
+
+def start(config_file=DEVICE_CONFIG_FILE):
+    """
+    Starts painting the boot splash. Only reads the config file, so it is cheap to call
+    before the app is imported.
+
+    Returns:
+        BootSplash: The running splash, or None if the device config cannot be read.
+    """
+    try:
+        with open(config_file) as f:
+            startup = json.load(f).get("startup") is True
+    except (OSError, ValueError):
+        return None
+    return BootSplash(details=startup).start()
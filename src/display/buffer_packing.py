@@ -0,0 +1,140 @@
+import logging
+
+import numpy as np
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+SUPPORTED_BITS = (1, 2, 4, 8)
+
+class BufferPacker:
+    """
+    Packs palettized images into a Waveshare driver's buffer layout with NumPy.
+
+    The drivers' getbuffer methods map and pack pixels in Python loops, which takes seconds
+    for the larger color panels. The packer maps palette indices to the driver's pixel codes
+    with a lookup table and packs them most significant bits first, one, two, four or eight
+    bits per pixel. Single bit rows are padded to whole bytes like Pillow's "1" mode, with
+    the padding bits the driver sets.
+
+    Use from_driver() to learn the codes and bit depth from the driver itself. The layout
+    is checked once against the driver's getbuffer, so an unusual driver is left to its
+    own implementation rather than being sent a wrong buffer. to_dict() and from_dict()
+    store a learned layout, since the check runs the driver's slow getbuffer.
+
+    Attributes:
+        size (tuple): (width, height) of the driver's buffer.
+        palette (list): (r, g, b) colors, in the order of the image palette indices.
+        codes (numpy.ndarray): Driver pixel code of every palette index, uint8 of length 256.
+        bits (int): Bits per pixel of the driver's buffer.
+        row_padding (int): Bits set in the padding at the end of each single bit row.
+    """
+
+    def __init__(self, size, palette, codes, bits, row_padding=0):
+        self.size = size
+        self.palette = [tuple(color) for color in palette]
+        self.flat_palette = [channel for color in self.palette for channel in color]
+        self.codes = np.zeros(256, dtype=np.uint8)
+        self.codes[:len(codes)] = codes
+        self.bits = bits
+        self.row_padding = row_padding
+
+    def to_dict(self):
+        return {
+            "size": list(self.size),
+            "palette": [list(color) for color in self.palette],
+            "codes": self.codes.tolist(),
+            "bits": self.bits,
+            "row_padding": self.row_padding
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(tuple(data["size"]), data["palette"], data["codes"], data["bits"], data.get("row_padding", 0))
+
+    @classmethod
+    def from_driver(cls, epd, palette):
+        """
+        Returns a packer matching the driver's getbuffer for the palette, or None if its
+        layout is not recognized.
+        """
+        size = (int(epd.width), int(epd.height))
+        pattern = cls._make_pattern(size, len(palette))
+        pattern_image = Image.fromarray(pattern, mode="P")
+        pattern_image.putpalette([channel for color in palette for channel in color])
+
+        try:
+            expected = bytes(epd.getbuffer(pattern_image.convert("RGB")))
+        except Exception as e:
+            logger.warning(f"Driver getbuffer failed on the packing check: {e}")
+            return None
+
+        bits = cls._get_bits(len(expected), size)
+        if bits is None:
+            return None
+
+        # the first row holds every palette index in order, read their codes back
+        mask = (1 << bits) - 1
+        codes = []
+        for index in range(len(palette)):
+            bit = index * bits
+            codes.append((expected[bit // 8] >> (8 - bits - bit % 8)) & mask)
+
+        # drivers that invert single bit buffers also invert the row padding
+        row_padding = 0
+        if bits == 1 and size[0] % 8:
+            row_padding = expected[-(-size[0] // 8) - 1] & ((1 << (8 - size[0] % 8)) - 1)
+
+        packer = cls(size, palette, codes, bits, row_padding)
+        if packer.pack_indices(pattern) != expected:
+            return None
+        return packer
+
+    @staticmethod
+    def _make_pattern(size, colors):
+        width, height = size
+        rng = np.random.default_rng(0)
+        pattern = rng.integers(0, colors, (height, width), dtype=np.uint8)
+        pattern[0, :colors] = np.arange(colors)
+        return pattern
+
+    @staticmethod
+    def _get_bits(length, size):
+        width, height = size
+        for bits in SUPPORTED_BITS:
+            if bits == 1:
+                expected_length = -(-width // 8) * height
+            elif width * bits % 8:
+                continue
+            else:
+                expected_length = width * height * bits // 8
+            if length == expected_length:
+                return bits
+        return None
+
+    def can_pack(self, image):
+        """Returns whether the image is palettized with this packer's palette at the buffer size."""
+        return image.mode == "P" and image.size == self.size and \
+            image.getpalette()[:len(self.flat_palette)] == self.flat_palette
+
+    def pack(self, image):
+        """Returns the driver buffer for a "P" image with this packer's palette."""
+        return self.pack_indices(np.asarray(image))
+
+    def pack_indices(self, indices):
+        """Returns the driver buffer for a (height, width) uint8 array of palette indices."""
+        codes = self.codes[indices]
+        if self.bits == 1:
+            packed = np.packbits(codes, axis=1)
+            if self.row_padding:
+                packed[:, -1] |= self.row_padding
+            return packed.tobytes()
+        if self.bits == 8:
+            return codes.tobytes()
+
+        per_byte = 8 // self.bits
+        groups = codes.reshape(-1, per_byte)
+        packed = groups[:, 0] << (8 - self.bits)
+        for position in range(1, per_byte):
+            packed |= groups[:, position] << (8 - self.bits * (position + 1))
+        return packed.tobytes()
@@ -1,79 +1,249 @@
-import fnmatch
-import json
 import logging
+import threading
+import time
 
-from utils.image_utils import resize_image, change_orientation, apply_image_enhancement
-from display.local_display import LocalDisplay
+from utils.fingerprint import compute_fingerprint, merge_boxes
+from utils.post_processing import PostProcessor
+from utils.quantize import DEFAULT_DITHER_MODE
+from display.drivers import create_display, create_displays
+from display.framebuffer_cache import FramebufferCache, framebuffer_hash, get_settings_key
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_FULL_REFRESH_INTERVAL = 10
+# above this fraction of changed pixels a partial update has no advantage over a full refresh
+MAX_PARTIAL_AREA = 0.5
+
 class DisplayManager:
 
-    """Manages the display and rendering of images."""
+    """
+    Manages the displays of the device and the rendering of images to them.
+
+    A device drives a single display, or one per entry of the "panels" device config. Each
+    panel has its own display driver, resolution, orientation and image settings, and the
+    refresh task draws to each on its own worker so a slow panel does not hold up the others.
+    """
 
-    def __init__(self, device_config):
+    def __init__(self, device_config, displays=None):
 
         """
-        Initializes the display manager and selects the correct display type
-        based on the configuration.
+        Initializes a panel for the device or for each configured panel.
 
         Args:
             device_config (object): Configuration object containing display settings.
+            displays (dict, optional): Display drivers by panel name already initialized by
+                the boot splash, see drivers.create_displays.
+
+        Raises:
+            ValueError: If an unsupported display type is specified, or more than one panel
+                is a Waveshare display.
+        """
+
+        self.device_config = device_config
+        displays = displays if displays is not None else create_displays(device_config)
+        self.panels = [
+            Panel(panel_config, displays[panel_config.panel_name or "default"])
+            for panel_config in device_config.get_panel_configs()
+        ]
+        if len(self.panels) > 1:
+            logger.info(f"Driving {len(self.panels)} panels: {', '.join(panel.name for panel in self.panels)}")
+
+    def get_panel(self, name=None):
+        """Returns the panel with the name, or the first panel if no name is given."""
+        if name is None:
+            return self.panels[0]
+        panel = next((panel for panel in self.panels if panel.name == name), None)
+        if panel is None:
+            raise ValueError(f"No panel named '{name}'")
+        return panel
+
+    def display_image(self, image, image_settings=[], device_ready=False, cache_id=None, fingerprint=None, panel=None):
+
+        """
+        Renders an image to a panel, see Panel.display_image.
+
+        Args:
+            panel (str, optional): Name of the panel, the first panel if not given.
+        """
+
+        self.get_panel(panel).display_image(image, image_settings, device_ready, cache_id, fingerprint)
+
+class Panel:
+
+    """Manages one display and the rendering of images to it."""
+
+    def __init__(self, device_config, display=None):
+
+        """
+        Selects the correct display type based on the configuration.
+
+        Args:
+            device_config (object): Configuration of the device or of one of its panels.
+            display (AbstractDisplay, optional): The panel's display driver if already initialized.
 
         Raises:
             ValueError: If an unsupported display type is specified.
         """
 
         self.device_config = device_config
+        self.name = device_config.panel_name or "default"
+        self.post_processor = PostProcessor()
+        self.timings = {}
+        # the startup image and the display worker may draw concurrently
+        self.lock = threading.Lock()
 
-        display_type = device_config.get_config("display_type", default="inky")
-
-        if display_type == "local":
-            self.display = LocalDisplay(device_config)
-        elif display_type == "inky":
-            try:
-                from display.inky_display import InkyDisplay
-                self.display = InkyDisplay(device_config)
-            except ImportError as e:
-                logger.error(f"Cannot import InkyDisplay: {e}")
-                logger.info("Falling back to LocalDisplay for development")
-                self.display = LocalDisplay(device_config)
-        elif fnmatch.fnmatch(display_type, "epd*in*"):
-            try:
-                from display.waveshare_display import WaveshareDisplay
-                self.display = WaveshareDisplay(device_config)
-            except ImportError as e:
-                logger.error(f"Cannot import WaveshareDisplay: {e}")
-                logger.info("Falling back to LocalDisplay for development")
-                self.display = LocalDisplay(device_config)
-        else:
-            logger.warning(f"Unsupported display type '{display_type}', using LocalDisplay")
-            self.display = LocalDisplay(device_config)
+        # fingerprint of the last frame sent to the display and partial updates since the last full refresh
+        self.last_fingerprint = None
+        self.partial_count = 0
+        self.framebuffer_cache = FramebufferCache()
+        refresh_info = device_config.get_refresh_info()
+        self.last_framebuffer_hash = refresh_info.framebuffer_hash if refresh_info else None
 
-    def display_image(self, image, image_settings=[]):
+        self.display = display or create_display(device_config)
+
+    def display_image(self, image, image_settings=[], device_ready=False, cache_id=None, fingerprint=None):
 
         """
         Delegates image rendering to the appropriate display instance.
 
+        The image is processed and packed into the device framebuffer, which is only sent to
+        the display if it differs from the framebuffer already shown.
+
         Args:
             image (PIL.Image): The image to be displayed.
             image_settings (list, optional): List of settings to modify image rendering.
+            device_ready (bool, optional): The image was rendered at the orientation adjusted
+                device resolution, so only a lossless transpose is needed.
+            cache_id (str, optional): Identifies the plugin instance the image belongs to. The
+                packed framebuffer is cached under it and reused while the image is unchanged.
+            fingerprint (ImageFingerprint, optional): Fingerprint of the image if already computed.
 
         Raises:
             ValueError: If no valid display instance is found.
         """
 
+        with self.lock:
+            self._display_image(image, image_settings, device_ready, cache_id, fingerprint)
+
+    def _display_image(self, image, image_settings, device_ready, cache_id, fingerprint):
         if not hasattr(self, "display"):
             raise ValueError("No valid display instance initialized.")
 
-        # Save the image
-        logger.info(f"Saving image to {self.device_config.current_image_file}")
-        image.save(self.device_config.current_image_file)
+        # Save the image, fast compression since it lives in scratch storage
+        start = time.perf_counter()
+        image.save(self.device_config.current_image_file, compress_level=1)
+        self.timings = {"save": round((time.perf_counter() - start) * 1000, 2)}
+
+        cached = None
+        if cache_id:
+            fingerprint = fingerprint or compute_fingerprint(image)
+            cache_key = f"{fingerprint.digest}:{self.get_settings_key(image_settings, device_ready)}"
+            cached = self.framebuffer_cache.get(cache_id, cache_key)
+
+        if cached:
+            logger.info(f"Using cached framebuffer for {cache_id}")
+            framebuffer, frame_fingerprint = cached.framebuffer, cached.fingerprint
+        else:
+            framebuffer, frame_fingerprint = self._prepare_frame(image, image_settings, device_ready)
+            if cache_id:
+                self.framebuffer_cache.put(cache_id, cache_key, framebuffer, frame_fingerprint)
+        logger.info(f"Post-processing timings (ms): {self.timings}")
+
+        self._show_frame(framebuffer, frame_fingerprint)
+
+    def prepare_frame(self, image, image_settings=[], device_ready=False):
+
+        """
+        Processes and packs an image for the display without showing it.
+
+        Returns:
+            tuple: The packed framebuffer and the ImageFingerprint of the processed frame.
+        """
+
+        with self.lock:
+            if not hasattr(self, "display"):
+                raise ValueError("No valid display instance initialized.")
+            self.timings = {}
+            return self._prepare_frame(image, image_settings, device_ready)
 
-        # Resize and adjust orientation
-        image = change_orientation(image, self.device_config.get_config("orientation"), self.device_config.get_config("inverted_image"))
-        image = resize_image(image, self.device_config.get_resolution(), image_settings)
-        image = apply_image_enhancement(image, self.device_config.get_config("image_settings"))
+    def show_frame(self, framebuffer, fingerprint):
+
+        """
+        Sends a framebuffer packed by prepare_frame to the display, unless it is already shown.
+
+        Returns:
+            str: Hash of the framebuffer on the display.
+        """
+
+        with self.lock:
+            self._show_frame(framebuffer, fingerprint)
+            return self.last_framebuffer_hash
+
+    def _prepare_frame(self, image, image_settings, device_ready):
+        # Crop, resize, rotate and enhance for the device
+        image = self.post_processor.process(
+            image,
+            self.device_config.get_resolution(),
+            self.device_config.get_config("orientation"),
+            inverted=self.device_config.get_config("inverted_image"),
+            image_settings=image_settings,
+            enhancement_settings=self.device_config.get_config("image_settings"),
+            device_ready=device_ready,
+            palette=self.display.get_palette(),
+            dither_mode=self.device_config.get_config("dithering", default=DEFAULT_DITHER_MODE)
+        )
+        self.timings.update(self.post_processor.timings)
+
+        start = time.perf_counter()
+        frame_fingerprint = compute_fingerprint(image)
+        framebuffer = self.display.get_framebuffer(image)
+        self.timings["pack"] = round((time.perf_counter() - start) * 1000, 2)
+        return framebuffer, frame_fingerprint
+
+    def _show_frame(self, framebuffer, frame_fingerprint):
+        # Compare what the panel would receive rather than the source image
+        frame_hash = framebuffer_hash(framebuffer)
+        if frame_hash == self.last_framebuffer_hash:
+            logger.info("Framebuffer is identical to the one on the display, skipping refresh")
+            self.last_fingerprint = frame_fingerprint
+            return
 
         # Pass to the concrete instance to render to the device.
-        self.display.display_image(image, image_settings)
+        regions = self._get_partial_regions(frame_fingerprint)
+        if regions:
+            logger.info(f"Partial refresh of {len(regions)} region(s): {regions}")
+            self.partial_count += 1
+        else:
+            self.partial_count = 0
+        self.display.show_framebuffer(framebuffer, regions)
+
+        self.last_fingerprint = frame_fingerprint
+        self.last_framebuffer_hash = frame_hash
+
+    def get_settings_key(self, image_settings=[], device_ready=False):
+        """Returns a digest of everything besides the source image that determines the framebuffer."""
+        return get_settings_key(self.device_config, self.display, image_settings, device_ready)
+
+    def _get_partial_regions(self, fingerprint):
+        """
+        Returns the changed regions to update with a partial refresh, or None when a full
+        refresh is needed.
+        """
+        if not self.display.supports_partial_refresh() or not self.device_config.get_config("partial_refresh", default=True):
+            return None
+
+        interval = int(self.device_config.get_config("full_refresh_interval", default=DEFAULT_FULL_REFRESH_INTERVAL))
+        if self.partial_count >= interval:
+            logger.info(f"Forcing a full refresh after {self.partial_count} partial refreshes to clear ghosting")
+            return None
+
+        changed = fingerprint.changed_tiles(self.last_fingerprint)
+        if not changed:
+            return None
+
+        regions = merge_boxes(changed)
+        width, height = fingerprint.size
+        area = sum((right - left) * (bottom - top) for left, top, right, bottom in regions)
+        if area > width * height * MAX_PARTIAL_AREA:
+            return None
+        return regions
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class DisplayJob:
+    """
+    A prepared frame waiting to be drawn, along with the outcome once it has been handled.
+
+    Attributes:
+        image (PIL.Image): The rendered plugin image.
+        image_settings (list): Plugin specific image settings.
+        device_ready (bool): The image was rendered at the orientation adjusted device resolution.
+        cache_id (str): Id the framebuffer is cached under, or None.
+        fingerprint (ImageFingerprint): Fingerprint of the image.
+        refresh_info (RefreshInfo): Refresh metadata for the frame.
+        superseded (bool): A newer frame replaced this one before it was drawn.
+        exception (Exception): Error raised while drawing, if any.
+    """
+
+    def __init__(self, image, image_settings=[], device_ready=False, cache_id=None, fingerprint=None, refresh_info=None):
+        self.image = image
+        self.image_settings = image_settings
+        self.device_ready = device_ready
+        self.cache_id = cache_id
+        self.fingerprint = fingerprint
+        self.refresh_info = refresh_info
+
+        self.superseded = False
+        self.exception = None
+        self.done = threading.Event()
+
+    def wait(self, timeout=None):
+        """Blocks until the frame was drawn, skipped or superseded. Returns False on timeout."""
+        return self.done.wait(timeout)
+
+class DisplayWorker:
+    """
+    Draws frames to a panel on a dedicated thread so slow updates do not block the scheduler
+    or the other panels.
+
+    Only one frame is held waiting. Submitting a frame while another is pending replaces
+    it, since drawing a frame that is already out of date would only delay the newest one.
+    The frame currently being drawn always finishes.
+
+    Args:
+        panel (Panel): Draws the frames.
+        on_complete (callable, optional): Called with the panel and each job it handled
+            without error, from the worker thread.
+    """
+
+    def __init__(self, panel, on_complete=None):
+        self.panel = panel
+        self.on_complete = on_complete
+
+        self.thread = None
+        self.condition = threading.Condition()
+        self.pending = None
+        self.running = False
+
+    def start(self):
+        if not self.thread or not self.thread.is_alive():
+            self.running = True
+            self.thread = threading.Thread(target=self._run, name=f"display-{self.panel.name}", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        """Stops the worker after the frame being drawn, dropping any pending frame."""
+        with self.condition:
+            self.running = False
+            self._supersede_pending()
+            self.condition.notify_all()
+        if self.thread:
+            self.thread.join()
+
+    def submit(self, job):
+        """Queues a frame for drawing, replacing the pending one. Returns the job."""
+        with self.condition:
+            if self._supersede_pending():
+                logger.info("Replacing pending frame with a newer one")
+            self.pending = job
+            self.condition.notify_all()
+        return job
+
+    def _supersede_pending(self):
+        if self.pending is None:
+            return False
+        self.pending.superseded = True
+        self.pending.done.set()
+        self.pending = None
+        return True
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.running and self.pending is None:
+                    self.condition.wait()
+                if not self.running:
+                    break
+                job, self.pending = self.pending, None
+
+            start = time.perf_counter()
+            try:
+                self.panel.display_image(
+                    job.image,
+                    image_settings=job.image_settings,
+                    device_ready=job.device_ready,
+                    cache_id=job.cache_id,
+                    fingerprint=job.fingerprint
+                )
+                logger.info(f"Panel {self.panel.name} updated in {time.perf_counter() - start:.1f} s")
+                if self.on_complete:
+                    self.on_complete(self.panel, job)
+            except Exception as e:
+                logger.exception("Exception while updating the display")
+                job.exception = e
+            finally:
+                job.done.set()
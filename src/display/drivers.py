@@ -0,0 +1,68 @@
+import fnmatch
+import logging
+
+logger = logging.getLogger(__name__)
+
+def is_waveshare(display_type):
+    return fnmatch.fnmatch(display_type, "epd*in*")
+
+def create_display(device_config):
+    """
+    Selects and initializes the display driver for a device or panel config.
+
+    Only the driver's own module is imported, so the boot splash can drive a panel before
+    the rest of the app is loaded.
+
+    Args:
+        device_config (object): Configuration of the device or of one of its panels.
+    """
+    from display.local_display import LocalDisplay
+
+    display_type = device_config.get_config("display_type", default="inky")
+
+    if display_type == "local":
+        return LocalDisplay(device_config)
+    if display_type.split(":")[0] == "emulated":
+        from display.emulated_display import EmulatedEPDDisplay
+        return EmulatedEPDDisplay(device_config)
+    if display_type == "inky":
+        try:
+            from display.inky_display import InkyDisplay
+            return InkyDisplay(device_config)
+        except ImportError as e:
+            logger.error(f"Cannot import InkyDisplay: {e}")
+            logger.info("Falling back to LocalDisplay for development")
+            return LocalDisplay(device_config)
+    if is_waveshare(display_type):
+        try:
+            from display.waveshare_display import WaveshareDisplay
+            return WaveshareDisplay(device_config)
+        except ImportError as e:
+            logger.error(f"Cannot import WaveshareDisplay: {e}")
+            logger.info("Falling back to LocalDisplay for development")
+            return LocalDisplay(device_config)
+
+    logger.warning(f"Unsupported display type '{display_type}', using LocalDisplay")
+    return LocalDisplay(device_config)
+
+def create_displays(device_config):
+    """
+    Initializes the display driver of each panel of the device.
+
+    Returns:
+        dict: The drivers by panel name, "default" for a single display device.
+
+    Raises:
+        ValueError: If more than one panel is a Waveshare display.
+    """
+    panel_configs = device_config.get_panel_configs()
+
+    # the Waveshare drivers share the module level SPI device and pins of epdconfig
+    waveshare_panels = [
+        panel_config.panel_name for panel_config in panel_configs
+        if is_waveshare(panel_config.get_config("display_type", default="inky"))
+    ]
+    if len(waveshare_panels) > 1:
+        raise ValueError(f"Only one panel can be a Waveshare display, found {len(waveshare_panels)}: {', '.join(waveshare_panels)}")
+
+    return {panel_config.panel_name or "default": create_display(panel_config) for panel_config in panel_configs}
@@ -0,0 +1,193 @@
+import logging
+import time
+
+from display.abstract_display import AbstractDisplay
+from display.buffer_packing import BufferPacker
+from display.refresh_policy import RefreshPolicy, INIT_FULL, INIT_FAST, INIT_PARTIAL
+from utils.quantize import quantize_image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "epd7in3e"
+
+BLACK_WHITE = [(0, 0, 0), (255, 255, 255)]
+SEVEN_COLOR = [(0, 0, 0), (255, 255, 255), (0, 255, 0), (0, 0, 255), (255, 0, 0), (255, 255, 0), (255, 128, 0)]
+SPECTRA_SIX = [(0, 0, 0), (255, 255, 255), (255, 255, 0), (255, 0, 0), (0, 0, 255), (0, 255, 0)]
+
+# approximate timings in milliseconds from the vendor specifications, the busy phases
+# dominate so the exact SPI clock matters little
+MODELS = {
+    "inky_impression_7": {
+        "resolution": (800, 480), "palette": SEVEN_COLOR, "bits": 4, "spi_hz": 3000000,
+        "init": 100, "clear": 0, "refresh": 32000, "sleep": 10
+    },
+    "inky_impression_5": {
+        "resolution": (600, 448), "palette": SEVEN_COLOR, "bits": 4, "spi_hz": 3000000,
+        "init": 100, "clear": 0, "refresh": 28000, "sleep": 10
+    },
+    "epd7in3e": {
+        "resolution": (800, 480), "palette": SPECTRA_SIX, "bits": 4, "spi_hz": 4000000,
+        "init": 150, "clear": 19000, "refresh": 19000, "sleep": 10
+    },
+    "epd7in3f": {
+        "resolution": (800, 480), "palette": SEVEN_COLOR, "bits": 4, "spi_hz": 4000000,
+        "init": 150, "clear": 32000, "refresh": 32000, "sleep": 10
+    },
+    "epd7in5_V2": {
+        "resolution": (800, 480), "palette": BLACK_WHITE, "bits": 1, "spi_hz": 4000000,
+        "init": 100, "clear": 4000, "refresh": 4000, "fast": 1500, "partial": 500, "sleep": 10
+    },
+    "epd2in13_V4": {
+        "resolution": (250, 122), "palette": BLACK_WHITE, "bits": 1, "spi_hz": 4000000,
+        "init": 20, "clear": 2000, "refresh": 2000, "fast": 1000, "partial": 300, "sleep": 10
+    },
+}
+
+class EmulatedEPDDisplay(AbstractDisplay):
+    """
+    Emulates an e-paper panel, for measuring refresh cycles without hardware.
+
+    Selected with a display_type of "emulated" or "emulated:<model>", the model being one
+    of MODELS. Framebuffers are packed in the model's buffer layout, and each update is
+    charged the time of the phases a real driver goes through: init, clear, the SPI transfer
+    of the buffer at the model's clock, the busy refresh and sleep. Waveshare models follow
+    the same refresh policy as WaveshareDisplay, Inky models always refresh fully.
+
+    The simulated time is reported next to the host time spent packing and emulating. The
+    "emulation_time_scale" device config makes updates block for that fraction of the
+    simulated time, 1 to pace the scheduler like a real panel, 0 (the default) not to wait.
+    """
+
+    def initialize_display(self):
+
+        """
+        Loads the timing model and stores its resolution in the device configuration.
+
+        Raises:
+            ValueError: If the model is not known.
+        """
+
+        display_type = self.device_config.get_config("display_type", default="emulated")
+        self.model_name = display_type.partition(":")[2] or DEFAULT_MODEL
+        if self.model_name not in MODELS:
+            raise ValueError(f"Unknown emulated display model '{self.model_name}', expected one of {sorted(MODELS)}")
+        self.model = MODELS[self.model_name]
+        logger.info(f"Emulating {self.model_name} display")
+
+        width, height = self.model["resolution"]
+        palette = self.model["palette"]
+        self.packer = BufferPacker((width, height), palette, list(range(len(palette))), self.model["bits"])
+
+        self.waveshare = self.model_name.startswith("epd")
+        self.policy = RefreshPolicy.for_display(self.model_name, self.device_config.get_config("refresh_policy"))
+        self.time_scale = float(self.device_config.get_config("emulation_time_scale", default=0))
+
+        self.pack_ms = 0
+        self.last_report = None
+        self.total_simulated_ms = 0
+        self.total_host_ms = 0
+
+        if not self.device_config.get_config("resolution"):
+            self.device_config.update_value("resolution", [width, height], write=True)
+
+    def get_framebuffer(self, image):
+
+        """
+        Packs a processed image into the model's buffer layout.
+
+        Args:
+            image (PIL.Image): The processed image, quantized to the model palette.
+
+        Returns:
+            bytes: The packed buffer.
+        """
+
+        start = time.perf_counter()
+        if not self.packer.can_pack(image):
+            image = quantize_image(image.resize(self.packer.size), self.packer.palette, "none")
+        framebuffer = self.packer.pack(image)
+        self.pack_ms = (time.perf_counter() - start) * 1000
+        return framebuffer
+
+    def show_framebuffer(self, framebuffer, regions=None):
+
+        """
+        Charges the refresh cycle for the framebuffer to the simulated clock.
+
+        Args:
+            framebuffer (bytes): The packed buffer.
+            regions (list, optional): Changed (left, top, right, bottom) boxes, refreshed
+                partially on models that support it.
+        """
+
+        start = time.perf_counter()
+        phases = {}
+
+        if regions and self.supports_partial_refresh():
+            mode = INIT_PARTIAL
+            self._wake(mode, phases)
+            if self.waveshare and not self.policy.base_held:
+                # the base frame lost in sleep is sent again, a full refresh of its own
+                phases["base"] = self._transfer_ms(len(framebuffer)) + self.model["refresh"]
+            bits = self.model["bits"]
+            area = sum((right - left) * (bottom - top) for left, top, right, bottom in regions)
+            phases["transfer"] = self._transfer_ms(area * bits // 8)
+            phases["refresh"] = self.model["partial"]
+            self.policy.record_update(INIT_PARTIAL)
+            self.policy.record_base()
+        else:
+            clear = self.waveshare and self.policy.should_clear()
+            mode = self.policy.get_full_mode(clear, "fast" in self.model) if self.waveshare else INIT_FULL
+            self._wake(mode, phases)
+            if clear:
+                # the driver sends a blank frame and waits for a full refresh
+                phases["clear"] = self._transfer_ms(len(framebuffer)) + self.model["clear"]
+            phases["transfer"] = self._transfer_ms(len(framebuffer))
+            phases["refresh"] = self.model["fast"] if mode == INIT_FAST else self.model["refresh"]
+            self.policy.record_update(mode, cleared=clear)
+            self.policy.record_base()
+
+        if not self.waveshare or self.policy.should_sleep(mode):
+            phases["sleep"] = self.model["sleep"]
+            self.policy.record_sleep()
+
+        simulated_ms = sum(phases.values())
+        # a cached framebuffer was not packed for this update
+        host_ms = self.pack_ms + (time.perf_counter() - start) * 1000
+        self.pack_ms = 0
+        if self.time_scale > 0:
+            time.sleep(simulated_ms * self.time_scale / 1000)
+
+        self.total_simulated_ms += simulated_ms
+        self.total_host_ms += host_ms
+        self.last_report = {
+            "model": self.model_name,
+            "phases_ms": {name: round(value, 1) for name, value in phases.items()},
+            "simulated_ms": round(simulated_ms, 1),
+            "host_ms": round(host_ms, 2),
+            "bytes": len(framebuffer)
+        }
+        logger.info(f"Emulated {self.model_name} update | simulated {simulated_ms / 1000:.2f} s "
+                    f"{self.last_report['phases_ms']} | host {host_ms:.1f} ms")
+
+    def _wake(self, mode, phases):
+        if self.policy.needs_init(mode):
+            phases["init"] = self.model["init"]
+            self.policy.record_init(mode)
+
+    def _transfer_ms(self, length):
+        return length * 8 * 1000 / self.model["spi_hz"]
+
+    def get_palette(self):
+        return list(self.model["palette"])
+
+    def supports_partial_refresh(self):
+        return "partial" in self.model
+
+    def get_timing_report(self):
+        """Returns the last update's phases and the simulated and host totals since startup."""
+        return {
+            "last": self.last_report,
+            "total_simulated_ms": round(self.total_simulated_ms, 1),
+            "total_host_ms": round(self.total_host_ms, 2)
+        }
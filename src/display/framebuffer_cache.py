@@ -0,0 +1,80 @@
+import hashlib
+import json
+import logging
+import threading
+import zlib
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 16
+
+def framebuffer_hash(framebuffer):
+    """Returns the hash identifying a packed framebuffer, as recorded in the refresh info."""
+    return f"{zlib.crc32(framebuffer):08x}{len(framebuffer):x}"
+
+def get_settings_key(device_config, display, image_settings=[], device_ready=False):
+    """Returns a digest of everything besides the source image that determines a panel's framebuffer."""
+    settings = {
+        "display": type(display).__name__,
+        "resolution": list(device_config.get_resolution()),
+        "orientation": device_config.get_config("orientation"),
+        "inverted": device_config.get_config("inverted_image"),
+        "enhancement": device_config.get_config("image_settings"),
+        # unset means the default dithering mode
+        "dithering": device_config.get_config("dithering", default=None),
+        "palette": display.get_palette(),
+        "image_settings": image_settings,
+        "device_ready": device_ready
+    }
+    return hashlib.sha1(json.dumps(settings, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+class CachedFrame:
+    """
+    A packed device framebuffer and the fingerprint of the processed frame it was packed from.
+
+    Attributes:
+        key (str): Source image digest and display settings the framebuffer was built for.
+        framebuffer (bytes): The packed device framebuffer.
+        fingerprint (ImageFingerprint): Fingerprint of the processed frame, used for partial refresh.
+    """
+
+    def __init__(self, key, framebuffer, fingerprint):
+        self.key = key
+        self.framebuffer = framebuffer
+        self.fingerprint = fingerprint
+
+class FramebufferCache:
+    """
+    In-memory cache of device framebuffers, one entry per plugin instance.
+
+    Re-showing an unchanged plugin instance pushes its cached framebuffer instead of
+    processing and packing the image again. An entry is only used while its key matches,
+    so a new image or changed display settings replace it. The least recently used
+    instances are dropped beyond max_entries.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, cache_id, key):
+        """Returns the CachedFrame for the cache id if it was built for the key, otherwise None."""
+        with self.lock:
+            entry = self.entries.get(cache_id)
+            if entry is None or entry.key != key:
+                return None
+            self.entries.move_to_end(cache_id)
+            return entry
+
+    def put(self, cache_id, key, framebuffer, fingerprint):
+        with self.lock:
+            self.entries[cache_id] = CachedFrame(key, framebuffer, fingerprint)
+            self.entries.move_to_end(cache_id)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
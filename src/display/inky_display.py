@@ -1,10 +1,14 @@
 import logging
+import numpy as np
 from inky.auto import auto
 from display.abstract_display import AbstractDisplay
 
 
 logger = logging.getLogger(__name__)
 
+# saturation the Inky driver blends its palettes with by default
+INKY_SATURATION = 0.5
+
 class InkyDisplay(AbstractDisplay):
 
     """
@@ -37,26 +41,60 @@ class InkyDisplay(AbstractDisplay):
                 [int(self.inky_display.width), int(self.inky_display.height)], 
                 write=True)
 
-    def display_image(self, image, image_settings=[]):
-        
+    def get_palette(self):
+
         """
-        Displays the provided image on the Inky display.
+        Returns the Inky palette in the driver's color index order.
+
+        Multi-color displays blend their palettes from the driver, other displays use white,
+        black and their accent color at indices 0, 1 and 2.
+        """
+
+        if hasattr(self.inky_display, "_palette_blend"):
+            colors = list(self.inky_display._palette_blend(INKY_SATURATION))
+            palette = [tuple(colors[i:i + 3]) for i in range(0, len(colors), 3)]
+            # the "clean" color is only used for clearing the display
+            clean = getattr(self.inky_display, "CLEAN", None)
+            return palette[:clean] if clean else palette
 
-        The image has been processed by adjusting orientation and resizing 
+        palette = [(255, 255, 255), (0, 0, 0)]
+        colour = getattr(self.inky_display, "colour", "black")
+        if colour == "red":
+            palette.append((255, 0, 0))
+        elif colour == "yellow":
+            palette.append((255, 255, 0))
+        return palette
+
+    def get_framebuffer(self, image):
+
+        """
+        Converts the image into the Inky driver's color index buffer.
+
+        The image has been processed by adjusting orientation and resizing
         before being sent to the display.
 
         Args:
             image (PIL.Image): The image to be displayed.
-            image_settings (list, optional): Additional settings to modify image rendering.
 
-        Raises:
-            ValueError: If no image is provided.
+        Returns:
+            bytes: The driver buffer, one palette index per pixel.
         """
 
-        logger.info("Displaying image to Inky display.")
-        if not image:
-            raise ValueError(f"No image provided.")
-
-        # Display the image on the Inky display
+        # a palettized image is used as is
         self.inky_display.set_image(image)
-        self.inky_display.show()
\ No newline at end of file
+        return self.inky_display.buf.tobytes()
+
+    def show_framebuffer(self, framebuffer, regions=None):
+
+        """
+        Displays a framebuffer from get_framebuffer on the Inky display.
+
+        Args:
+            framebuffer (bytes): The driver buffer.
+            regions (list, optional): Ignored, Inky displays always refresh fully.
+        """
+
+        logger.info("Displaying image to Inky display.")
+        buf = self.inky_display.buf
+        self.inky_display.buf = np.frombuffer(framebuffer, dtype=buf.dtype).reshape(buf.shape).copy()
+        self.inky_display.show()
@@ -1,6 +1,9 @@
 import logging
 import os
+import time
+from io import BytesIO
 from display.abstract_display import AbstractDisplay
+from utils.scratch import get_scratch_store
 
 logger = logging.getLogger(__name__)
 
@@ -34,31 +37,35 @@ class LocalDisplay(AbstractDisplay):
 
         logger.info(f"Local display initialized with resolution: {self.device_config.get_resolution()}")
 
-    def display_image(self, image, image_settings=[]):
+    def get_framebuffer(self, image):
         """
-        Saves the provided image to the file system instead of displaying on hardware.
+        Encodes the image as PNG, the local equivalent of a device buffer.
 
         Args:
             image (PIL.Image): The image to be saved.
-            image_settings (list, optional): Additional settings (unused in local mode).
+
+        Returns:
+            bytes: The PNG encoded image.
+        """
+        output = BytesIO()
+        image.save(output, format="PNG", compress_level=1)
+        return output.getvalue()
+
+    def show_framebuffer(self, framebuffer, regions=None):
+        """
+        Saves the framebuffer to the file system instead of displaying on hardware.
+
+        Args:
+            framebuffer (bytes): The PNG encoded image.
+            regions (list, optional): Ignored in local mode.
         """
 
         logger.info("Saving image for local display")
-        if not image:
-            raise ValueError("No image provided.")
-
-        # Save the image to the current image file location
-        image.save(self.device_config.current_image_file)
-        logger.info(f"Image saved to: {self.device_config.current_image_file}")
-
-        # Optionally save with timestamp for development tracking
-        timestamp_filename = f"display_output_{int(__import__('time').time())}.png"
-        timestamp_path = os.path.join(
-            os.path.dirname(self.device_config.current_image_file),
-            "local_outputs",
-            timestamp_filename
-        )
-
-        os.makedirs(os.path.dirname(timestamp_path), exist_ok=True)
-        image.save(timestamp_path)
+
+        # The display manager already saved the current image, only keep a timestamped
+        # copy of the device output for development tracking. The scratch store removes
+        # the oldest outputs once it reaches its size limit
+        prefix = f"{self.device_config.panel_name}_" if self.device_config.panel_name else ""
+        timestamp_filename = f"display_output_{prefix}{int(time.time())}.png"
+        timestamp_path = get_scratch_store().save_bytes(framebuffer, "local_outputs", timestamp_filename)
         logger.info(f"Timestamped image saved to: {timestamp_path}")
@@ -0,0 +1,112 @@
+import fnmatch
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CLEAR_INTERVAL = 10
+DEFAULT_MAX_FAST_REFRESHES = 5
+
+# controller states, "off" after sleep() until one of the init modes is run again
+POWER_OFF = "off"
+INIT_FULL = "full"
+INIT_FAST = "fast"
+INIT_PARTIAL = "partial"
+
+# settings for display types matched by pattern, overridden by the "refresh_policy" device config
+DISPLAY_DEFAULTS = {
+    # color particles settle less cleanly than black and white, clear these panels more often
+    "epd*f": {"clear_interval": 5},
+    "epd7in3e": {"clear_interval": 5},
+}
+
+class RefreshPolicy:
+    """
+    Decides how the panel of a Waveshare driver is initialized, cleared and put to sleep.
+
+    Clear() is a full panel refresh of its own, so it only runs every clear_interval updates,
+    or once max_fast_refreshes fast refreshes were done since the last clear. The panel is
+    also cleared on the first update, as its content is unknown. Other full refreshes use
+    the driver's fast init when it has one. The controller's power state is tracked so init
+    is skipped when the panel is still awake in the required mode.
+
+    Deep sleep clears the controller's RAM, and with it the base frame partial refreshes
+    diff against. The panel is kept awake between partial refreshes, and the base is sent
+    again after waking if it was lost. It sleeps after the next full refresh, which the
+    clear interval forces at the latest.
+
+    Attributes:
+        clear_interval (int): Updates between clears, partial refreshes included.
+        max_fast_refreshes (int): Fast refreshes between clears, which ghost more.
+        fast_init (bool): Use the driver's fast init for full refreshes that skip Clear().
+        sleep (bool): Put the panel to sleep after every full refresh. Waveshare recommends
+            it, a panel left powered for long can be damaged.
+        power_state (str): POWER_OFF or the init mode the controller is in.
+        base_held (bool): The controller still holds the last frame as partial refresh base.
+    """
+
+    def __init__(self, clear_interval=DEFAULT_CLEAR_INTERVAL, max_fast_refreshes=DEFAULT_MAX_FAST_REFRESHES,
+                 fast_init=True, sleep=True):
+        self.clear_interval = max(1, int(clear_interval))
+        self.max_fast_refreshes = max(1, int(max_fast_refreshes))
+        self.fast_init = fast_init
+        self.sleep = sleep
+
+        self.power_state = POWER_OFF
+        self.base_held = False
+        self.updates_since_clear = None
+        self.fast_since_clear = 0
+
+    @classmethod
+    def for_display(cls, display_type, config=None):
+        """Returns the policy for a display type, with the built-in defaults overridden by the config."""
+        settings = {}
+        for pattern, defaults in DISPLAY_DEFAULTS.items():
+            if fnmatch.fnmatch(display_type, pattern):
+                settings.update(defaults)
+        settings.update(config or {})
+
+        known = ("clear_interval", "max_fast_refreshes", "fast_init", "sleep")
+        policy = cls(**{key: value for key, value in settings.items() if key in known})
+        logger.info(f"Refresh policy for {display_type}: clear every {policy.clear_interval} updates, "
+                    f"fast init {policy.fast_init}, sleep {policy.sleep}")
+        return policy
+
+    def should_clear(self):
+        """Returns whether the next full refresh should clear the panel first."""
+        if self.updates_since_clear is None:
+            return True
+        return self.updates_since_clear + 1 >= self.clear_interval or \
+            self.fast_since_clear >= self.max_fast_refreshes
+
+    def get_full_mode(self, clear, has_fast_init):
+        """Returns the init mode for a full refresh."""
+        if clear or not self.fast_init or not has_fast_init:
+            return INIT_FULL
+        return INIT_FAST
+
+    def needs_init(self, mode):
+        return self.power_state != mode
+
+    def record_init(self, mode):
+        self.power_state = mode
+
+    def should_sleep(self, mode):
+        """Returns whether to sleep after an update in the given init mode."""
+        return self.sleep and mode != INIT_PARTIAL
+
+    def record_sleep(self):
+        self.power_state = POWER_OFF
+        self.base_held = False
+
+    def record_base(self):
+        self.base_held = True
+
+    def record_update(self, mode, cleared=False):
+        """Counts an update made in the given init mode."""
+        if cleared:
+            self.updates_since_clear = 0
+            self.fast_since_clear = 0
+        elif self.updates_since_clear is not None:
+            self.updates_since_clear += 1
+            if mode == INIT_FAST:
+                self.fast_since_clear += 1
@@ -1,13 +1,51 @@
+import hashlib
 import inspect
 import importlib
+import json
 import logging
+import os
+
+import numpy as np
 
 from display.abstract_display import AbstractDisplay
+from display.buffer_packing import BufferPacker
+from display.refresh_policy import RefreshPolicy, INIT_FULL, INIT_FAST, INIT_PARTIAL
 from PIL import Image
-from plugins.plugin_registry import get_plugin_instance
+from utils.app_utils import get_cache_dir
 
 logger = logging.getLogger(__name__)
 
+# driver methods for partial refresh and for writing the base frame partial refreshes diff against
+PARTIAL_METHODS = ("display_Partial", "displayPartial")
+BASE_METHODS = ("displayPartBaseImage", "display_Base")
+# driver methods putting the controller in fast and partial refresh mode, init() is the full mode
+FAST_INIT_METHODS = ("init_fast", "init_Fast")
+PARTIAL_INIT_METHODS = ("init_part", "init_Partial")
+
+# driver methods that do nothing but poll the BUSY pin and the pin level meaning idle, by
+# model. Methods that send commands while waiting (e.g. epd7in5_V2's ReadBusy) are left out.
+BUSY_IDLE_LEVELS = {
+    "epd1in54_V2": {"ReadBusy": 0},
+    "epd2in13_V3": {"ReadBusy": 0},
+    "epd2in13_V4": {"ReadBusy": 0},
+    "epd2in7_V2": {"ReadBusy": 0},
+    "epd2in9_V2": {"ReadBusy": 0},
+    "epd4in2_V2": {"ReadBusy": 0},
+    "epd7in5_HD": {"ReadBusy": 0},
+    "epd13in3k": {"ReadBusy": 0},
+    "epd4in0e": {"ReadBusyH": 1},
+    "epd7in3e": {"ReadBusyH": 1},
+    "epd7in3f": {"ReadBusyH": 1},
+}
+
+INVERT_TABLE = bytes(255 - value for value in range(256))
+
+# bumped when the checks that learn a driver's buffer layout change
+LAYOUT_CACHE_VERSION = 1
+
+# color constants of multi-color drivers, stored as 0xBBGGRR
+COLOR_ATTRIBUTES = ("BLACK", "WHITE", "GREEN", "BLUE", "RED", "YELLOW", "ORANGE")
+
 class WaveshareDisplay(AbstractDisplay):
     """
     Handles Waveshare e-paper display dynamically based on device type.
@@ -50,6 +88,14 @@ class WaveshareDisplay(AbstractDisplay):
             self.epd_display = epd_module.EPD()  
             
             self.epd_display.init()
+            self.policy = RefreshPolicy.for_display(display_type, self.device_config.get_config("refresh_policy"))
+            self.policy.record_init(INIT_FULL)
+            self.last_framebuffer = None
+            self.init_methods = {
+                INIT_FULL: self.epd_display.init,
+                INIT_FAST: self._find_method(FAST_INIT_METHODS),
+                INIT_PARTIAL: self._find_method(PARTIAL_INIT_METHODS)
+            }
 
             display_args_spec = inspect.getfullargspec(self.epd_display.display)
             display_args = display_args_spec.args
@@ -60,6 +106,16 @@ class WaveshareDisplay(AbstractDisplay):
             raise ValueError(f"Display does not support 'EPD.Display()': {display_type}")
 
         self.bi_color_display = len(display_args_spec.args) > 2
+        self._initialize_busy_wait(epd_module, display_type)
+        self._initialize_partial_refresh()
+        self.layout = self._load_layout(epd_module)
+        if self.partial_region_args and not self.layout["region_packing"]:
+            logger.warning("Driver buffer layout not recognized, partial refresh disabled")
+            self.partial_display = None
+            self.base_display = None
+        if self.partial_display:
+            logger.info(f"Partial refresh supported via {self.partial_display.__name__}")
+        self._initialize_packing()
 
         # update the resolution directly from the loaded device context
         if not self.device_config.get_config("resolution"):
@@ -69,44 +125,297 @@ class WaveshareDisplay(AbstractDisplay):
                 write=True)
 
 
-    def display_image(self, image, image_settings=[]):
-        
+    def get_framebuffer(self, image):
+
         """
-        Displays an image on the Waveshare display.
+        Packs an image into the Waveshare driver's buffer format.
 
-        The image has been processed by adjusting orientation, resizing, and converting it
-        into the buffer format required for e-paper rendering.
+        The image has been processed by adjusting orientation and resizing. Images quantized
+        to the display palette are packed with NumPy, others go through the driver's getbuffer.
+        Bi-color displays get a blank color layer appended to the black layer.
 
         Args:
             image (PIL.Image): The image to be displayed.
-            image_settings (list, optional): Additional settings to modify image rendering.
 
-        Raises:
-            ValueError: If no image is provided.
+        Returns:
+            bytes: The packed buffer.
         """
 
+        if self.packer and self.packer.can_pack(image):
+            framebuffer = self.packer.pack(image)
+        else:
+            # the drivers' getbuffer expects RGB, the palette colors come through unchanged
+            if image.mode == "P":
+                image = image.convert("RGB")
+            framebuffer = bytes(self.epd_display.getbuffer(image))
+
+        if self.bi_color_display:
+            framebuffer += self.blank_color_buffer
+        return framebuffer
+
+    def _initialize_packing(self):
+        """Sets up NumPy packing for the driver's buffer layout and the blank color layer of bi-color displays."""
+        self.packer = BufferPacker.from_dict(self.layout["packer"]) if self.layout["packer"] else None
+        if self.packer:
+            logger.info(f"Packing framebuffers with NumPy at {self.packer.bits} bit(s) per pixel")
+        else:
+            logger.warning("Driver buffer layout not recognized, packing with the driver's getbuffer")
+
+        self.blank_color_buffer = b""
+        if self.bi_color_display:
+            size = (int(self.epd_display.width), int(self.epd_display.height))
+            if self.packer:
+                # white is the second color of the black and white palette
+                self.blank_color_buffer = self.packer.pack_indices(np.ones((size[1], size[0]), dtype=np.uint8))
+            else:
+                self.blank_color_buffer = bytes(self.epd_display.getbuffer(Image.new('1', size, 255)))
+
+    def _load_layout(self, epd_module):
+        """
+        Returns the driver's buffer layout: the NumPy packer matching its getbuffer, or None,
+        and whether region buffers can be cut out of the framebuffer.
+
+        Learning the layout runs the driver's getbuffer, a per pixel Python loop that takes
+        seconds on a Pi Zero, so it is cached under config/cache/driver_layouts per driver
+        module, module file version, resolution and palette.
+        """
+        size = [int(self.epd_display.width), int(self.epd_display.height)]
+        palette = self.get_palette()
+        try:
+            stat = os.stat(epd_module.__file__)
+            version = [stat.st_mtime_ns, stat.st_size]
+        except (OSError, TypeError):
+            version = None
+
+        cache_file = None
+        if version:
+            key_data = json.dumps({"module": epd_module.__name__, "version": version, "size": size,
+                                   "palette": [list(color) for color in palette], "layout": LAYOUT_CACHE_VERSION})
+            key = hashlib.sha1(key_data.encode("utf-8")).hexdigest()[:16]
+            cache_dir = get_cache_dir("driver_layouts")
+            cache_file = os.path.join(cache_dir, f"{epd_module.__name__.rsplit('.', 1)[-1]}-{key}.json")
+            try:
+                with open(cache_file) as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+
+        packer = BufferPacker.from_driver(self.epd_display, palette)
+        layout = {
+            "packer": packer.to_dict() if packer else None,
+            "region_packing": self._check_region_packing() if self.partial_region_args else False
+        }
+
+        if cache_file:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                # drop layouts learned from earlier versions of the driver
+                prefix = f"{epd_module.__name__.rsplit('.', 1)[-1]}-"
+                for name in os.listdir(cache_dir):
+                    if name.startswith(prefix):
+                        os.remove(os.path.join(cache_dir, name))
+                with open(f"{cache_file}.tmp", "w") as f:
+                    json.dump(layout, f)
+                os.replace(f"{cache_file}.tmp", cache_file)
+            except OSError as e:
+                logger.warning(f"Failed to cache the driver buffer layout: {e}")
+        return layout
+
+    def show_framebuffer(self, framebuffer, regions=None):
+
+        """
+        Displays a framebuffer from get_framebuffer on the Waveshare display.
+
+        With changed regions and a driver that supports it only those regions are
+        refreshed, otherwise the display is fully refreshed. The refresh policy decides
+        whether the panel is cleared first and which init mode the driver runs in.
+
+        Args:
+            framebuffer (bytes): The packed buffer.
+            regions (list, optional): Changed (left, top, right, bottom) boxes.
+        """
+
+        if regions and self.partial_display:
+            self._show_partial(framebuffer, regions)
+            return
+
         logger.info("Displaying image to Waveshare display.")
-        if not image:
-            raise ValueError(f"No image provided.")
 
-        # Assume device was in sleep mode.
-        self.epd_display.init()
+        clear = self.policy.should_clear()
+        mode = self.policy.get_full_mode(clear, self.init_methods[INIT_FAST] is not None)
+        self._wake(mode)
 
-        # Clear residual pixels before updating the image.
-        self.epd_display.Clear()
+        # Clear residual pixels before updating the image, a full refresh of its own
+        if clear:
+            logger.info("Clearing Waveshare display.")
+            self.epd_display.Clear()
 
-        # Display the image on the WS display.
-        if not self.bi_color_display:
-            self.epd_display.display(self.epd_display.getbuffer(image))
+        # Display the image on the WS display, drivers get a mutable copy as from getbuffer
+        if self.base_display:
+            # also stores the frame as the base for following partial refreshes
+            self.base_display(bytearray(framebuffer))
+            self.policy.record_base()
+        elif not self.bi_color_display:
+            self.epd_display.display(bytearray(framebuffer))
         else:
-            color_image = Image.new('1', image.size, 255)
-            self.epd_display.display(
-                self.epd_display.getbuffer(image),
-                self.epd_display.getbuffer(color_image)
-            )
+            layer_size = len(framebuffer) // 2
+            self.epd_display.display(bytearray(framebuffer[:layer_size]), bytearray(framebuffer[layer_size:]))
 
+        self.policy.record_update(mode, cleared=clear)
+        self.last_framebuffer = framebuffer
+        self._finish_update(mode)
+
+    def _find_method(self, names):
+        return next((getattr(self.epd_display, name) for name in names if hasattr(self.epd_display, name)), None)
+
+    def _wake(self, mode):
+        """Runs the driver's init for the mode, unless the controller is still awake in it."""
+        if not self.policy.needs_init(mode):
+            return
+        init = self.init_methods[mode] or self.epd_display.init
+        logger.info(f"Initializing Waveshare display in {mode} mode via {init.__name__}")
+        init()
+        self.policy.record_init(mode)
+
+    def _finish_update(self, mode):
         # Put device into low power mode (EPD displays maintain image when powered off)
-        logger.info("Putting Waveshare display into sleep mode for power saving.")
-        self.epd_display.sleep()
+        if self.policy.should_sleep(mode):
+            logger.info("Putting Waveshare display into sleep mode for power saving.")
+            self.epd_display.sleep()
+            self.policy.record_sleep()
+
+    def get_palette(self):
+
+        """
+        Returns the display colors. Multi-color drivers define them as constants, other
+        drivers show black and white (bi-color displays only get a black layer).
+        """
+
+        palette = []
+        for name in COLOR_ATTRIBUTES:
+            value = getattr(self.epd_display, name, None)
+            if isinstance(value, int):
+                palette.append((value & 0xFF, (value >> 8) & 0xFF, (value >> 16) & 0xFF))
+        if len(palette) > 2:
+            return palette
+        return [(0, 0, 0), (255, 255, 255)]
+
+    def _initialize_busy_wait(self, epd_module, display_type):
+        """
+        Replaces the driver's BUSY pin polling loop (ReadBusy, ReadBusyH or ReadBusyL) with the
+        edge-triggered wait of epdconfig, so the CPU is free while the panel refreshes.
+
+        Only the methods BUSY_IDLE_LEVELS lists for the model are replaced. The panel has just
+        finished its init, so the pin must read the listed idle level, otherwise the driver
+        keeps its own loop rather than waiting for the wrong level.
+        """
+        levels = BUSY_IDLE_LEVELS.get(display_type)
+        if not levels:
+            logger.info(f"No edge-triggered busy wait known for {display_type}, the driver polls the BUSY pin")
+            return
+
+        epdconfig = getattr(epd_module, "epdconfig", None)
+        if not hasattr(epdconfig, "wait_for_level"):
+            logger.warning(f"epdconfig of {display_type} has no wait_for_level, the driver polls the BUSY pin")
+            return
+
+        idle_level = epdconfig.digital_read(self.epd_display.busy_pin)
+        for name, expected_level in levels.items():
+            if not callable(getattr(self.epd_display, name, None)):
+                logger.warning(f"Driver {display_type} has no {name}, the driver polls the BUSY pin")
+            elif idle_level != expected_level:
+                logger.warning(f"BUSY pin reads {idle_level} after init but {display_type}.{name} expects "
+                               f"{expected_level} when idle, keeping the driver's polling loop")
+            else:
+                setattr(self.epd_display, name, self._make_busy_wait(epdconfig, expected_level))
+                logger.info(f"Driver {name} waits for the BUSY pin to go {'high' if expected_level else 'low'} on edge events")
+
+    def _make_busy_wait(self, epdconfig, idle_level):
+        busy_pin = self.epd_display.busy_pin
+
+        def wait_until_idle():
+            waited = epdconfig.wait_for_level(busy_pin, idle_level)
+            logger.debug(f"e-Paper busy for {waited * 1000:.0f} ms")
+        return wait_until_idle
+
+    def _initialize_partial_refresh(self):
+        """
+        Looks up the driver's partial refresh routine, if it has one.
+
+        Drivers either take a full frame buffer (e.g. displayPartial(image)) or the buffer of a
+        region with its coordinates (e.g. display_Partial(image, Xstart, Ystart, Xend, Yend)).
+        Region buffers are cut out of the framebuffer, so the driver's getbuffer layout is
+        checked (see _load_layout) and region updates are disabled if it is not plain 1 bit rows.
+        """
+        self.partial_display = None
+        self.base_display = None
+        self.partial_region_args = False
+
+        if self.bi_color_display:
+            return
+
+        self.partial_display = self._find_method(PARTIAL_METHODS)
+        if not self.partial_display:
+            return
+
+        self.base_display = self._find_method(BASE_METHODS)
+
+        self.partial_region_args = len(inspect.getfullargspec(self.partial_display).args) > 2
+
+    def _check_region_packing(self):
+        # region buffers are cut from the framebuffer, which only works for one bit per pixel rows
+        size = (int(self.epd_display.width), int(self.epd_display.height))
+        pattern = Image.new('1', size, 255)
+        for x in range(0, size[0], 3):
+            for y in range(x % 7, size[1], 5):
+                pattern.putpixel((x, y), 0)
+
+        expected = bytes(self.epd_display.getbuffer(pattern))
+        packed = pattern.tobytes()
+        return expected in (packed, packed.translate(INVERT_TABLE))
+
+    def supports_partial_refresh(self):
+        return self.partial_display is not None
+
+    def _show_partial(self, framebuffer, regions):
+
+        """
+        Updates the changed regions of the Waveshare display with a partial refresh.
+
+        Drivers that update a region get the bounding box of all regions, widened to whole
+        bytes horizontally and cut out of the framebuffer. Drivers that only take a full
+        frame get the whole buffer and refresh what changed on their own.
+        """
+
+        logger.info("Partially refreshing Waveshare display.")
+
+        # drivers without a partial init mode take partial updates after their full init
+        self._wake(INIT_PARTIAL if self.init_methods[INIT_PARTIAL] else INIT_FULL)
+
+        # sleep cleared the base in the controller's RAM, partial refreshes against it would
+        # diff against garbage
+        if self.base_display and not self.policy.base_held and self.last_framebuffer is not None:
+            logger.info("Resending the partial refresh base after sleep.")
+            self.base_display(bytearray(self.last_framebuffer))
+            self.policy.record_base()
+
+        if self.partial_region_args:
+            width, height = int(self.epd_display.width), int(self.epd_display.height)
+            row_bytes = -(-width // 8)
+            left = min(region[0] for region in regions) // 8
+            top = min(region[1] for region in regions)
+            right = -(-max(region[2] for region in regions) // 8)
+            bottom = max(region[3] for region in regions)
+
+            region_buffer = bytearray()
+            for row in range(top, bottom):
+                region_buffer += framebuffer[row * row_bytes + left:row * row_bytes + right]
+            self.partial_display(region_buffer, left * 8, top, min(right * 8, width), bottom)
+        else:
+            self.partial_display(bytearray(framebuffer))
 
-        
\ No newline at end of file
+        self.policy.record_update(INIT_PARTIAL)
+        # the driver's partial refresh also makes the frame the new base
+        self.policy.record_base()
+        self.last_framebuffer = framebuffer
+        self._finish_update(INIT_PARTIAL)
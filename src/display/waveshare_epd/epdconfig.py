@@ -37,6 +37,40 @@ from ctypes import *
 
 logger = logging.getLogger(__name__)
 
+# the slowest color panels take over 30 seconds to refresh, a clear and refresh twice that
+DEFAULT_BUSY_TIMEOUT_MS = 90000
+
+
+class TransferStats:
+    """
+    Bytes, transfers and DC pin writes sent over SPI and the time the transfers took, as well
+    as the waits for the BUSY pin.
+    """
+
+    def __init__(self):
+        self.bytes = 0
+        self.transfers = 0
+        self.dc_writes = 0
+        self.seconds = 0.0
+        self.busy_waits = 0
+        self.busy_timeouts = 0
+        self.busy_seconds = 0.0
+
+    def bytes_per_second(self):
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def to_dict(self):
+        return {
+            'bytes': self.bytes,
+            'transfers': self.transfers,
+            'dc_writes': self.dc_writes,
+            'seconds': round(self.seconds, 4),
+            'bytes_per_second': round(self.bytes_per_second()),
+            'busy_waits': self.busy_waits,
+            'busy_timeouts': self.busy_timeouts,
+            'busy_seconds': round(self.busy_seconds, 3)
+        }
+
 
 class RaspberryPi:
     # Pin definition
@@ -59,9 +93,18 @@ class RaspberryPi:
         self.GPIO_PWR_PIN    = gpiozero.LED(self.PWR_PIN)
         self.GPIO_BUSY_PIN   = gpiozero.Button(self.BUSY_PIN, pull_up = False)
 
-        
+        # the DC pin level is cached so repeated data writes do not toggle it again
+        self.dc_level = None
+        self.transfer_stats = TransferStats()
 
     def digital_write(self, pin, value):
+        if pin == self.DC_PIN:
+            value = 1 if value else 0
+            if value == self.dc_level:
+                return
+            self.dc_level = value
+            self.transfer_stats.dc_writes += 1
+
         if pin == self.RST_PIN:
             if value:
                 self.GPIO_RST_PIN.on()
@@ -98,11 +141,54 @@ class RaspberryPi:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_for_level(self, pin, level, timeout_ms=DEFAULT_BUSY_TIMEOUT_MS):
+        """
+        Blocks until the BUSY pin reads the level, or the timeout passes. The thread sleeps
+        until gpiozero sees the edge instead of polling the pin. Returns the seconds waited.
+        """
+        if pin != self.BUSY_PIN:
+            raise ValueError("Only the BUSY pin can be waited on")
+
+        start = time.perf_counter()
+        timeout = timeout_ms / 1000.0 if timeout_ms else None
+        # the BUSY pin is pulled down, so pressed means high
+        if level:
+            reached = self.GPIO_BUSY_PIN.wait_for_press(timeout)
+        else:
+            reached = self.GPIO_BUSY_PIN.wait_for_release(timeout)
+        waited = time.perf_counter() - start
+
+        stats = self.transfer_stats
+        stats.busy_waits += 1
+        stats.busy_seconds += waited
+        if not reached:
+            stats.busy_timeouts += 1
+            logger.warning("BUSY pin did not go %s within %d ms" % ("high" if level else "low", timeout_ms))
+        return waited
+
     def spi_writebyte(self, data):
+        start = time.perf_counter()
         self.SPI.writebytes(data)
+        self._record_transfer(len(data), start)
 
     def spi_writebyte2(self, data):
+        # spidev takes any buffer here and splits it at its bufsiz in C
+        start = time.perf_counter()
         self.SPI.writebytes2(data)
+        self._record_transfer(len(data), start)
+
+    def _record_transfer(self, length, start):
+        stats = self.transfer_stats
+        stats.bytes += length
+        stats.transfers += 1
+        stats.seconds += time.perf_counter() - start
+
+    def get_transfer_stats(self):
+        """Returns the SPI transfer totals since start or the last reset, with throughput in bytes/s."""
+        return self.transfer_stats.to_dict()
+
+    def reset_transfer_stats(self):
+        self.transfer_stats = TransferStats()
 
     def DEV_SPI_write(self, data):
         self.DEV_SPI.DEV_SPI_SendData(data)
@@ -151,6 +237,7 @@ class RaspberryPi:
 
         self.GPIO_RST_PIN.off()
         self.GPIO_DC_PIN.off()
+        self.dc_level = 0
         self.GPIO_PWR_PIN.off()
         logger.debug("close 5V, Module enters 0 power consumption ...")
         
@@ -309,7 +396,9 @@ output, _ = process.communicate()
 if sys.version_info[0] == 2:
     output = output.decode(sys.stdout.encoding)
 
-if "Raspberry" in output:
+# only present once a test or benchmark installed the fake spidev and gpiozero
+fake_hardware = sys.modules.get(__name__.rpartition('.')[0] + '.fake_hardware')
+if "Raspberry" in output or (fake_hardware is not None and fake_hardware.installed):
     implementation = RaspberryPi()
 elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
     implementation = SunriseX3()
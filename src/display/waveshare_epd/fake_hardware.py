@@ -0,0 +1,151 @@
+"""
+In-process stand-ins for the spidev and gpiozero modules used by epdconfig.
+
+Call install() before display.waveshare_epd.epdconfig is first imported. epdconfig then
+uses its Raspberry Pi implementation on any machine, and everything the drivers send can
+be inspected on the fake devices. Nothing here talks to hardware.
+"""
+import sys
+import threading
+import time
+import types
+
+# spidev's default buffer size, transfers larger than this fail on a real Pi
+DEFAULT_BUFSIZ = 4096
+
+installed = False
+devices = {"spi": [], "pins": {}}
+
+class FakeSpiDev:
+    """
+    Records SPI writes in place of spidev.SpiDev.
+
+    Attributes:
+        writes (list): bytes of every transfer, in order.
+        simulate_timing (bool): Sleep for the time the transfer would take on the wire.
+    """
+
+    def __init__(self, bufsiz=DEFAULT_BUFSIZ, simulate_timing=False):
+        self.bufsiz = bufsiz
+        self.simulate_timing = simulate_timing
+        self.max_speed_hz = 500000
+        self.mode = 0
+        self.is_open = False
+        self.writes = []
+        devices["spi"].append(self)
+
+    def open(self, bus, device):
+        self.is_open = True
+
+    def close(self):
+        self.is_open = False
+
+    def _transfer(self, data):
+        data = bytes(data)
+        if len(data) > self.bufsiz:
+            raise OverflowError(f"Transfer of {len(data)} bytes exceeds the spidev buffer of {self.bufsiz}")
+        if self.simulate_timing:
+            time.sleep(len(data) * 8 / self.max_speed_hz)
+        self.writes.append(data)
+
+    def writebytes(self, data):
+        # spidev only accepts lists of ints here
+        if not isinstance(data, list):
+            raise TypeError("writebytes expects a list")
+        self._transfer(data)
+
+    def writebytes2(self, data):
+        # unlike writebytes, accepts any buffer and splits it at the buffer size
+        view = memoryview(bytes(data)) if isinstance(data, list) else memoryview(data)
+        for start in range(0, len(view), self.bufsiz):
+            self._transfer(view[start:start + self.bufsiz])
+
+    def xfer3(self, data):
+        self.writebytes2(data)
+        return [0] * len(data)
+
+    def get_data(self):
+        """Returns all bytes written so far."""
+        return b"".join(self.writes)
+
+class FakeLED:
+    """Output pin in place of gpiozero.LED, counting the state changes it is asked for."""
+
+    def __init__(self, pin, **kwargs):
+        self.pin = pin
+        self.value = 0
+        self.writes = 0
+        self.closed = False
+        devices["pins"][pin] = self
+
+    def on(self):
+        self.value = 1
+        self.writes += 1
+
+    def off(self):
+        self.value = 0
+        self.writes += 1
+
+    def close(self):
+        self.closed = True
+
+class FakeButton:
+    """
+    Input pin in place of gpiozero.Button. Tests drive it with set(), for example to
+    release the BUSY pin a set time after a refresh starts.
+    """
+
+    def __init__(self, pin, pull_up=True, **kwargs):
+        self.pin = pin
+        self.pull_up = pull_up
+        self.condition = threading.Condition()
+        self._value = 0
+        self.closed = False
+        devices["pins"][pin] = self
+
+    @property
+    def value(self):
+        return self._value
+
+    @property
+    def is_pressed(self):
+        return bool(self._value)
+
+    def set(self, value, after=None):
+        """Sets the pin value, or sets it from a timer thread after the given seconds."""
+        if after:
+            timer = threading.Timer(after, self.set, args=(value,))
+            timer.daemon = True
+            timer.start()
+            return
+        with self.condition:
+            self._value = 1 if value else 0
+            self.condition.notify_all()
+
+    def _wait_for(self, value, timeout):
+        with self.condition:
+            return self.condition.wait_for(lambda: self._value == value, timeout)
+
+    def wait_for_press(self, timeout=None):
+        return self._wait_for(1, timeout)
+
+    def wait_for_release(self, timeout=None):
+        return self._wait_for(0, timeout)
+
+    def close(self):
+        self.closed = True
+
+def install(bufsiz=DEFAULT_BUFSIZ, simulate_timing=False):
+    """Registers the fake spidev and gpiozero modules. Returns the dictionary of created devices."""
+    global installed
+
+    spidev = types.ModuleType("spidev")
+    spidev.SpiDev = lambda: FakeSpiDev(bufsiz, simulate_timing)
+    gpiozero = types.ModuleType("gpiozero")
+    gpiozero.LED = FakeLED
+    gpiozero.Button = FakeButton
+
+    sys.modules["spidev"] = spidev
+    sys.modules["gpiozero"] = gpiozero
+    installed = True
+    return devices
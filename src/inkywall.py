@@ -8,14 +8,21 @@ logging.config.fileConfig(os.path.join(os.path.dirname(__file__), 'config', 'log
 import warnings
 warnings.filterwarnings("ignore", message=".*Busy Wait: Held high.*")
 
-import os
+# time every module import from here on when started with --profile-imports
+import sys
+from utils import import_profile
+if "--profile-imports" in sys.argv:
+    import_profile.start()
+
+# paint the boot splash while the rest of the app imports
+from display import boot_splash
+splash = boot_splash.start()
+
 import random
 import time
-import sys
 import json
 import logging
 import threading
-from utils.app_utils import generate_startup_image
 from flask import Flask, request
 from werkzeug.serving import is_running_from_reloader
 from config import Config
@@ -27,6 +34,7 @@ from blueprints.plugin import plugin_bp
 from blueprints.playlist import playlist_bp
 from jinja2 import ChoiceLoader, FileSystemLoader
 from plugins.plugin_registry import load_plugins
+from utils.render_watchdog import set_render_limits
 
 
 logger = logging.getLogger(__name__)
@@ -39,12 +47,20 @@ template_dirs = [
 ]
 app.jinja_loader = ChoiceLoader([FileSystemLoader(directory) for directory in template_dirs])
 
-device_config = Config()
-display_manager = DisplayManager(device_config)
+# the splash already initialized the displays
+device_config, displays = splash.wait() if splash else (None, None)
+if displays is None:
+    device_config = Config()
+display_manager = DisplayManager(device_config, displays)
+set_render_limits(device_config.get_config("render_limits"))
 refresh_task = RefreshTask(device_config, display_manager, app)
 
 load_plugins(device_config.get_plugins())
 
+if import_profile.get_profile():
+    print(f"Import profile (plugins are imported on first use and logged separately):\n"
+          f"{import_profile.get_profile().format_report()}")
+
 # Store dependencies
 app.config['DEVICE_CONFIG'] = device_config
 app.config['DISPLAY_MANAGER'] = display_manager
@@ -62,15 +78,14 @@ app.register_blueprint(playlist_bp)
 if __name__ == '__main__':
     from werkzeug.serving import is_running_from_reloader
 
-    # start the background refresh task
+    # start the background refresh task, its first frame is drawn after the boot splash
     if not is_running_from_reloader():
-        refresh_task.start()
+        refresh_task.start(splash=splash)
 
-    # display default inkywall image on startup
-    if device_config.get_config("startup") is True:
-        logger.info("Startup flag is set, displaying startup image")
-        img = generate_startup_image(device_config.get_resolution())
-        display_manager.display_image(img)
+    # on the first boot add the host name and address to the splash once the network is up
+    if splash and splash.details:
+        logger.info("Startup flag is set, displaying startup details")
+        splash.show_details(refresh_task)
         device_config.update_value("startup", False, write=True)
 
     try:
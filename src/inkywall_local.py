@@ -8,6 +8,12 @@ logging.config.fileConfig(os.path.join(os.path.dirname(__file__), 'config', 'log
 import warnings
 warnings.filterwarnings("ignore", message=".*Busy Wait: Held high.*")
 
+# time every module import from here on when started with --profile-imports
+import sys
+from utils import import_profile
+if "--profile-imports" in sys.argv:
+    import_profile.start()
+
 import os
 import random
 import time
@@ -27,6 +33,8 @@ from blueprints.plugin import plugin_bp
 from blueprints.playlist import playlist_bp
 from jinja2 import ChoiceLoader, FileSystemLoader
 from plugins.plugin_registry import load_plugins
+from utils.render_watchdog import set_render_limits
+from utils.scratch import get_scratch_store
 
 
 logger = logging.getLogger(__name__)
@@ -40,11 +48,16 @@ template_dirs = [
 app.jinja_loader = ChoiceLoader([FileSystemLoader(directory) for directory in template_dirs])
 
 device_config = Config()
+set_render_limits(device_config.get_config("render_limits"))
 display_manager = DisplayManager(device_config)
 refresh_task = RefreshTask(device_config, display_manager, app)
 
 load_plugins(device_config.get_plugins())
 
+if import_profile.get_profile():
+    print(f"Import profile (plugins are imported on first use and logged separately):\n"
+          f"{import_profile.get_profile().format_report()}")
+
 # Store dependencies
 app.config['DEVICE_CONFIG'] = device_config
 app.config['DISPLAY_MANAGER'] = display_manager
@@ -65,10 +78,11 @@ if __name__ == '__main__':
     print("=" * 60)
     print("InkyWall Local Development Server")
     print("=" * 60)
-    print(f"Display Type: {device_config.get_config('display_type')}")
-    print(f"Resolution: {device_config.get_resolution()}")
-    print(f"Images will be saved to: {device_config.current_image_file}")
-    print(f"Timestamped outputs in: {os.path.join(os.path.dirname(device_config.current_image_file), 'local_outputs')}")
+    for panel in display_manager.panels:
+        panel_config = panel.device_config
+        print(f"Panel {panel.name}: {panel_config.get_config('display_type')} at {panel_config.get_resolution()}")
+        print(f"Images will be saved to: {panel_config.current_image_file}")
+    print(f"Timestamped outputs in: {os.path.join(os.path.dirname(device_config.current_image_file), 'local_outputs')} (oldest removed past {get_scratch_store().max_bytes // (1024 * 1024)} MB)")
     print("=" * 60)
 
     # start the background refresh task - always start it for local development
@@ -77,8 +91,9 @@ if __name__ == '__main__':
     # display default inkywall image on startup
     if device_config.get_config("startup") is True:
         logger.info("Startup flag is set, displaying startup image")
-        img = generate_startup_image(device_config.get_resolution())
-        display_manager.display_image(img)
+        for panel in display_manager.panels:
+            img = generate_startup_image(panel.device_config.get_resolution())
+            panel.display_image(img)
         device_config.update_value("startup", False, write=True)
 
     try:
@@ -10,17 +10,20 @@ class RefreshInfo:
 
     Attributes:
         refresh_time (str): ISO-formatted time string of the refresh.
-        image_hash (int): SHA-256 hash of the image.
+        image_hash (str): Fingerprint digest of the image.
+        framebuffer_hash (str): Digest of the framebuffer last sent to the display.
         refresh_type (str): Refresh type ['Manual Update', 'Playlist'].
         plugin_id (str): Plugin id of the refresh.
         playlist (str): Playlist name if refresh_type is 'Playlist'.
         plugin_instance (str): Plugin instance name if refresh_type is 'Playlist'.
     """
 
-    def __init__(self, refresh_type, plugin_id, refresh_time, image_hash, playlist=None, plugin_instance=None):
+    def __init__(self, refresh_type, plugin_id, refresh_time, image_hash, playlist=None, plugin_instance=None,
+                 framebuffer_hash=None):
         """Initialize RefreshInfo instance."""
         self.refresh_time = refresh_time
         self.image_hash = image_hash
+        self.framebuffer_hash = framebuffer_hash
         self.refresh_type = refresh_type
         self.plugin_id = plugin_id
         self.playlist = playlist
@@ -44,6 +47,8 @@ class RefreshInfo:
             refresh_dict["playlist"] = self.playlist
         if self.plugin_instance:
             refresh_dict["plugin_instance"] = self.plugin_instance
+        if self.framebuffer_hash:
+            refresh_dict["framebuffer_hash"] = self.framebuffer_hash
         return refresh_dict
 
     @classmethod
@@ -54,7 +59,8 @@ class RefreshInfo:
             refresh_type=data.get("refresh_type"),
             plugin_id=data.get("plugin_id"),
             playlist=data.get("playlist"),
-            plugin_instance=data.get("plugin_instance")
+            plugin_instance=data.get("plugin_instance"),
+            framebuffer_hash=data.get("framebuffer_hash")
         )
 
 class PlaylistManager:
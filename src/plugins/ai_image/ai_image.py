@@ -1,8 +1,6 @@
 from plugins.base_plugin.base_plugin import BasePlugin
+from utils.image_utils import fetch_image
 from openai import OpenAI
-from PIL import Image
-from io import BytesIO
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
@@ -49,7 +47,8 @@ class AIImage(BasePlugin):
                 text_prompt,
                 model=image_model,
                 quality=image_quality,
-                orientation=device_config.get_config("orientation")
+                orientation=device_config.get_config("orientation"),
+                target_size=self.get_render_dimensions(device_config)
             )
         except Exception as e:
             logger.error(f"Failed to make Open AI request: {str(e)}")
@@ -57,7 +56,7 @@ class AIImage(BasePlugin):
         return image
 
     @staticmethod
-    def fetch_image(ai_client, prompt, model="dalle-e-3", quality="standard", orientation="horizontal"):
+    def fetch_image(ai_client, prompt, model="dalle-e-3", quality="standard", orientation="horizontal", target_size=None):
         logger.info(f"Generating image for prompt: {prompt}, model: {model}, quality: {quality}")
         prompt += (
             ". The image should fully occupy the entire canvas without any frames, "
@@ -79,8 +78,7 @@ class AIImage(BasePlugin):
 
         response = ai_client.images.generate(**args)
         image_url = response.data[0].url
-        response = requests.get(image_url)
-        img = Image.open(BytesIO(response.content))
+        img = fetch_image(image_url, target_size)
 
         return img
 
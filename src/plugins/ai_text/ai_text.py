@@ -3,6 +3,7 @@ from utils.app_utils import resolve_path
 from openai import OpenAI
 from PIL import Image, ImageDraw, ImageFont
 from utils.image_utils import resize_image
+from utils.layout_renderer import Box, Text
 from io import BytesIO
 from datetime import datetime
 import requests
@@ -13,6 +14,8 @@ import os
 logger = logging.getLogger(__name__)
 
 class AIText(BasePlugin):
+    device_ready = True
+
     def generate_settings_template(self):
         template_params = super().generate_settings_template()
         template_params['api_key'] = {
@@ -45,9 +48,7 @@ class AIText(BasePlugin):
             logger.error(f"Failed to make Open AI request: {str(e)}")
             raise RuntimeError("Open AI request failure, please check logs.")
 
-        dimensions = device_config.get_resolution()
-        if device_config.get_config("orientation") == "vertical":
-            dimensions = dimensions[::-1]
+        dimensions = self.get_render_dimensions(device_config)
 
         image_template_params = {
             "title": title,
@@ -59,6 +60,22 @@ class AIText(BasePlugin):
 
         return image
 
+    def build_native_layout(self, html_file, template_params, content_size):
+        if html_file != "ai_text.html":
+            return None
+
+        # mirrors render/ai_text.css, font sizes follow the container query units and the
+        # gap of 1dvh the viewport height
+        width, height = content_size
+        title = template_params.get("title")
+        return Box(
+            Text(title, font_family="Jost", font_weight="bold", font_size=min(height * 0.10, width * 0.08))
+                if title else None,
+            Text(template_params.get("content"), font_family="Jost", font_weight="200",
+                 font_size=min(height * 0.06, width * 0.05), preserve_newlines=True, max_height=height * 0.8),
+            direction="column", justify="center", align="stretch", gap=template_params["height"] * 0.01
+        )
+
     @staticmethod
     def fetch_text_prompt(ai_client, model, text_prompt):
         logger.info(f"Getting random text prompt from input {text_prompt}")
@@ -6,8 +6,7 @@ For the API key, set `NASA_SECRET={API_KEY}` in your .env file.
 """
 
 from plugins.base_plugin.base_plugin import BasePlugin
-from PIL import Image
-from io import BytesIO
+from utils.image_utils import fetch_image
 import requests
 import logging
 from random import randint
@@ -58,8 +57,7 @@ class Apod(BasePlugin):
         image_url = data.get("hdurl") or data.get("url")
 
         try:
-            img_data = requests.get(image_url)
-            image = Image.open(BytesIO(img_data.content))
+            image = fetch_image(image_url, self.get_render_dimensions(device_config))
         except Exception as e:
             logger.error(f"Failed to load APOD image: {str(e)}")
             raise RuntimeError("Failed to load APOD image.")
@@ -1,17 +1,29 @@
 import logging
 import os
-from utils.app_utils import resolve_path, get_fonts
+from utils.app_utils import resolve_path, get_cache_dir
+from utils.font_utils import FONT_FACE_MARKER, format_font_faces, use_font_faces
 from utils.image_utils import take_screenshot_html
-from jinja2 import Environment, FileSystemLoader, select_autoescape
+from utils.render_cache import RenderCache
+from utils.layout_renderer import render_layout, draw_frame, frame_border_widths
+from PIL import Image, ImageOps
+from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
 from pathlib import Path
 import asyncio
 import base64
+import threading
 
 logger = logging.getLogger(__name__)
 
 PLUGINS_DIR = resolve_path("plugins")
 BASE_PLUGIN_DIR =  os.path.join(PLUGINS_DIR, "base_plugin")
 
+# screenshots keyed on the rendered html, shared by all plugins
+RENDER_CACHE = RenderCache(get_cache_dir("render"))
+
+# compiled render template environments, one per plugin id, kept across refreshes
+RENDER_ENVIRONMENTS = {}
+_render_environments_lock = threading.Lock()
+
 FRAME_STYLES = [
     {
         "name": "None",
@@ -33,6 +45,11 @@ FRAME_STYLES = [
 
 class BasePlugin:
     """Base class for all plugins."""
+
+    # Plugins that always return images at get_render_dimensions() set this so the display
+    # manager skips cropping and resampling and only transposes the image onto the panel.
+    device_ready = False
+
     def __init__(self, config, **dependencies):
         self.config = config
 
@@ -42,6 +59,13 @@ class BasePlugin:
     def get_plugin_id(self):
         return self.config.get("id")
 
+    def get_render_dimensions(self, device_config):
+        """Returns the (width, height) to render at: the device resolution, swapped for vertical orientation."""
+        dimensions = device_config.get_resolution()
+        if device_config.get_config("orientation") == "vertical":
+            dimensions = dimensions[::-1]
+        return dimensions
+
     def get_plugin_dir(self, path=None):
         plugin_dir = os.path.join(PLUGINS_DIR, self.get_plugin_id())
         if path:
@@ -61,15 +85,63 @@ class BasePlugin:
     def read_file(self, file):
         return base64.b64encode(open(file, "rb").read()).decode('utf-8')
 
+    def build_native_layout(self, html_file, template_params, content_size):
+        """
+        Returns a utils.layout_renderer tree equivalent to the given render template, or None.
+
+        Plugins opt a template into native rendering by overriding this method. The layout is
+        placed inside the page content box (content_size) after margins, frame and padding.
+        The viewport size is in template_params["width"] and ["height"].
+        """
+        return None
+
+    def get_render_environment(self):
+        """
+        Returns this plugin's jinja2 environment for the base plugin and plugin render directories.
+
+        The environment is created once per plugin and compiles every render template up front.
+        Compiled bytecode is stored under config/cache/jinja so restarts skip compilation, and
+        templates are recompiled when their files change.
+        """
+        plugin_id = self.get_plugin_id()
+        with _render_environments_lock:
+            env = RENDER_ENVIRONMENTS.get(plugin_id)
+            if env is not None:
+                return env
+
+            bytecode_dir = get_cache_dir("jinja")
+            os.makedirs(bytecode_dir, exist_ok=True)
+
+            base_render_dir = os.path.join(BASE_PLUGIN_DIR, "render")
+            plugin_render_dir = self.get_plugin_dir("render")
+            env = Environment(
+                loader=FileSystemLoader([plugin_render_dir, base_render_dir]),
+                autoescape=select_autoescape(['html', 'xml']),
+                bytecode_cache=FileSystemBytecodeCache(bytecode_dir),
+                auto_reload=True
+            )
+
+            for template_name in env.list_templates(extensions=["html"]):
+                try:
+                    env.get_template(template_name)
+                except Exception as e:
+                    logger.warning(f"Failed to precompile template {template_name} for '{plugin_id}': {e}")
+
+            RENDER_ENVIRONMENTS[plugin_id] = env
+            return env
+
     def render_image(self, dimensions, html_file, css_file=None, template_params={}):
-        # instantiate jinja2 env with base plugin and current plugin render directories
+        # the viewport size, which the templates and native layouts size viewport units by
+        template_params["width"] = dimensions[0]
+        template_params["height"] = dimensions[1]
+
+        native_image = self.render_native_image(dimensions, html_file, template_params)
+        if native_image is not None:
+            return native_image
+
+        env = self.get_render_environment()
         base_render_dir = os.path.join(BASE_PLUGIN_DIR, "render")
         plugin_render_dir = self.get_plugin_dir("render")
-        loader = FileSystemLoader([plugin_render_dir, base_render_dir])
-        env = Environment(
-            loader=loader,
-            autoescape=select_autoescape(['html', 'xml'])
-        )
 
         # load the base plugin and current plugin css files
         css_files = [os.path.join(base_render_dir, "plugin.css")]
@@ -79,12 +151,69 @@ class BasePlugin:
                 css_files.append(plugin_css)
 
         template_params["style_sheets"] = css_files
-        template_params["width"] = dimensions[0]
-        template_params["height"] = dimensions[1]
-        template_params["font_faces"] = get_fonts()
 
-        # load and render the given html template
-        template = env.get_template(html_file)
-        rendered_html = template.render(template_params)
+        # load and render the given html template once, then fill in @font-face rules for
+        # just the families and characters the rendered page uses
+        template_params["font_faces"] = FONT_FACE_MARKER
+        rendered_html = env.get_template(html_file).render(template_params)
+        with use_font_faces(rendered_html, css_files, html_file) as font_faces:
+            rendered_html = rendered_html.replace(FONT_FACE_MARKER, format_font_faces(font_faces), 1)
+
+            # skip the browser if this exact page has been rendered before
+            cache_key = RENDER_CACHE.make_key(rendered_html, dimensions)
+            image = RENDER_CACHE.get(cache_key)
+            if image is None:
+                image = take_screenshot_html(rendered_html, dimensions)
+                if image is not None:
+                    RENDER_CACHE.put(cache_key, image)
+        return image
+
+    def render_native_image(self, dimensions, html_file, template_params={}):
+        """Draws the template with Pillow if the plugin provides a native layout, mirroring plugin.html."""
+        width, height = dimensions
+        settings = template_params.get("plugin_settings") or {}
+        frame = settings.get("selectedFrame")
+
+        margins = [
+            BasePlugin._to_px(settings.get(f"{side}Margin") or settings.get("margin"), 5)
+            for side in ("top", "right", "bottom", "left")
+        ]
+        borders = frame_border_widths(frame, width)
+        padding = round(width * 0.015)
+
+        body = (margins[3], margins[0], width - margins[1], height - margins[2])
+        content = (
+            body[0] + borders[3] + padding,
+            body[1] + borders[0] + padding,
+            body[2] - body[0] - borders[1] - borders[3] - padding * 2,
+            body[3] - body[1] - borders[0] - borders[2] - padding * 2
+        )
+        if content[2] <= 0 or content[3] <= 0:
+            return None
+
+        root = self.build_native_layout(html_file, template_params, (content[2], content[3]))
+        if root is None:
+            return None
+
+        logger.info(f"Rendering {html_file} natively at {width}x{height}")
+        background = "white"
+        if settings.get("backgroundOption") == "color" and settings.get("backgroundColor"):
+            background = settings.get("backgroundColor")
+        image = Image.new("RGB", (width, height), background)
+        if settings.get("backgroundOption") == "image" and settings.get("backgroundImageFile"):
+            try:
+                with Image.open(settings.get("backgroundImageFile")) as background_image:
+                    image.paste(ImageOps.fit(background_image.convert("RGB"), (width, height)))
+            except OSError as e:
+                logger.warning(f"Failed to load background image: {e}")
+
+        text_color = settings.get("textColor") or "black"
+        draw_frame(image, frame, body, text_color, width)
+        return render_layout(root, image, content, text_color)
 
-        return take_screenshot_html(rendered_html, dimensions)
+    @staticmethod
+    def _to_px(value, default):
+        try:
+            return int(float(value))
+        except (TypeError, ValueError):
+            return default
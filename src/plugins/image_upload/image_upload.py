@@ -1,6 +1,5 @@
 from plugins.base_plugin.base_plugin import BasePlugin
-from PIL import Image
-from io import BytesIO
+from utils.image_utils import open_image
 import logging
 
 logger = logging.getLogger(__name__)
@@ -18,7 +17,7 @@ class ImageUpload(BasePlugin):
             raise RuntimeError("No images provided.")
         # Open the image using Pillow
         try:
-            image = Image.open(image_locations[img_index])
+            image = open_image(image_locations[img_index], self.get_render_dimensions(device_config))
         except Exception as e:
             logger.error(f"Failed to read image file: {str(e)}")
             raise RuntimeError("Failed to read image file.")
@@ -1,7 +1,6 @@
 from plugins.base_plugin.base_plugin import BasePlugin
+from utils.image_utils import fetch_image
 from PIL import Image
-from io import BytesIO
-import requests
 import logging
 
 logger = logging.getLogger(__name__)
@@ -9,9 +8,7 @@ logger = logging.getLogger(__name__)
 def grab_image(image_url, dimensions, timeout_ms=40000):
     """Grab an image from a URL and resize it to the specified dimensions."""
     try:
-        response = requests.get(image_url, timeout=timeout_ms / 1000)
-        response.raise_for_status()
-        img = Image.open(BytesIO(response.content))
+        img = fetch_image(image_url, dimensions, timeout=timeout_ms / 1000)
         img = img.resize(dimensions, Image.LANCZOS)
         return img
     except Exception as e:
@@ -19,14 +16,14 @@ def grab_image(image_url, dimensions, timeout_ms=40000):
         return None
 
 class ImageURL(BasePlugin):
+    device_ready = True
+
     def generate_image(self, settings, device_config):
         url = settings.get('url')
         if not url:
             raise RuntimeError("URL is required.")
 
-        dimensions = device_config.get_resolution()
-        if device_config.get_config("orientation") == "vertical":
-            dimensions = dimensions[::-1]
+        dimensions = self.get_render_dimensions(device_config)
 
         logger.info(f"Grabbing image from: {url}")
 
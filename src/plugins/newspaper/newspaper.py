@@ -25,7 +25,7 @@ class Newspaper(BasePlugin):
         image = None
         for date in days:
             image_url = FREEDOM_FORUM_URL.format(date.day, newspaper_slug)
-            image = get_image(image_url)
+            image = get_image(image_url, self.get_render_dimensions(device_config))
             if image:
                 logging.info(f"Found {newspaper_slug} front cover for {date.strftime('%Y-%m-%d')}")
                 break
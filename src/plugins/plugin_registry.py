@@ -3,14 +3,20 @@
 import os
 import importlib
 import logging
+import threading
+import time
 from utils.app_utils import resolve_path
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 PLUGINS_DIR = 'plugins'
+# plugin configs by id, their modules are only imported when an instance is first needed
+PLUGIN_MANIFESTS = {}
 PLUGIN_CLASSES = {}
+_load_lock = threading.Lock()
 
 def load_plugins(plugins_config):
+    """Registers the enabled plugins without importing them, only checking their module exists."""
     plugins_module_path = Path(resolve_path(PLUGINS_DIR))
     for plugin in plugins_config:
         plugin_id = plugin.get('id')
@@ -28,25 +34,38 @@ def load_plugins(plugins_config):
             logging.error(f"Could not find module path {module_path} for '{plugin_id}', skipping.")
             continue
 
-        module_name = f"plugins.{plugin_id}.{plugin_id}"
-        try:
-            module = importlib.import_module(module_name)
-            plugin_class = getattr(module, plugin.get("class"), None)
+        PLUGIN_MANIFESTS[plugin_id] = plugin
 
-            if plugin_class:
-                # Create an instance of the plugin class and add it to the plugin_classes dictionary
-                PLUGIN_CLASSES[plugin_id] = plugin_class(plugin)
+def _load_plugin(plugin_id):
+    plugin = PLUGIN_MANIFESTS[plugin_id]
+    module_name = f"plugins.{plugin_id}.{plugin_id}"
+    start = time.perf_counter()
+    try:
+        module = importlib.import_module(module_name)
+    except ImportError as e:
+        logging.error(f"Failed to import plugin module {module_name}: {e}")
+        return None
 
-        except ImportError as e:
-            logging.error(f"Failed to import plugin module {module_name}: {e}")
+    plugin_class = getattr(module, plugin.get("class"), None)
+    if not plugin_class:
+        logging.error(f"Plugin module {module_name} has no class '{plugin.get('class')}'")
+        return None
+
+    # Create an instance of the plugin class and add it to the plugin_classes dictionary
+    PLUGIN_CLASSES[plugin_id] = plugin_class(plugin)
+    logger.info(f"Loaded plugin {plugin_id} in {(time.perf_counter() - start) * 1000:.0f} ms")
+    return PLUGIN_CLASSES[plugin_id]
 
 def get_plugin_instance(plugin_config):
     plugin_id = plugin_config.get("id")
-    # Retrieve the plugin class factory function
+    # Retrieve the plugin instance, importing its module on first use
     plugin_class = PLUGIN_CLASSES.get(plugin_id)
-    
+    if plugin_class is None and plugin_id in PLUGIN_MANIFESTS:
+        with _load_lock:
+            plugin_class = PLUGIN_CLASSES.get(plugin_id) or _load_plugin(plugin_id)
+
     if plugin_class:
         # Initialize the plugin with its configuration
         return plugin_class
     else:
-        raise ValueError(f"Plugin '{plugin_id}' is not registered.")
\ No newline at end of file
+        raise ValueError(f"Plugin '{plugin_id}' is not registered.")
@@ -6,15 +6,15 @@ import logging
 logger = logging.getLogger(__name__)
 
 class Screenshot(BasePlugin):
+    device_ready = True
+
     def generate_image(self, settings, device_config):
 
         url = settings.get('url')
         if not url:
             raise RuntimeError("URL is required.")
 
-        dimensions = device_config.get_resolution()
-        if device_config.get_config("orientation") == "vertical":
-            dimensions = dimensions[::-1]
+        dimensions = self.get_render_dimensions(device_config)
 
         logger.info(f"Taking screenshot of url: {url}")
 
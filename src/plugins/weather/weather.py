@@ -31,6 +31,8 @@ AIR_QUALITY_URL = "http://api.openweathermap.org/data/2.5/air_pollution?lat={lat
 GEOCODING_URL = "http://api.openweathermap.org/geo/1.0/reverse?lat={lat}&lon={long}&limit=1&appid={api_key}"
 
 class Weather(BasePlugin):
+    device_ready = True
+
     def generate_settings_template(self):
         template_params = super().generate_settings_template()
         template_params['api_key'] = {
@@ -64,9 +66,7 @@ class Weather(BasePlugin):
             logger.error(f"Failed to make OpenWeatherMap request: {str(e)}")
             raise RuntimeError("OpenWeatherMap request failure, please check logs.")
 
-        dimensions = device_config.get_resolution()
-        if device_config.get_config("orientation") == "vertical":
-            dimensions = dimensions[::-1]
+        dimensions = self.get_render_dimensions(device_config)
 
         timezone = device_config.get_config("timezone", default="America/New_York")
         time_format = device_config.get_config("time_format", default="12h")
@@ -5,8 +5,10 @@ import logging
 import pytz
 from datetime import datetime, timezone
 from plugins.plugin_registry import get_plugin_instance
-from utils.image_utils import compute_image_hash
+from utils.fingerprint import compute_fingerprint
+from utils.image_store import get_image_store
 from model import RefreshInfo, PlaylistManager
+from display.display_worker import DisplayJob, DisplayWorker
 from PIL import Image
 
 logger = logging.getLogger(__name__)
@@ -18,6 +20,10 @@ class RefreshTask:
         self.device_config = device_config
         self.display_manager = display_manager
         self.app = app  # Flask app instance for creating application context
+        # each panel draws on its own worker, a slow panel does not hold up the others
+        self.display_workers = {
+            panel.name: DisplayWorker(panel, on_complete=self._on_display_complete) for panel in display_manager.panels
+        }
 
         self.thread = None
         self.lock = threading.Lock()
@@ -29,11 +35,20 @@ class RefreshTask:
         self.refresh_event.set()
         self.refresh_result = {}
 
-    def start(self):
-        """Starts the background thread for refreshing the display."""
+    def start(self, splash=None):
+        """
+        Starts the background thread for refreshing the display.
+
+        Args:
+            splash (BootSplash, optional): The boot splash, which may still be drawing. The first
+                refresh waits for it so it is not drawn over, then redraws what the panels showed
+                before, unless the splash is up for the first boot details.
+        """
         if not self.thread or not self.thread.is_alive():
             logger.info("Starting refresh task")
-            self.thread = threading.Thread(target=self._run, daemon=True)
+            for display_worker in self.display_workers.values():
+                display_worker.start()
+            self.thread = threading.Thread(target=self._run, args=(splash,), daemon=True)
             self.running = True
             self.thread.start()
 
@@ -45,96 +60,184 @@ class RefreshTask:
         if self.thread:
             logger.info("Stopping refresh task")
             self.thread.join()
+        for display_worker in self.display_workers.values():
+            display_worker.stop()
 
-    def _run(self):
+    def _run(self, splash=None):
         """Background task that manages the periodic refresh of the display.
 
         This function runs in a loop, sleeping for a configured duration (`scheduler_sleep_time`) or until manually
-        triggered via `manual_update()`. Detrmines the next plugin to refresh based on active playlists and
-        updates the display accordingly.
+        triggered via `manual_update()`. Detrmines the next plugin to refresh for each panel based on active
+        playlists and hands the rendered images to the panels' display workers.
 
         Workflow:
-        1. Waits for the configured sleep duration or until notified of a manual update.
+        1. Waits for the configured sleep duration or until notified of a manual update. After a boot splash
+           the first check runs right away and redraws the plugin instances the splash covered.
         2. Checks if a manual update has been requested:
-        - If so, refreshes the specified plugin immediately.
-        3. Otherwise, determines the next plugin to refresh based on the active playlist and generates an image.
-        4. Compares the image hash with the last displayed image hash.
-        - If the image has changed, updates the display.
-        - If the image is the same, skips the refresh.
+        - If so, refreshes the specified plugin immediately on the panels it applies to.
+        3. Otherwise, determines the next plugin to refresh for each panel based on the active playlist, or the
+           playlist the panel is bound to, and generates an image at the panel's resolution. The panels'
+           plugins render in parallel.
+        4. Submits each image to the panel's display worker, which draws it on its own thread.
+        - A newer image replaces one still waiting to be drawn.
+        - The display manager skips the refresh if the device framebuffer is unchanged.
         5. Updates the refresh metadata in the device configuration.
         6. Repeats the process until `stop()` is called.
 
-        Handles any exceptions that occur during the refresh process and ensures the refresh event is set
-        to indicate completion.
+        The scheduler lock is only held while deciding what to refresh and while updating the
+        config, so manual updates can be requested while a plugin renders or the panel draws.
 
         Exceptions:
         - Captures and logs any unexpected errors during execution to prevent the thread from exiting.
         """
+        # panels whose frame was replaced, redrawn on the first refresh check
+        redraw_panels = set()
+        if splash:
+            splash_panels = splash.join(self.display_manager)
+            if not splash.details:
+                redraw_panels.update(splash_panels)
+
         while True:
+            manual = False
             try:
                 with self.condition:
                     sleep_time = self.device_config.get_config("scheduler_sleep_time")
 
-                    # Wait for sleep_time or until notified
-                    self.condition.wait(timeout=sleep_time)
-                    self.refresh_result = {}
-                    self.refresh_event.clear()
+                    # Wait for sleep_time or until notified, a manual update requested
+                    # while the previous plugin rendered is handled right away
+                    if not self.manual_update_request and not redraw_panels:
+                        self.condition.wait(timeout=sleep_time)
 
                     # Exit if `stop()` is called
                     if not self.running:
                         break
 
                     playlist_manager = self.device_config.get_playlist_manager()
-                    latest_refresh = self.device_config.get_refresh_info()
                     current_dt = self._get_current_datetime()
 
-                    refresh_action = None
+                    refreshes = []
                     if self.manual_update_request:
                         # handle immediate update request
                         logger.info("Manual update requested")
                         refresh_action = self.manual_update_request
                         self.manual_update_request = ()
+                        manual = True
+                        refreshes = [(panel, refresh_action) for panel in self._get_target_panels(refresh_action)]
                     else:
                         # handle refresh based on playlists
                         logger.info(f"Running interval refresh check. | current_time: {current_dt.strftime('%Y-%m-%d %H:%M:%S')}")
-                        playlist, plugin_instance = self._determine_next_plugin(playlist_manager, latest_refresh, current_dt)
-                        if plugin_instance:
-                            refresh_action = PlaylistRefresh(playlist, plugin_instance)
-
-                    if refresh_action:
-                        plugin_config = self.device_config.get_plugin(refresh_action.get_plugin_id())
-                        if plugin_config is None:
-                            logger.error(f"Plugin config not found for '{refresh_action.get_plugin_id()}'.")
-                            continue
-                        plugin = get_plugin_instance(plugin_config)
-
-                        # Execute plugin within Flask application context
-                        with self.app.app_context():
-                            image = refresh_action.execute(plugin, self.device_config, current_dt)
-                        image_hash = compute_image_hash(image)
-
-                        refresh_info = refresh_action.get_refresh_info()
-                        refresh_info.update({"refresh_time": current_dt.isoformat(), "image_hash": image_hash})
-                        # check if image is the same as current image
-                        if image_hash != latest_refresh.image_hash:
-                            logger.info(f"Updating display. | refresh_info: {refresh_info}")
-                            self.display_manager.display_image(image, image_settings=plugin.config.get("image_settings", []))
-                        else:
-                            logger.info(f"Image already displayed, skipping refresh. | refresh_info: {refresh_info}")
+                        # panels showing the same playlist share one step of its cursor per check
+                        next_plugins = {}
+                        for panel in self.display_manager.panels:
+                            if panel.name in redraw_panels:
+                                refresh_action = self._get_redraw(playlist_manager, panel.device_config)
+                                if refresh_action:
+                                    refreshes.append((panel, refresh_action))
+                                    continue
+                            playlist, plugin_instance = self._determine_next_plugin(
+                                playlist_manager, panel.device_config, current_dt, next_plugins, force=panel.name in redraw_panels)
+                            if plugin_instance:
+                                refreshes.append((panel, PlaylistRefresh(playlist, plugin_instance)))
+                        redraw_panels.clear()
+
+                jobs, errors = self._refresh_panels(refreshes, current_dt)
 
+                with self.condition:
+                    for panel, job in jobs:
                         # update latest refresh data in the device config
-                        self.device_config.refresh_info = RefreshInfo(**refresh_info)
-
+                        panel.device_config.refresh_info = job.refresh_info
                     self.device_config.write_config()
+                    if manual:
+                        self.refresh_result = {"display_jobs": [job for _, job in jobs]}
+                        if errors:
+                            self.refresh_result["exception"] = errors[0]
 
             except Exception as e:
                 logging.exception('Exception during refresh')
-                self.refresh_result["exception"] = e  # Capture exception
+                if manual:
+                    self.refresh_result = {"exception": e}  # Capture exception
             finally:
-                self.refresh_event.set()
+                if manual:
+                    self.refresh_event.set()
+
+    def _refresh_panels(self, refreshes, current_dt):
+        """
+        Renders the refreshes of the panels, each on its own thread when there are several, so
+        a slow plugin on one panel does not hold up the others. Returns the submitted
+        (panel, job) pairs and the exceptions of the failed refreshes.
+        """
+        results = [None] * len(refreshes)
+
+        def refresh(index, panel, refresh_action):
+            try:
+                results[index] = self._refresh_panel(panel, refresh_action, current_dt)
+            except Exception as e:
+                logging.exception(f'Exception during refresh of panel {panel.name}')
+                results[index] = e
+
+        if len(refreshes) == 1:
+            refresh(0, *refreshes[0])
+        else:
+            threads = [
+                threading.Thread(target=refresh, args=(index, panel, refresh_action), name=f"refresh-{panel.name}", daemon=True)
+                for index, (panel, refresh_action) in enumerate(refreshes)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        jobs = [(panel, result) for (panel, _), result in zip(refreshes, results)
+                if result is not None and not isinstance(result, Exception)]
+        errors = [result for result in results if isinstance(result, Exception)]
+        return jobs, errors
+
+    def _refresh_panel(self, panel, refresh_action, current_dt):
+        """Renders the refresh action for a panel and submits it to the panel's display worker. Returns the job."""
+        plugin_config = self.device_config.get_plugin(refresh_action.get_plugin_id())
+        if plugin_config is None:
+            logger.error(f"Plugin config not found for '{refresh_action.get_plugin_id()}'.")
+            return None
+        plugin = get_plugin_instance(plugin_config)
+
+        # Execute plugin within Flask application context, at the panel's resolution and orientation
+        with self.app.app_context():
+            image = refresh_action.execute(plugin, panel.device_config, current_dt)
+        fingerprint = compute_fingerprint(image)
+
+        refresh_info = {"refresh_time": current_dt.isoformat(), **refresh_action.get_refresh_info()}
+        refresh_info["image_hash"] = fingerprint.digest
+        logger.info(f"Updating display. | panel: {panel.name} | refresh_info: {refresh_info}")
+
+        # the framebuffer hash is filled in once the display worker drew the frame
+        return self.display_workers[panel.name].submit(DisplayJob(
+            image,
+            image_settings=plugin.config.get("image_settings", []),
+            device_ready=plugin.device_ready,
+            cache_id=refresh_action.get_cache_id(),
+            fingerprint=fingerprint,
+            refresh_info=RefreshInfo(**refresh_info)
+        ))
+
+    def _get_target_panels(self, refresh_action):
+        """Returns the panels a manual update applies to, all panels if it applies to none in particular."""
+        panels = [panel for panel in self.display_manager.panels if refresh_action.applies_to(panel.device_config)]
+        return panels or self.display_manager.panels
+
+    def _on_display_complete(self, panel, job):
+        """Records the framebuffer shown by a display worker, unless a newer refresh took over."""
+        with self.condition:
+            if panel.device_config.refresh_info is job.refresh_info:
+                job.refresh_info.framebuffer_hash = panel.last_framebuffer_hash
+                self.device_config.write_config()
 
     def manual_update(self, refresh_action):
-        """Manually triggers an update for the specified plugin id and plugin settings by notifying the background process."""
+        """
+        Manually triggers an update for the specified plugin id and plugin settings by notifying the background process.
+
+        Returns once the panels finished drawing the frame, or once a newer frame replaced it
+        before it was drawn.
+        """
         if self.running:
             with self.condition:
                 self.manual_update_request = refresh_action
@@ -144,8 +247,15 @@ class RefreshTask:
                 self.condition.notify_all()  # Wake the thread to process manual update
 
             self.refresh_event.wait()
-            if self.refresh_result.get("exception"):
-                raise self.refresh_result.get("exception")
+            result = self.refresh_result
+            for job in result.get("display_jobs", []):
+                job.wait()
+                if job.exception:
+                    raise job.exception
+                if job.superseded:
+                    logger.info("Manual update was replaced by a newer frame before it was drawn")
+            if result.get("exception"):
+                raise result.get("exception")
         else:
             logger.warn("Background refresh task is not running, unable to do a manual update")
 
@@ -154,29 +264,60 @@ class RefreshTask:
         tz_str = self.device_config.get_config("timezone", default="UTC")
         return datetime.now(pytz.timezone(tz_str))
 
-    def _determine_next_plugin(self, playlist_manager, latest_refresh_info, current_dt):
-        """Determines the next plugin to refresh based on the active playlist, plugin cycle interval, and current time."""
-        playlist = playlist_manager.determine_active_playlist(current_dt)
-        if not playlist:
-            playlist_manager.active_playlist = None
-            logger.info(f"No active playlist determined.")
-            return None, None
+    def _get_redraw(self, playlist_manager, panel_config):
+        """Returns a refresh redrawing the playlist plugin instance the panel last showed, or None if there is none."""
+        refresh_info = panel_config.get_refresh_info()
+        if not refresh_info or refresh_info.refresh_type != "Playlist":
+            return None
+        playlist = playlist_manager.get_playlist(refresh_info.playlist)
+        plugin_instance = playlist.find_plugin(refresh_info.plugin_id, refresh_info.plugin_instance) if playlist else None
+        if not plugin_instance:
+            return None
+        logger.info(f"Redrawing panel {panel_config.panel_name or 'default'}. | plugin_instance: {plugin_instance.name}")
+        return RedrawRefresh(playlist, plugin_instance, refresh_info.refresh_time)
+
+    def _determine_next_plugin(self, playlist_manager, panel_config, current_dt, next_plugins=None, force=False):
+        """
+        Determines the next plugin to refresh on a panel based on the active playlist, or the playlist the
+        panel is bound to, the plugin cycle interval, and current time. With force the plugin cycle interval
+        is ignored.
+
+        Args:
+            next_plugins (dict, optional): The plugin chosen for each playlist during this refresh check.
+                Every panel showing a playlist gets the same plugin, so the playlist advances once per check
+                rather than once per panel.
+        """
+        next_plugins = {} if next_plugins is None else next_plugins
+        bound_playlist = panel_config.get_config("playlist", default=None)
+        if bound_playlist:
+            playlist = playlist_manager.get_playlist(bound_playlist)
+            if not playlist or not playlist.is_active(current_dt.strftime("%H:%M")):
+                logger.info(f"Playlist '{bound_playlist}' of panel {panel_config.panel_name} is not active.")
+                return None, None
+        else:
+            playlist = playlist_manager.determine_active_playlist(current_dt)
+            if not playlist:
+                playlist_manager.active_playlist = None
+                logger.info(f"No active playlist determined.")
+                return None, None
+            playlist_manager.active_playlist = playlist.name
 
-        playlist_manager.active_playlist = playlist.name
         if not playlist.plugins:
             logger.info(f"Active playlist '{playlist.name}' has no plugins.")
             return None, None
 
-        latest_refresh_dt = latest_refresh_info.get_refresh_datetime()
-        plugin_cycle_interval = self.device_config.get_config("plugin_cycle_interval_seconds", default=3600)
-        should_refresh = PlaylistManager.should_refresh(latest_refresh_dt, plugin_cycle_interval, current_dt)
+        latest_refresh_dt = panel_config.get_refresh_info().get_refresh_datetime()
+        plugin_cycle_interval = panel_config.get_config("plugin_cycle_interval_seconds", default=3600)
+        should_refresh = force or PlaylistManager.should_refresh(latest_refresh_dt, plugin_cycle_interval, current_dt)
 
         if not should_refresh:
             latest_refresh_str = latest_refresh_dt.strftime('%Y-%m-%d %H:%M:%S') if latest_refresh_dt else "None"
             logger.info(f"Not time to update display. | latest_update: {latest_refresh_str} | plugin_cycle_interval: {plugin_cycle_interval}")
             return None, None
 
-        plugin = playlist.get_next_plugin()
+        plugin = next_plugins.get(playlist.name)
+        if plugin is None:
+            plugin = next_plugins[playlist.name] = playlist.get_next_plugin()
         logger.info(f"Determined next plugin. | active_playlist: {playlist.name} | plugin_instance: {plugin.name}")
 
         return playlist, plugin
@@ -196,6 +337,14 @@ class RefreshAction:
         """Return the plugin ID associated with this refresh."""
         raise NotImplementedError("Subclasses must implement the get_plugin_id method.")
 
+    def get_cache_id(self):
+        """Return the id the display framebuffer of this refresh is cached under, or None to skip caching."""
+        return None
+
+    def applies_to(self, panel_config):
+        """Return whether a manual run of this refresh should be shown on the panel."""
+        return True
+
 class ManualRefresh(RefreshAction):
     """Performs a manual refresh based on a plugin's ID and its associated settings.
 
@@ -245,21 +394,55 @@ class PlaylistRefresh(RefreshAction):
         """Return the plugin ID associated with this refresh."""
         return self.plugin_instance.plugin_id
 
+    def get_cache_id(self):
+        """Return the id the display framebuffer of this plugin instance is cached under."""
+        return f"{self.playlist.name}/{self.plugin_instance.get_image_path()}"
+
+    def applies_to(self, panel_config):
+        """Return whether the panel shows this playlist, panels bound to another playlist do not."""
+        bound_playlist = panel_config.get_config("playlist", default=None)
+        return not bound_playlist or bound_playlist == self.playlist.name
+
     def execute(self, plugin, device_config, current_dt: datetime):
         """Performs a refresh for the specified plugin instance within its playlist context."""
-        # Determine the file path for the plugin's image
-        plugin_image_path = os.path.join(device_config.plugin_image_dir, self.plugin_instance.get_image_path())
+        image_store = get_image_store(device_config.plugin_image_dir)
+        image_name = self.plugin_instance.get_image_path()
+        if device_config.panel_name:
+            # panels differ in resolution and orientation, each keeps its own image
+            image_name = f"{device_config.panel_name}/{image_name}"
 
         # Check if a refresh is needed based on the plugin instance's criteria
-        if self.plugin_instance.should_refresh(current_dt):
+        image = None
+        if not self.plugin_instance.should_refresh(current_dt):
+            logger.info(f"Not time to refresh plugin instance, using latest image. | plugin_instance: {self.plugin_instance.name}.")
+            # Load the existing image from the image store
+            image = image_store.get(image_name)
+            if image is None:
+                logger.info(f"No stored image for plugin instance, refreshing. | plugin_instance: {self.plugin_instance.name}")
+
+        if image is None:
             logger.info(f"Refreshing plugin instance. | plugin_instance: '{self.plugin_instance.name}'")
             # Generate a new image
             image = plugin.generate_image(self.plugin_instance.settings, device_config)
-            image.save(plugin_image_path)
+            image_store.put(image_name, image)
             self.plugin_instance.latest_refresh_time = current_dt.isoformat()
-        else:
-            logger.info(f"Not time to refresh plugin instance, using latest image. | plugin_instance: {self.plugin_instance.name}.")
-            # Load the existing image from disk
-            image = Image.open(plugin_image_path)
 
         return image
+
+class RedrawRefresh(PlaylistRefresh):
+    """Shows a playlist plugin instance again after the panel's frame was replaced, such as by the boot splash.
+
+    Attributes:
+        refresh_time (str): Time of the refresh that drew the plugin instance, kept so the plugin cycle is not restarted.
+    """
+
+    def __init__(self, playlist, plugin_instance, refresh_time):
+        super().__init__(playlist, plugin_instance)
+        self.refresh_time = refresh_time
+
+    def get_refresh_info(self):
+        """Return refresh metadata as a dictionary."""
+        refresh_info = super().get_refresh_info()
+        if self.refresh_time:
+            refresh_info["refresh_time"] = self.refresh_time
+        return refresh_info
@@ -1,12 +1,17 @@
 import logging
 import os
 import socket
+import time
 
 from pathlib import Path
 from PIL import Image, ImageDraw, ImageFont, ImageOps
 
 logger = logging.getLogger(__name__)
 
+SAVED_FILE_DIR = os.path.join("static", "images", "saved")
+# uploads this recent may belong to a request still adding its plugin instance or to a manual update
+UPLOAD_GRACE_SECONDS = 10 * 60
+
 FONT_FAMILIES = {
     "Dogica": [{
         "font-weight": "normal",
@@ -18,6 +23,10 @@ FONT_FAMILIES = {
     "Jost": [{
         "font-weight": "normal",
         "file": "Jost.ttf"
+    },{
+        # Jost.ttf is a variable font, the light weight is drawn from the same file
+        "font-weight": "200",
+        "file": "Jost.ttf"
     },{
         "font-weight": "bold",
         "file": "Jost-SemiBold.ttf"
@@ -48,6 +57,10 @@ def resolve_path(file_path):
     src_path = Path(src_dir)
     return str(src_path / file_path)
 
+def get_cache_dir(name):
+    """Returns the path of a named cache directory under config/cache."""
+    return resolve_path(os.path.join("config", "cache", name))
+
 def get_ip_address():
     with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
         s.connect(("8.8.8.8", 80))
@@ -80,7 +93,14 @@ def get_font(font_name, font_size=50, font_weight="normal"):
 
         if font_entry:
             font_path = resolve_path(os.path.join("static", "fonts", font_entry["file"]))
-            return ImageFont.truetype(font_path, font_size)
+            font = ImageFont.truetype(font_path, font_size)
+            if font_entry["font-weight"].isdigit():
+                # set the weight axis of a variable font, static fonts have none
+                try:
+                    font.set_variation_by_axes([int(font_entry["font-weight"])])
+                except OSError:
+                    pass
+            return font
         else:
             logger.warn(f"Requested font weight not found: font_name={font_name}, font_weight={font_weight}")
     else:
@@ -103,21 +123,27 @@ def get_fonts():
 def get_font_path(font_name):
     return resolve_path(os.path.join("static", "fonts", FONTS[font_name]))
 
-def generate_startup_image(dimensions=(800,480)):
+def generate_startup_image(dimensions=(800,480), hostname=None, ip=None, details=True):
+    """
+    Renders the startup image. Without details the address line reads "Starting up", for
+    the boot splash that is drawn before the network is up.
+    """
     bg_color = (255,255,255)
     text_color = (0,0,0)
     width,height = dimensions
 
-    hostname = socket.gethostname()
-    ip = get_ip_address()
-
     image = Image.new("RGBA", dimensions, bg_color)
     image_draw = ImageDraw.Draw(image)
 
     title_font_size = width * 0.145
     image_draw.text((width/2, height/2), "inkywall", anchor="mm", fill=text_color, font=get_font("Jost", title_font_size))
 
-    text = f"To get started, visit http://{hostname}.local"
+    if details:
+        text = f"To get started, visit http://{hostname or socket.gethostname()}.local"
+        if ip:
+            text += f" ({ip})"
+    else:
+        text = "Starting up..."
     text_font_size = width * 0.032
     image_draw.text((width/2, height*3/4), text, anchor="mm", fill=text_color, font=get_font("Jost", text_font_size))
 
@@ -144,7 +170,7 @@ def handle_request_files(request_files, form_data={}):
 
         file_name = os.path.basename(file_name)
 
-        file_save_dir = resolve_path(os.path.join("static", "images", "saved"))
+        file_save_dir = resolve_path(SAVED_FILE_DIR)
         file_path = os.path.join(file_save_dir, file_name)
 
         # Open the image and apply EXIF transformation before saving
@@ -166,3 +192,30 @@ def handle_request_files(request_files, form_data={}):
         else:
             file_location_map[key] = file_path
     return file_location_map
+
+def remove_unused_uploads(playlist_manager):
+    """
+    Deletes uploaded files that no plugin instance setting refers to any more, called when
+    an instance is deleted or its settings change.
+    """
+    referenced = set()
+    for playlist in playlist_manager.playlists:
+        for plugin_instance in playlist.plugins:
+            for value in plugin_instance.settings.values():
+                for path in value if isinstance(value, list) else [value]:
+                    if isinstance(path, str):
+                        referenced.add(os.path.basename(path))
+
+    file_save_dir = resolve_path(SAVED_FILE_DIR)
+    now = time.time()
+    with os.scandir(file_save_dir) as entries:
+        for entry in entries:
+            if entry.name.startswith(".") or entry.name in referenced or not entry.is_file():
+                continue
+            try:
+                if now - entry.stat().st_mtime < UPLOAD_GRACE_SECONDS:
+                    continue
+                os.remove(entry.path)
+                logger.info(f"Removed unused upload {entry.name}")
+            except OSError as e:
+                logger.warning(f"Could not remove unused upload {entry.name}: {e}")
@@ -0,0 +1,420 @@
+import atexit
+import base64
+import json
+import logging
+import os
+import shutil
+import signal
+import subprocess
+import threading
+import time
+
+from utils.render_watchdog import get_render_limits, process_tree_cpu_seconds, ulimit_commands
+from utils.scratch import get_scratch_store
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PAGES = 1
+DEFAULT_TIMEOUT_MS = 30000
+
+CHROMIUM_ARGS = [
+    "--headless", "--no-sandbox", "--disable-gpu", "--disable-software-rasterizer",
+    "--disable-dev-shm-usage", "--hide-scrollbars", "--force-device-scale-factor=1",
+    "--no-first-run", "--no-default-browser-check", "--mute-audio", "--disable-extensions",
+    "--allow-file-access-from-files", "--remote-debugging-pipe"
+]
+
+WAIT_FOR_FONTS = "document.fonts.ready.then(() => true)"
+
+class DevToolsError(RuntimeError):
+    """Raised when a DevTools command fails or the browser connection is lost."""
+
+class DevToolsTimeout(DevToolsError):
+    """Raised when a DevTools command or event does not arrive before its deadline."""
+
+class PipeTransport:
+    """Sends and receives NUL delimited DevTools messages over Chromium's --remote-debugging-pipe."""
+
+    def __init__(self, read_fd, write_fd):
+        self.reader = os.fdopen(read_fd, "rb", buffering=0)
+        self.writer = os.fdopen(write_fd, "wb", buffering=0)
+        self.buffer = bytearray()
+
+    def send(self, message):
+        self.writer.write(json.dumps(message).encode("utf-8") + b"\0")
+
+    def receive(self):
+        """Returns the next message as a dictionary, or None once the browser closes the pipe."""
+        while True:
+            end = self.buffer.find(b"\0")
+            if end != -1:
+                raw = bytes(self.buffer[:end])
+                del self.buffer[:end + 1]
+                return json.loads(raw)
+
+            chunk = self.reader.read(65536)
+            if not chunk:
+                # the browser closed its end, ours is only released by the reading thread
+                self.reader.close()
+                return None
+            self.buffer.extend(chunk)
+
+    def close(self):
+        """
+        Closes the command pipe. The reply pipe is left to receive(), which sees the end of
+        it once the browser exits, since closing it under a blocked reader would let the
+        descriptor be reused by the next browser's pipe while the old reader still uses it.
+        """
+        try:
+            self.writer.close()
+        except OSError:
+            pass
+
+class _Waiter:
+    def __init__(self):
+        self.event = threading.Event()
+        self.message = None
+
+    def resolve(self, message):
+        self.message = message
+        self.event.set()
+
+    def wait(self, timeout):
+        return self.event.wait(timeout)
+
+class DevToolsConnection:
+    """
+    Minimal Chrome DevTools Protocol client.
+
+    The connection talks to any transport exposing send(dict), receive() -> dict or None
+    and close(), so tests can swap in a fake DevTools endpoint instead of a real browser.
+    """
+
+    def __init__(self, transport):
+        self.transport = transport
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.pending = {}
+        self.event_waiters = []
+        self.closed = False
+
+        self.reader = threading.Thread(target=self._read_loop, daemon=True)
+        self.reader.start()
+
+    def _read_loop(self):
+        while True:
+            try:
+                message = self.transport.receive()
+            except Exception as e:
+                logger.debug(f"DevTools transport read failed: {e}")
+                message = None
+            if message is None:
+                break
+
+            if "id" in message:
+                with self.lock:
+                    waiter = self.pending.pop(message["id"], None)
+                if waiter:
+                    waiter.resolve(message)
+            else:
+                with self.lock:
+                    matches = [entry for entry in self.event_waiters
+                               if entry[0] == message.get("method") and entry[1] == message.get("sessionId")]
+                    for entry in matches:
+                        self.event_waiters.remove(entry)
+                for _, _, waiter in matches:
+                    waiter.resolve(message)
+
+        # wake anyone still waiting, the browser is gone
+        with self.lock:
+            self.closed = True
+            waiters = list(self.pending.values()) + [entry[2] for entry in self.event_waiters]
+            self.pending.clear()
+            self.event_waiters.clear()
+        for waiter in waiters:
+            waiter.resolve(None)
+
+    def send(self, method, params=None, session_id=None, timeout=None):
+        """Sends a command and blocks until its result arrives, returning the result dictionary."""
+        waiter = _Waiter()
+        with self.lock:
+            if self.closed:
+                raise DevToolsError("DevTools connection is closed")
+            self.next_id += 1
+            message_id = self.next_id
+            self.pending[message_id] = waiter
+
+            message = {"id": message_id, "method": method, "params": params or {}}
+            if session_id:
+                message["sessionId"] = session_id
+            try:
+                self.transport.send(message)
+            except OSError as e:
+                self.pending.pop(message_id, None)
+                raise DevToolsError(f"Failed to send {method}: {e}")
+
+        if not waiter.wait(timeout):
+            with self.lock:
+                self.pending.pop(message_id, None)
+            raise DevToolsTimeout(f"Timed out waiting for {method}")
+        if waiter.message is None:
+            raise DevToolsError(f"DevTools connection closed during {method}")
+        if "error" in waiter.message:
+            raise DevToolsError(f"{method} failed: {waiter.message['error'].get('message')}")
+        return waiter.message.get("result", {})
+
+    def expect_event(self, method, session_id=None):
+        """Registers interest in an event before triggering it. Call wait(timeout) on the result."""
+        waiter = _Waiter()
+        with self.lock:
+            if self.closed:
+                waiter.resolve(None)
+            else:
+                self.event_waiters.append((method, session_id, waiter))
+        return waiter
+
+    def cancel_event(self, waiter):
+        """Drops a waiter from expect_event() that is no longer waited on."""
+        with self.lock:
+            self.event_waiters = [entry for entry in self.event_waiters if entry[2] is not waiter]
+
+    def close(self):
+        self.transport.close()
+
+def _remaining(deadline):
+    """Returns the seconds left until the deadline, never zero so a command still gets sent."""
+    return max(deadline - time.monotonic(), 0.1)
+
+class _Page:
+    def __init__(self, target_id, session_id):
+        self.target_id = target_id
+        self.session_id = session_id
+
+class BrowserPool:
+    """
+    Keeps a single headless Chromium alive and reuses its pages for screenshots.
+
+    Pages are driven over the DevTools protocol and screenshots are returned as PNG bytes,
+    so a render costs a navigation rather than a browser cold start. At most `max_pages`
+    renders run at once and a crashed or disconnected browser is relaunched on the next call.
+
+    Args:
+        chrome_cmd (str): Chromium executable to launch.
+        max_pages (int): Maximum number of concurrent renders.
+        connection_factory (callable, optional): Returns a DevToolsConnection in place of
+            launching Chromium, used to point the pool at a fake DevTools endpoint.
+    """
+
+    def __init__(self, chrome_cmd=None, max_pages=DEFAULT_MAX_PAGES, connection_factory=None):
+        self.chrome_cmd = chrome_cmd
+        self.connection_factory = connection_factory
+        self.semaphore = threading.BoundedSemaphore(max_pages)
+        self.lock = threading.Lock()
+
+        self.process = None
+        self.connection = None
+        self.user_data_dir = None
+        self.idle_pages = []
+        self.active_renders = 0
+
+    def screenshot(self, url, dimensions, timeout_ms=None, load_timeout_ms=None):
+        """
+        Loads the url in a pooled page and returns a PNG screenshot of the viewport as bytes.
+
+        Args:
+            timeout_ms (int, optional): Hard deadline of the whole render, from acquiring a page
+                to the screenshot. DevToolsTimeout is raised and the browser restarted past it.
+            load_timeout_ms (int, optional): How long to wait for the page to load, like
+                Chromium's --timeout. Loading is stopped past it and whatever has rendered is
+                captured.
+        """
+        deadline = time.monotonic() + (timeout_ms or DEFAULT_TIMEOUT_MS) / 1000
+        load_deadline = time.monotonic() + load_timeout_ms / 1000 if load_timeout_ms else None
+
+        with self.semaphore:
+            self._begin_render()
+            try:
+                return self._screenshot(url, dimensions, deadline, load_deadline)
+            finally:
+                with self.lock:
+                    self.active_renders -= 1
+
+    def _screenshot(self, url, dimensions, deadline, load_deadline):
+        for attempt in range(2):
+            connection = self._get_connection()
+            page = None
+            try:
+                page = self._acquire_page(connection, _remaining(deadline))
+                png, stopped = self._capture(connection, page, url, dimensions, deadline, load_deadline)
+                if stopped:
+                    # the stopped navigation may still fire events, the page is not reused
+                    self._close_page(connection, page)
+                else:
+                    self._release_page(connection, page)
+                return png
+            except DevToolsTimeout:
+                # a hung page can pin the CPU, kill the whole browser and start fresh next time
+                logger.error(f"Render of {url} hit its deadline, restarting the headless browser")
+                with self.lock:
+                    if connection is self.connection:
+                        self._shutdown()
+                raise
+            except DevToolsError as e:
+                if page:
+                    self._close_page(connection, page)
+                if not connection.closed or attempt:
+                    raise
+                logger.warning(f"Browser connection lost during render, restarting: {e}")
+
+    def _begin_render(self):
+        """
+        Relaunches the browser between renders once it used up the CPU budget, the pooled
+        counterpart of the RLIMIT_CPU one-off renders run under. Only checked while no other
+        render is in flight, so none is cut off.
+        """
+        cpu_seconds = get_render_limits().cpu_seconds
+        with self.lock:
+            if cpu_seconds and self.process and not self.active_renders and self.process.poll() is None:
+                used = process_tree_cpu_seconds(self.process.pid)
+                if used is not None and used >= cpu_seconds:
+                    logger.info(f"Headless browser used {used:.0f} s of CPU, relaunching it")
+                    self._shutdown()
+            self.active_renders += 1
+
+    def _get_connection(self):
+        with self.lock:
+            if self.connection and not self.connection.closed and \
+                    (self.process is None or self.process.poll() is None):
+                return self.connection
+
+            if self.connection:
+                logger.warning("Headless browser exited, relaunching")
+                self._shutdown()
+
+            start = time.monotonic()
+            if self.connection_factory:
+                self.connection = self.connection_factory()
+            else:
+                self.connection = self._launch()
+            logger.info(f"Headless browser ready in {(time.monotonic() - start) * 1000:.0f} ms")
+            return self.connection
+
+    def _launch(self):
+        if not self.chrome_cmd:
+            raise DevToolsError("No Chrome/Chromium browser configured for the render pool")
+
+        # chromium reads commands from fd 3 and writes replies to fd 4
+        parent_read, child_write = os.pipe()
+        child_read, parent_write = os.pipe()
+        self.user_data_dir = get_scratch_store().make_temp_dir()
+
+        command = [self.chrome_cmd] + CHROMIUM_ARGS + [f"--user-data-dir={self.user_data_dir}", "about:blank"]
+        # only the address space limit, the CPU budget is checked between renders
+        limits = ulimit_commands(get_render_limits(), cpu=False)
+        logger.info(f"Launching headless browser: {self.chrome_cmd}")
+        try:
+            self.process = subprocess.Popen(
+                ["bash", "-c", f'{limits}exec "$@" 3<&{child_read} 4>&{child_write}', "chromium"] + command,
+                pass_fds=(child_read, child_write),
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+                start_new_session=True
+            )
+        finally:
+            os.close(child_read)
+            os.close(child_write)
+
+        return DevToolsConnection(PipeTransport(parent_read, parent_write))
+
+    def _acquire_page(self, connection, timeout):
+        with self.lock:
+            if self.idle_pages:
+                return self.idle_pages.pop()
+
+        target_id = connection.send("Target.createTarget", {"url": "about:blank"}, timeout=timeout)["targetId"]
+        session_id = connection.send(
+            "Target.attachToTarget", {"targetId": target_id, "flatten": True}, timeout=timeout)["sessionId"]
+        connection.send("Page.enable", session_id=session_id, timeout=timeout)
+        return _Page(target_id, session_id)
+
+    def _release_page(self, connection, page):
+        with self.lock:
+            if connection is self.connection:
+                self.idle_pages.append(page)
+
+    def _close_page(self, connection, page):
+        try:
+            connection.send("Target.closeTarget", {"targetId": page.target_id}, timeout=5)
+        except DevToolsError:
+            pass
+
+    def _capture(self, connection, page, url, dimensions, deadline, load_deadline=None):
+        """Returns the PNG screenshot and whether loading was stopped at the load deadline."""
+        width, height = int(dimensions[0]), int(dimensions[1])
+        session_id = page.session_id
+
+        connection.send("Emulation.setDeviceMetricsOverride", {
+            "width": width, "height": height, "deviceScaleFactor": 1, "mobile": False
+        }, session_id=session_id, timeout=_remaining(deadline))
+
+        loaded = connection.expect_event("Page.loadEventFired", session_id)
+        result = connection.send("Page.navigate", {"url": url}, session_id=session_id, timeout=_remaining(deadline))
+        if result.get("errorText"):
+            connection.cancel_event(loaded)
+            raise DevToolsError(f"Failed to load {url}: {result['errorText']}")
+
+        stopped = False
+        wait_until = min(deadline, load_deadline) if load_deadline else deadline
+        if not loaded.wait(max(wait_until - time.monotonic(), 0)):
+            connection.cancel_event(loaded)
+            if not load_deadline or time.monotonic() >= deadline:
+                raise DevToolsTimeout(f"Timed out loading {url}")
+            logger.warning(f"{url} did not finish loading in time, capturing what has rendered")
+            connection.send("Page.stopLoading", session_id=session_id, timeout=_remaining(deadline))
+            stopped = True
+        elif loaded.message is None:
+            raise DevToolsError(f"DevTools connection closed while loading {url}")
+
+        if not stopped:
+            connection.send("Runtime.evaluate", {"expression": WAIT_FOR_FONTS, "awaitPromise": True},
+                            session_id=session_id, timeout=_remaining(deadline))
+
+        result = connection.send("Page.captureScreenshot", {
+            "format": "png",
+            "clip": {"x": 0, "y": 0, "width": width, "height": height, "scale": 1}
+        }, session_id=session_id, timeout=_remaining(deadline))
+        return base64.b64decode(result["data"]), stopped
+
+    def _shutdown(self):
+        self.idle_pages = []
+        if self.connection:
+            self.connection.close()
+            self.connection = None
+        if self.process:
+            if self.process.poll() is None:
+                try:
+                    os.killpg(self.process.pid, signal.SIGKILL)
+                except ProcessLookupError:
+                    pass
+            self.process.wait()
+            self.process = None
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+
+    def close(self):
+        """Terminates the browser and releases its resources."""
+        with self.lock:
+            self._shutdown()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_browser_pool(chrome_cmd):
+    """Returns the shared browser pool, creating it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(chrome_cmd)
+            atexit.register(_pool.close)
+        return _pool
@@ -0,0 +1,122 @@
+import logging
+import zlib
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TILE_SIZE = 64
+
+class ImageFingerprint:
+    """
+    Cheap content fingerprint of an image, split into square tiles.
+
+    The raw pixel buffer is hashed in the image's own mode, without converting it first,
+    using zlib's crc32 which runs at memory speed (and in hardware on ARMv8), along with the
+    palette of palette images. Each tile gets its own digest so callers can tell which regions
+    of two frames differ, and `digest` summarizes the whole image for a quick equality check.
+    Tile sizes must be a multiple of 8.
+
+    Attributes:
+        digest (str): Digest of the whole image, including its size and mode.
+        tile_hashes (list): Digest of each tile, row by row.
+        size (tuple): Image size as (width, height).
+        tile_size (int): Width and height of a tile in pixels.
+    """
+
+    def __init__(self, digest, tile_hashes, size, tile_size=DEFAULT_TILE_SIZE):
+        self.digest = digest
+        self.tile_hashes = tile_hashes
+        self.size = tuple(size)
+        self.tile_size = tile_size
+
+    @classmethod
+    def from_image(cls, image, tile_size=DEFAULT_TILE_SIZE):
+        width, height = image.size
+        # the raw pixel buffer in the image's own mode, no conversion
+        data = image.tobytes()
+        row_bytes = len(data) // height
+        if image.mode == "1":
+            tile_bytes = tile_size // 8
+        else:
+            tile_bytes = tile_size * row_bytes // width
+
+        columns = -(-width // tile_size)
+        bands = -(-height // tile_size)
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(height, row_bytes)
+
+        # palette images with the same indices but other colors look different, so the
+        # palette seeds every tile digest
+        seed = 0
+        if image.mode in ("P", "PA"):
+            seed = zlib.crc32(bytes(image.getpalette() or []) + repr(image.info.get("transparency")).encode("utf-8"))
+
+        # one pass lays every tile out contiguously, straight from the pixel view, so each
+        # hashes in a single call, the narrower last column stays zero padded
+        tiles = np.zeros((bands, columns, tile_size, tile_bytes), dtype=np.uint8)
+        full_bands, last_rows = divmod(height, tile_size)
+        for column in range(columns):
+            left = column * tile_bytes
+            source = pixels[:, left:left + tile_bytes]
+            tile_width = source.shape[1]
+            tiles[:full_bands, column, :, :tile_width] = source[:full_bands * tile_size].reshape(full_bands, tile_size, tile_width)
+            if last_rows:
+                tiles[full_bands, column, :last_rows, :tile_width] = source[full_bands * tile_size:]
+
+        tile_hashes = [f"{zlib.crc32(tile, seed):08x}" for tile in tiles[:full_bands].reshape(-1, tile_size * tile_bytes)]
+        if last_rows:
+            tile_hashes.extend(f"{zlib.crc32(tile[:last_rows], seed):08x}" for tile in tiles[full_bands])
+
+        header = f"{image.mode}:{width}x{height}:{tile_size}|".encode("utf-8")
+        digest = f"{zlib.crc32(header + ''.join(tile_hashes).encode('utf-8')):08x}"
+        return cls(digest, tile_hashes, (width, height), tile_size)
+
+    def to_dict(self):
+        return {
+            "digest": self.digest,
+            "tile_hashes": self.tile_hashes,
+            "size": list(self.size),
+            "tile_size": self.tile_size
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["digest"], data["tile_hashes"], data["size"], data.get("tile_size", DEFAULT_TILE_SIZE))
+
+    def get_tile_box(self, index):
+        """Returns the (left, top, right, bottom) box of the tile at the index."""
+        columns = -(-self.size[0] // self.tile_size)
+        left = (index % columns) * self.tile_size
+        top = (index // columns) * self.tile_size
+        return (left, top, min(left + self.tile_size, self.size[0]), min(top + self.tile_size, self.size[1]))
+
+    def changed_tiles(self, other):
+        """
+        Returns the boxes of the tiles that differ from another fingerprint, or None when the
+        two cannot be compared tile by tile (no previous fingerprint, or a different size or grid).
+        """
+        if other is None or not other.tile_hashes or other.size != self.size \
+                or other.tile_size != self.tile_size or len(other.tile_hashes) != len(self.tile_hashes):
+            return None
+        return [self.get_tile_box(index)
+                for index, (current, previous) in enumerate(zip(self.tile_hashes, other.tile_hashes))
+                if current != previous]
+
+def compute_fingerprint(image, tile_size=DEFAULT_TILE_SIZE):
+    """Returns the ImageFingerprint of a PIL image."""
+    return ImageFingerprint.from_image(image, tile_size)
+
+def merge_boxes(boxes):
+    """Merges overlapping or touching (left, top, right, bottom) boxes into bounding regions."""
+    regions = [list(box) for box in boxes]
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(regions)):
+            for j in range(len(regions) - 1, i, -1):
+                a, b = regions[i], regions[j]
+                if a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]:
+                    regions[i] = [min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])]
+                    del regions[j]
+                    merged = True
+    return [tuple(region) for region in regions]
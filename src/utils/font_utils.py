@@ -0,0 +1,187 @@
+import hashlib
+import html as html_lib
+import logging
+import os
+import re
+import string
+import threading
+import time
+
+from contextlib import contextmanager
+
+from utils.app_utils import FONT_FAMILIES, get_cache_dir, get_fonts
+
+try:
+    from fontTools import subset as font_subset
+except ImportError:
+    font_subset = None
+
+logger = logging.getLogger(__name__)
+
+FONT_FAMILY_PATTERN = re.compile(r"font-family\s*:\s*([^;}{<>\n]+)", re.IGNORECASE)
+CSS_CONTENT_PATTERN = re.compile(r"content\s*:\s*[\"']([^\"']*)[\"']", re.IGNORECASE)
+NON_TEXT_PATTERN = re.compile(r"<(style|script)\b.*?</\1\s*>|<!--.*?-->", re.IGNORECASE | re.DOTALL)
+TAG_PATTERN = re.compile(r"<[^>]*>")
+SCRIPT_PATTERN = re.compile(r"<script\b[^>]*>(.*?)</script\s*>", re.IGNORECASE | re.DOTALL)
+STRING_LITERAL_PATTERN = re.compile(r"([\"'`])((?:\\.|(?!\1)[^\\])*)\1", re.DOTALL)
+# scripts format numbers, times and units into labels (e.g. Chart.js axes), which no literal shows
+ALWAYS_INCLUDED_CHARACTERS = set(string.digits + string.punctuation + " ")
+
+# character sets kept per template before the least recently used subsets are removed
+MAX_SUBSETS_PER_TEMPLATE = 4
+# stands in for the @font-face rules while a template renders, until its fonts are known
+FONT_FACE_MARKER = "/* font-faces */"
+
+_stylesheet_cache = {}
+_subset_lock = threading.Lock()
+# subset paths referenced by pages still rendering, with their count, kept out of prune_subsets
+_subsets_in_use = {}
+_in_use_lock = threading.Lock()
+
+def _read_stylesheet(path):
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return ""
+    cached = _stylesheet_cache.get(path)
+    if cached and cached[0] == mtime:
+        return cached[1]
+    with open(path, encoding="utf-8") as f:
+        content = f.read()
+    _stylesheet_cache[path] = (mtime, content)
+    return content
+
+def get_used_font_families(html, style_sheets=[]):
+    """Returns the known font families named by font-family declarations in the html or its stylesheets."""
+    sources = [html] + [_read_stylesheet(path) for path in style_sheets]
+    declarations = " , ".join(d for source in sources for d in FONT_FAMILY_PATTERN.findall(source))
+
+    return {
+        family for family in FONT_FAMILIES
+        if re.search(rf"(?<![\w-]){re.escape(family)}(?![\w-])", declarations, re.IGNORECASE)
+    }
+
+def get_used_characters(html, style_sheets=[]):
+    """Returns the set of characters that can appear in the rendered document."""
+    text = html_lib.unescape(TAG_PATTERN.sub(" ", NON_TEXT_PATTERN.sub(" ", html)))
+    for script in SCRIPT_PATTERN.findall(html):
+        text += "".join(literal for _, literal in STRING_LITERAL_PATTERN.findall(script))
+    for path in style_sheets:
+        text += "".join(CSS_CONTENT_PATTERN.findall(_read_stylesheet(path)))
+
+    # cover text-transform without parsing it
+    characters = set(text) | set(text.upper()) | set(text.lower()) | ALWAYS_INCLUDED_CHARACTERS
+    return {c for c in characters if c.isprintable()}
+
+def subset_font(font_path, characters, cache_dir):
+    """Writes (or reuses) a subset of the font containing only the given characters and returns its path."""
+    text = "".join(sorted(characters))
+    digest = hashlib.sha1(f"{os.path.getmtime(font_path)}|{text}".encode("utf-8")).hexdigest()[:16]
+    name, extension = os.path.splitext(os.path.basename(font_path))
+    subset_path = os.path.join(cache_dir, f"{name}-{digest}{extension.lower()}")
+    try:
+        # only the access time marks the subset as recently used, its modification time is
+        # part of the render cache key of every page that references it
+        os.utime(subset_path, ns=(time.time_ns(), os.stat(subset_path).st_mtime_ns))
+        return subset_path
+    except FileNotFoundError:
+        pass
+
+    with _subset_lock:
+        if os.path.isfile(subset_path):
+            return subset_path
+
+        options = font_subset.Options()
+        options.layout_features = ["*"]
+        options.notdef_outline = True
+        options.hinting = False
+
+        font = font_subset.load_font(font_path, options)
+        try:
+            subsetter = font_subset.Subsetter(options)
+            subsetter.populate(text=text)
+            subsetter.subset(font)
+
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = f"{subset_path}.tmp"
+            font_subset.save_font(font, temp_path, options)
+            os.replace(temp_path, subset_path)
+        finally:
+            font.close()
+
+    logger.info(f"Created font subset {subset_path} ({len(text)} characters)")
+    return subset_path
+
+def prune_subsets(cache_dir, keep):
+    """Removes all but the `keep` most recently used subset files in the directory, sparing those in use."""
+    with _in_use_lock:
+        try:
+            entries = sorted(
+                (entry for entry in os.scandir(cache_dir) if entry.is_file() and not entry.name.endswith(".tmp")),
+                key=lambda entry: entry.stat().st_atime, reverse=True)
+        except OSError:
+            return
+        for entry in entries[keep:]:
+            if entry.path in _subsets_in_use:
+                continue
+            try:
+                os.remove(entry.path)
+            except OSError:
+                pass
+
+def _hold_subset(path):
+    with _in_use_lock:
+        _subsets_in_use[path] = _subsets_in_use.get(path, 0) + 1
+
+def release_font_faces(font_faces):
+    """Lets prune_subsets remove the subsets of entries from get_font_faces() again."""
+    with _in_use_lock:
+        for font in font_faces:
+            count = _subsets_in_use.get(font["url"])
+            if count is None:
+                continue
+            if count > 1:
+                _subsets_in_use[font["url"]] = count - 1
+            else:
+                del _subsets_in_use[font["url"]]
+
+def get_font_faces(html, style_sheets=[], template_name="default"):
+    """
+    Returns @font-face entries (in the get_fonts() format) for only the families the html uses.
+
+    If fontTools is installed each font is subset to the characters in the document. Subsets are
+    stored per template and character set under config/cache/fonts so repeat renders reuse them.
+    They are held until release_font_faces() is called, use_font_faces() does both.
+    """
+    families = get_used_font_families(html, style_sheets)
+    font_faces = [font for font in get_fonts() if font["font_family"] in families]
+    if not font_faces or font_subset is None:
+        return font_faces
+
+    characters = get_used_characters(html, style_sheets)
+    cache_dir = os.path.join(get_cache_dir("fonts"), os.path.splitext(os.path.basename(template_name))[0])
+    for font in font_faces:
+        try:
+            font["url"] = subset_font(font["url"], characters, cache_dir)
+            _hold_subset(font["url"])
+        except Exception as e:
+            logger.warning(f"Failed to subset font {font['url']}, using the full font: {e}")
+    prune_subsets(cache_dir, MAX_SUBSETS_PER_TEMPLATE * len(get_fonts()))
+    return font_faces
+
+@contextmanager
+def use_font_faces(html, style_sheets=[], template_name="default"):
+    """Yields the entries from get_font_faces(), keeping their subsets on disk until the render is done."""
+    font_faces = get_font_faces(html, style_sheets, template_name)
+    try:
+        yield font_faces
+    finally:
+        release_font_faces(font_faces)
+
+def format_font_faces(font_faces):
+    """Returns the @font-face rules for entries returned by get_font_faces()."""
+    return "\n".join(
+        f'@font-face {{ font-family: "{font["font_family"]}"; font-weight: {font["font_weight"]}; '
+        f'font-style: {font["font_style"]}; src: url({font["url"]}) format("truetype"); }}'
+        for font in font_faces
+    )
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_MAX_AGE_DAYS = 30
+
+INDEX_FILE = "index.json"
+BLOB_DIR = "blobs"
+
+class ImageStore:
+    """
+    Content-addressed store for plugin instance images.
+
+    Each image is saved once as a PNG named by the hash of its pixels, with fast compression
+    since the SD card write matters more than the file size. A small index maps names (plugin
+    instances) to their blob, hash, size and creation time, so re-storing an unchanged image
+    only updates the index and identical images from several instances share one file.
+
+    Entries not used for max_age_days are dropped, then the least recently used entries
+    until the blobs take up no more than max_bytes. The index also keeps the size of each
+    blob and how many entries refer to it, so eviction never scans the disk, and a blob is
+    removed as soon as its last entry is.
+    """
+
+    def __init__(self, root, max_bytes=DEFAULT_MAX_BYTES, max_age_days=DEFAULT_MAX_AGE_DAYS):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_age = max_age_days * 24 * 60 * 60
+        self.lock = threading.Lock()
+        self.index, self.blobs = self._read_index()
+
+    def _read_index(self):
+        try:
+            with open(os.path.join(self.root, INDEX_FILE)) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}, {}
+
+        if "entries" in data:
+            return data["entries"], data["blobs"]
+        # an index written before the blobs were tracked only has the entries
+        blobs = {}
+        for entry in data.values():
+            blob = blobs.setdefault(entry["blob"], {"size": entry["size"], "refs": 0})
+            blob["refs"] += 1
+        return data, blobs
+
+    def _write_index(self):
+        path = os.path.join(self.root, INDEX_FILE)
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"entries": self.index, "blobs": self.blobs}, f, indent=1)
+        os.replace(temp_path, path)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, BLOB_DIR, digest[:2], f"{digest}.png")
+
+    @staticmethod
+    def hash_image(image):
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{image.mode}:{image.size[0]}x{image.size[1]}|".encode("utf-8"))
+        digest.update(image.tobytes())
+        return digest.hexdigest()
+
+    def put(self, name, image):
+        """Stores the image under the name, writing it only if no identical image is stored. Returns its hash."""
+        digest = self.hash_image(image)
+        path = self._blob_path(digest)
+        blob = os.path.relpath(path, self.root)
+
+        with self.lock:
+            if blob not in self.blobs or not os.path.isfile(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                temp_path = f"{path}.tmp"
+                image.save(temp_path, format="PNG", compress_level=1)
+                os.replace(temp_path, path)
+                self.blobs[blob] = {"size": os.path.getsize(path), "refs": self.blobs.get(blob, {}).get("refs", 0)}
+            else:
+                logger.debug(f"Image for {name} already stored as {digest}")
+
+            # the previous image of the name is released after the new one is referenced, so
+            # an unchanged image keeps its blob
+            previous = self.index.get(name)
+            self.blobs[blob]["refs"] += 1
+            if previous:
+                self._release(previous)
+
+            now = time.time()
+            self.index[name] = {
+                "blob": blob,
+                "hash": digest,
+                "size": self.blobs[blob]["size"],
+                "created": now,
+                "used": now
+            }
+            self._evict(keep=name)
+            self._write_index()
+        return digest
+
+    def get(self, name):
+        """Returns the image stored under the name, or None if there is none."""
+        with self.lock:
+            entry = self.index.get(name)
+            if not entry:
+                return None
+            try:
+                image = Image.open(os.path.join(self.root, entry["blob"]))
+                image.load()
+            except OSError as e:
+                logger.warning(f"Stored image for {name} could not be read: {e}")
+                self._release(self.index.pop(name))
+                self._write_index()
+                return None
+            entry["used"] = time.time()
+            return image
+
+    def get_hash(self, name):
+        """Returns the hash of the image stored under the name, or None."""
+        entry = self.index.get(name)
+        return entry["hash"] if entry else None
+
+    def remove(self, name):
+        self.remove_matching(lambda other: other == name)
+
+    def remove_matching(self, match):
+        """Removes every image whose name the match function accepts, and blobs no longer used."""
+        with self.lock:
+            names = [name for name in self.index if match(name)]
+            for name in names:
+                self._release(self.index.pop(name))
+            if names:
+                self._write_index()
+
+    def _release(self, entry):
+        """Drops an entry's reference to its blob, deleting the file once nothing refers to it."""
+        blob = self.blobs.get(entry["blob"])
+        if blob is None:
+            return
+        blob["refs"] -= 1
+        if blob["refs"] > 0:
+            return
+        del self.blobs[entry["blob"]]
+        try:
+            os.remove(os.path.join(self.root, entry["blob"]))
+        except OSError:
+            pass
+
+    def _evict(self, keep=None):
+        now = time.time()
+        for name, entry in list(self.index.items()):
+            if name != keep and now - entry.get("used", entry["created"]) > self.max_age:
+                logger.info(f"Removing stored image for {name}, unused for {self.max_age // 86400} days")
+                self._release(self.index.pop(name))
+
+        # least recently used first, blobs shared by several entries are counted once
+        total = sum(blob["size"] for blob in self.blobs.values())
+        if total <= self.max_bytes:
+            return
+        entries = sorted(self.index.items(), key=lambda item: item[1].get("used", item[1]["created"]))
+        for name, entry in entries:
+            if total <= self.max_bytes:
+                break
+            if name == keep:
+                continue
+            del self.index[name]
+            blob = self.blobs.get(entry["blob"])
+            if blob and blob["refs"] == 1:
+                total -= blob["size"]
+            self._release(entry)
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+def get_image_store(root):
+    """Returns the shared image store for a directory, creating it on first use."""
+    with _stores_lock:
+        if root not in _stores:
+            os.makedirs(root, exist_ok=True)
+            _stores[root] = ImageStore(root)
+        return _stores[root]
@@ -3,23 +3,116 @@ from PIL import Image, ImageEnhance
 from io import BytesIO
 import os
 import logging
-import hashlib
+import shutil
 import tempfile
 import subprocess
 import sys
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from utils.browser_pool import get_browser_pool, DevToolsTimeout
+from utils.render_watchdog import run_supervised, record_render, get_render_limits
+from utils.scratch import get_scratch_store
 
 logger = logging.getLogger(__name__)
 
-def get_image(image_url):
-    response = requests.get(image_url)
+# refuse downloads and decodes beyond these, a 512 MB Pi cannot hold much more
+MAX_DOWNLOAD_BYTES = 40 * 1024 * 1024
+MAX_DECODE_PIXELS = 24_000_000
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+# most of the render deadline a page may spend loading before it is captured as it is
+LOAD_TIMEOUT_SHARE = 0.8
+
+def open_image(source, target_size=None, max_pixels=MAX_DECODE_PIXELS):
+    """
+    Opens an image, decoding no more pixels than needed to cover the target size.
+
+    JPEGs are decoded at the smallest 1/2, 1/4 or 1/8 scale that still covers the target,
+    other formats are shrunk by an integer factor with reduce() right after decoding, palette,
+    1 bit and 16 bit images being converted to a mode reduce() can average first.
+
+    Args:
+        source: A file path or file object.
+        target_size (tuple, optional): The (width, height) the image will be resized to.
+        max_pixels (int): Images that would decode to more pixels than this are refused.
+
+    Raises:
+        Image.DecompressionBombError: If the decoded image would be larger than max_pixels.
+    """
+    image = Image.open(source)
+    if target_size:
+        target_width, target_height = int(target_size[0]), int(target_size[1])
+        if image.format == "JPEG":
+            image.draft(image.mode, (target_width, target_height))
+
+    width, height = image.size
+    if width * height > max_pixels:
+        raise Image.DecompressionBombError(
+            f"Image size ({width}x{height}) exceeds the limit of {max_pixels} pixels")
+
+    if target_size:
+        factor = min(width // target_width, height // target_height)
+        if factor >= 2:
+            image = _to_reducible_mode(image).reduce(factor)
+    return image
+
+def _to_reducible_mode(image):
+    """Converts images whose pixels reduce() cannot average, palette indices, 1 bit and 16 bit integer pixels."""
+    if image.mode in ("P", "PA"):
+        has_alpha = image.mode == "PA" or "transparency" in image.info
+        return image.convert("RGBA" if has_alpha else "RGB")
+    if image.mode == "1":
+        return image.convert("L")
+    if image.mode.startswith("I;16"):
+        return image.convert("I")
+    return image
+
+def fetch_image(image_url, target_size=None, timeout=30, max_bytes=MAX_DOWNLOAD_BYTES):
+    """
+    Downloads an image and opens it with open_image().
+
+    The response body is streamed into a buffer and the download is abandoned once it
+    exceeds max_bytes.
+
+    Raises:
+        requests.HTTPError: If the server does not return the image.
+        ValueError: If the image is larger than max_bytes.
+    """
+    with requests.get(image_url, stream=True, timeout=timeout) as response:
+        if not (200 <= response.status_code < 300 or response.status_code == 304):
+            raise requests.HTTPError(
+                f"Received non-200 response from {image_url}: status_code: {response.status_code}",
+                response=response)
+
+        content_length = int(response.headers.get("Content-Length") or 0)
+        if content_length > max_bytes:
+            raise ValueError(f"Image at {image_url} is {content_length} bytes, the limit is {max_bytes}")
+
+        data = BytesIO()
+        for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+            data.write(chunk)
+            if data.tell() > max_bytes:
+                raise ValueError(f"Image at {image_url} exceeds the download limit of {max_bytes} bytes")
+
+    data.seek(0)
+    return open_image(data, target_size)
+
+def get_image(image_url, target_size=None):
     img = None
-    if 200 <= response.status_code < 300 or response.status_code == 304:
-        img = Image.open(BytesIO(response.content))
-    else:
-        logger.error(f"Received non-200 response from {image_url}: status_code: {response.status_code}")
+    try:
+        img = fetch_image(image_url, target_size)
+    except requests.HTTPError as e:
+        logger.error(str(e))
     return img
 
-def change_orientation(image, orientation, inverted=False):
+ORIENTATION_TRANSPOSE = {
+    90: Image.Transpose.ROTATE_90,
+    180: Image.Transpose.ROTATE_180,
+    270: Image.Transpose.ROTATE_270
+}
+
+def get_orientation_angle(orientation, inverted=False):
     if orientation == 'horizontal':
         angle = 0
     elif orientation == 'vertical':
@@ -27,23 +120,33 @@ def change_orientation(image, orientation, inverted=False):
 
     if inverted:
         angle = (angle + 180) % 360
+    return angle
 
-    return image.rotate(angle, expand=1)
+def change_orientation(image, orientation, inverted=False):
+    angle = get_orientation_angle(orientation, inverted)
 
-def resize_image(image, desired_size, image_settings=[]):
-    img_width, img_height = image.size
-    desired_width, desired_height = desired_size
-    desired_width, desired_height = int(desired_width), int(desired_height)
+    # quarter turns are lossless transposes, no resampling needed
+    if angle == 0:
+        return image
+    return image.transpose(ORIENTATION_TRANSPOSE[angle])
+
+def get_render_size(resolution, orientation):
+    """Returns the image size that becomes the device resolution after change_orientation."""
+    width, height = resolution
+    if orientation == 'vertical':
+        return (height, width)
+    return (width, height)
+
+def get_crop_box(image_size, desired_size, keep_width=False):
+    """Returns the (left, top, right, bottom) region of the image that matches the desired aspect ratio."""
+    img_width, img_height = image_size
+    desired_width, desired_height = int(desired_size[0]), int(desired_size[1])
 
     img_ratio = img_width / img_height
     desired_ratio = desired_width / desired_height
 
-    keep_width = "keep-width" in image_settings
-
     x_offset, y_offset = 0,0
     new_width, new_height = img_width,img_height
-    # Step 1: Determine crop dimensions
-    desired_ratio = desired_width / desired_height
     if img_ratio > desired_ratio:
         # Image is wider than desired aspect ratio
         new_width = int(img_height * desired_ratio)
@@ -55,34 +158,85 @@ def resize_image(image, desired_size, image_settings=[]):
         if not keep_width:
             y_offset = (img_height - new_height) // 2
 
-    # Step 2: Crop the image
-    cropped_image = image.crop((x_offset, y_offset, x_offset + new_width, y_offset + new_height))
-
-    # Step 3: Resize to the exact desired dimensions (if necessary)
-    return cropped_image.resize((desired_width, desired_height), Image.LANCZOS)
+    return (x_offset, y_offset, x_offset + new_width, y_offset + new_height)
 
-def apply_image_enhancement(img, image_settings={}):
-
-    # Apply Brightness
-    img = ImageEnhance.Brightness(img).enhance(image_settings.get("brigtness", 1.0))
-
-    # Apply Contrast
-    img = ImageEnhance.Contrast(img).enhance(image_settings.get("contrast", 1.0))
-
-    # Apply Saturation (Color)
-    img = ImageEnhance.Color(img).enhance(image_settings.get("saturation", 1.0))
+def resize_image(image, desired_size, image_settings=[]):
+    desired_size = (int(desired_size[0]), int(desired_size[1]))
+    box = get_crop_box(image.size, desired_size, "keep-width" in image_settings)
+
+    if image.size == desired_size and box == (0, 0, *desired_size):
+        return image
+
+    # crop and resize in one resampling pass, without materializing the cropped image
+    return image.resize(desired_size, Image.LANCZOS, box=box)
+
+def get_enhancement_lut(brightness=1.0, contrast=1.0, histogram=None):
+    """
+    Returns a 256 entry lookup table applying brightness then contrast like ImageEnhance does.
+
+    Contrast pivots around the mean gray level of the brightened image, derived from the L
+    histogram of the original image so the image itself is only traversed once. Where
+    brightening clips a channel the pivot can differ from ImageEnhance by a few levels.
+    """
+    lut = [min(255, max(0, int(value * brightness))) for value in range(256)]
+    if contrast == 1.0:
+        return lut
+
+    total = sum(histogram) if histogram else 0
+    if total:
+        mean = sum(lut[value] * count for value, count in enumerate(histogram)) / total
+    else:
+        mean = 128
+    mean = int(mean + 0.5)
+    return [min(255, max(0, int(mean + (value - mean) * contrast))) for value in lut]
+
+def apply_brightness_contrast(img, brightness=1.0, contrast=1.0):
+    """Applies brightness and contrast in a single lookup table pass, leaving any alpha band untouched."""
+    histogram = img.convert("L").histogram() if contrast != 1.0 else None
+    lut = get_enhancement_lut(brightness, contrast, histogram)
+    identity = list(range(256))
+    return img.point([entry for band in img.getbands() for entry in (identity if band == "A" else lut)])
+
+def get_enhancement_factors(image_settings={}):
+    """Returns the brightness, contrast, saturation and sharpness factors of the image settings."""
+    return tuple(float(image_settings.get(name, 1.0)) for name in ("brightness", "contrast", "saturation", "sharpness"))
+
+def apply_image_enhancement(img, image_settings={}, colors=True, timings=None):
+    """
+    Applies the brightness, contrast, saturation and sharpness of the image settings,
+    skipping factors of 1.0. Brightness and contrast run as a single lookup table pass.
+
+    Args:
+        img (PIL.Image): The image to enhance.
+        image_settings (dict): The enhancement factors.
+        colors (bool): Also apply brightness, contrast and saturation. When quantizing to a
+            device palette they are applied by the color table instead, see utils.quantize.
+        timings (dict, optional): Receives the duration in milliseconds of each stage that ran.
+    """
+    brightness, contrast, saturation, sharpness = get_enhancement_factors(image_settings)
+
+    def timed(stage, enhance, image):
+        start = time.perf_counter()
+        image = enhance(image)
+        if timings is not None:
+            timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+        return image
+
+    if colors:
+        # Apply Brightness and Contrast
+        if brightness != 1.0 or contrast != 1.0:
+            img = timed("brightness_contrast", lambda image: apply_brightness_contrast(image, brightness, contrast), img)
+
+        # Apply Saturation (Color)
+        if saturation != 1.0:
+            img = timed("saturation", lambda image: ImageEnhance.Color(image).enhance(saturation), img)
 
     # Apply Sharpness
-    img = ImageEnhance.Sharpness(img).enhance(image_settings.get("sharpness", 1.0))
+    if sharpness != 1.0:
+        img = timed("sharpness", lambda image: ImageEnhance.Sharpness(image).enhance(sharpness), img)
 
     return img
 
-def compute_image_hash(image):
-    """Compute SHA-256 hash of an image."""
-    image = image.convert("RGB")
-    img_bytes = image.tobytes()
-    return hashlib.sha256(img_bytes).hexdigest()
-
 def take_screenshot_html(html_str, dimensions, timeout_ms=None):
     image = None
     try:
@@ -138,32 +292,48 @@ def take_screenshot_html(html_str, dimensions, timeout_ms=None):
                     </style>"""
                     final_html = html_str[:head_end] + debug_styles + html_str[head_end:]
 
-        # Create a temporary HTML file
-        with tempfile.NamedTemporaryFile(suffix=".html", delete=False) as html_file:
-            html_file.write(final_html.encode("utf-8"))
-            html_file_path = html_file.name
-
-        image = take_screenshot(html_file_path, dimensions, timeout_ms)
-
-        # Remove html file
-        os.remove(html_file_path)
+        # Write the page to a memory-backed temporary file, removed once rendered
+        with get_scratch_store().temp_file(".html", final_html.encode("utf-8")) as html_file_path:
+            image = take_screenshot(html_file_path, dimensions, timeout_ms)
 
     except Exception as e:
         logger.error(f"Failed to take screenshot: {str(e)}")
 
     return image
 
+@lru_cache(maxsize=None)
+def get_chrome_command(is_local_dev=False):
+    """Returns the first available Chrome/Chromium executable, or None if none are installed."""
+    # Prioritize chromium-headless-shell for production (Raspberry Pi)
+    # Fall back to other Chrome installations for local development
+    if is_local_dev:
+        # Local development paths (macOS first, then Linux alternatives)
+        chrome_paths = [
+            "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",  # macOS Chrome
+            "google-chrome-stable",  # Linux alternative
+            "chromium",  # Linux alternative
+            "google-chrome",  # Linux alternative
+            "chromium-headless-shell",  # Original (try last for local dev)
+        ]
+    else:
+        # Production paths (Raspberry Pi / Linux)
+        chrome_paths = [
+            "chromium-headless-shell",  # R-Pi default
+        ]
+
+    for path in chrome_paths:
+        # For absolute paths, just check if file exists
+        if os.path.isabs(path):
+            if os.path.exists(path):
+                return path
+        # For relative paths/commands, check if available in PATH
+        elif shutil.which(path):
+            return path
+    return None
+
 def take_screenshot(target, dimensions, timeout_ms=None):
     image = None
     try:
-        # Create a temporary output file for the screenshot
-        with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as img_file:
-            img_file_path = img_file.name
-
-        # Check for different Chrome/Chromium installations
-        # Prioritize chromium-headless-shell for production (Raspberry Pi)
-        # Fall back to other Chrome installations for local development
-
         # Check if we're in local development mode from Flask app config
         is_local_dev = False
         try:
@@ -173,44 +343,39 @@ def take_screenshot(target, dimensions, timeout_ms=None):
             # We're outside of Flask application context, default to production mode
             is_local_dev = False
 
-        if is_local_dev:
-            # Local development paths (macOS first, then Linux alternatives)
-            chrome_paths = [
-                "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome",  # macOS Chrome
-                "google-chrome-stable",  # Linux alternative
-                "chromium",  # Linux alternative
-                "google-chrome",  # Linux alternative
-                "chromium-headless-shell",  # Original (try last for local dev)
-            ]
-        else:
-            # Production paths (Raspberry Pi / Linux)
-            chrome_paths = [
-                "chromium-headless-shell",  # R-Pi default
-            ]
-
-        chrome_cmd = None
-        for path in chrome_paths:
-            try:
-                # For absolute paths, just check if file exists
-                if os.path.isabs(path):
-                    if os.path.exists(path):
-                        chrome_cmd = path
-                        break
-                # For relative paths/commands, use 'which' to check if available in PATH
-                else:
-                    if subprocess.run(["which", path], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL).returncode == 0:
-                        chrome_cmd = path
-                        break
-            except:
-                continue
-
+        chrome_cmd = get_chrome_command(is_local_dev)
         if not chrome_cmd:
             logger.error("No Chrome/Chromium browser found for screenshots")
             return None
 
+        if not is_local_dev:
+            # Render through the persistent browser, falling back to a one-off process on failure
+            start = time.monotonic()
+            try:
+                url = Path(target).as_uri() if os.path.exists(target) else target
+                deadline_ms = get_render_limits().timeout_seconds * 1000
+                # like --timeout, a page still loading after timeout_ms is captured as it is,
+                # with time left before the hard deadline to take the screenshot
+                load_timeout_ms = min(timeout_ms, deadline_ms * LOAD_TIMEOUT_SHARE) if timeout_ms else None
+                png = get_browser_pool(chrome_cmd).screenshot(url, dimensions, deadline_ms, load_timeout_ms)
+                image = Image.open(BytesIO(png))
+                record_render("browser pool", time.monotonic() - start, "ok")
+                return image
+            except DevToolsTimeout as e:
+                # the page is hung, a one-off browser would most likely hang the same way
+                record_render("browser pool", time.monotonic() - start, "timeout")
+                logger.error(f"Screenshot timed out: {str(e)}")
+                return None
+            except Exception as e:
+                record_render("browser pool", time.monotonic() - start, "failed")
+                logger.warning(f"Browser pool render failed, launching a one-off browser: {str(e)}")
+
+        # Output path for the screenshot in memory-backed scratch storage
+        img_file_path = get_scratch_store().path(f"screenshot-{uuid.uuid4().hex}.png")
+
         if is_local_dev:
             # Create a temporary user data directory for isolated Chrome instance
-            with tempfile.TemporaryDirectory() as temp_user_data_dir:
+            with tempfile.TemporaryDirectory(prefix="chromium-", dir=get_scratch_store().root) as temp_user_data_dir:
                 # Build the base command - use native ARM on macOS for better performance
                 if sys.platform == "darwin" and chrome_cmd == "/Applications/Google Chrome.app/Contents/MacOS/Google Chrome":
                     # Force native ARM execution on macOS to avoid Rosetta performance issues
@@ -257,7 +422,11 @@ def take_screenshot(target, dimensions, timeout_ms=None):
         if timeout_ms:
             command.append(f"--timeout={timeout_ms}")
 
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # Run under the render watchdog so a hung page cannot stall the refresh loop
+        result = run_supervised(command, label="chromium screenshot")
+        if result.outcome == "timeout":
+            logger.error(f"Chrome did not finish within {get_render_limits().timeout_seconds}s")
+            return None
 
         # Log the command output for debugging
         if result.stdout:
@@ -0,0 +1,98 @@
+import sys
+import threading
+import time
+
+from importlib.abc import MetaPathFinder
+
+DEFAULT_REPORT_SIZE = 25
+
+class _TimedLoader:
+    """Wraps a module loader to time executing the module, nested imports included."""
+
+    def __init__(self, loader, profile):
+        self.loader = loader
+        self.profile = profile
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        # put the real loader back, only this one execution is timed
+        module.__spec__.loader = self.loader
+        module.__loader__ = self.loader
+        self.profile._enter()
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            self.profile._exit(module.__name__, time.perf_counter() - start)
+
+class ImportProfile(MetaPathFinder):
+    """
+    Records how long each module takes to import, in total and excluding its own imports.
+
+    Installed at the front of sys.meta_path, it finds modules through the other finders and
+    times their loaders. Only modules imported after start() are recorded.
+    """
+
+    def __init__(self):
+        self.timings = {}
+        self.local = threading.local()
+        self.lock = threading.Lock()
+
+    def find_spec(self, fullname, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    def _enter(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        stack.append(0.0)
+
+    def _exit(self, name, duration):
+        stack = self.local.stack
+        children = stack.pop()
+        if stack:
+            stack[-1] += duration
+        with self.lock:
+            self.timings[name] = (duration, duration - children)
+
+    def get_report(self, limit=DEFAULT_REPORT_SIZE):
+        """Returns (module, total ms, self ms) of the slowest imports, slowest first."""
+        with self.lock:
+            timings = sorted(self.timings.items(), key=lambda item: item[1][0], reverse=True)
+        return [(name, total * 1000, own * 1000) for name, (total, own) in timings[:limit]]
+
+    def format_report(self, limit=DEFAULT_REPORT_SIZE):
+        lines = [f"{'total ms':>10} {'self ms':>10}  module"]
+        for name, total, own in self.get_report(limit):
+            lines.append(f"{total:10.1f} {own:10.1f}  {name}")
+        with self.lock:
+            overall = sum(own for _, own in self.timings.values())
+        lines.append(f"{len(self.timings)} modules imported in {overall * 1000:.0f} ms")
+        return "\n".join(lines)
+
+_profile = None
+
+def start():
+    """Starts recording import times. Returns the profile."""
+    global _profile
+    if _profile is None:
+        _profile = ImportProfile()
+        sys.meta_path.insert(0, _profile)
+    return _profile
+
+def get_profile():
+    """Returns the running profile, or None if imports are not being profiled."""
+    return _profile
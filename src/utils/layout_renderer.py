@@ -0,0 +1,279 @@
+import logging
+from functools import lru_cache
+
+from PIL import Image, ImageDraw, ImageFont
+from utils.app_utils import get_font
+
+logger = logging.getLogger(__name__)
+
+class Box:
+    """
+    A flexbox style container.
+
+    Children are laid out along `direction` ("column" or "row") and positioned with
+    `justify` ("start", "center", "end", "space-between") on the main axis and `align`
+    ("start", "center", "end", "stretch") on the cross axis. Sizes are in pixels.
+    """
+
+    def __init__(self, *children, direction="column", justify="start", align="stretch", gap=0,
+                 padding=0, border=0, border_color=None, background=None, width=None, height=None, grow=0):
+        self.children = [child for child in children if child is not None]
+        self.direction = direction
+        self.justify = justify
+        self.align = align
+        self.gap = gap
+        self.padding = padding
+        self.border = border
+        self.border_color = border_color
+        self.background = background
+        self.width = width
+        self.height = height
+        self.grow = grow
+        self.rect = None
+
+class Text:
+    """
+    A block of text wrapped to the width of its container.
+
+    Lines that do not fit in `max_height` (or the space given by the parent) are dropped,
+    matching `overflow: hidden`. With `preserve_newlines` explicit line breaks are kept,
+    matching `white-space: pre-line`.
+    """
+
+    def __init__(self, text, font_family="Jost", font_size=16, font_weight="normal", color=None,
+                 text_align="center", line_height=1.2, preserve_newlines=False, max_height=None, grow=0):
+        self.text = str(text or "")
+        self.font = load_font(font_family, max(int(font_size), 1), font_weight)
+        self.font_size = max(int(font_size), 1)
+        self.color = color
+        self.text_align = text_align
+        self.line_height = line_height
+        self.preserve_newlines = preserve_newlines
+        self.max_height = max_height
+        self.grow = grow
+        self.lines = []
+        self.rect = None
+
+class Picture:
+    """An image scaled to fit within `width` x `height` while keeping its aspect ratio."""
+
+    def __init__(self, image, width=None, height=None, grow=0):
+        self.image = image
+        self.width = width
+        self.height = height
+        self.grow = grow
+        self.rect = None
+
+@lru_cache(maxsize=64)
+def load_font(font_family, font_size, font_weight="normal"):
+    font = get_font(font_family, font_size, font_weight)
+    if font is None:
+        font = ImageFont.load_default(font_size)
+    return font
+
+def wrap_text(text, font, max_width, preserve_newlines=False):
+    """Breaks text into lines no wider than max_width using the font's glyph metrics."""
+    paragraphs = text.split("\n") if preserve_newlines else [" ".join(text.split())]
+    lines = []
+    for paragraph in paragraphs:
+        words = paragraph.split()
+        if not words:
+            lines.append("")
+            continue
+
+        line = words[0]
+        for word in words[1:]:
+            candidate = f"{line} {word}"
+            if font.getlength(candidate) <= max_width:
+                line = candidate
+            else:
+                lines.append(line)
+                line = word
+        lines.append(line)
+
+    # hard break any single word that is still too wide
+    wrapped = []
+    for line in lines:
+        while line and font.getlength(line) > max_width and len(line) > 1:
+            split = len(line) - 1
+            while split > 1 and font.getlength(line[:split]) > max_width:
+                split -= 1
+            wrapped.append(line[:split])
+            line = line[split:]
+        wrapped.append(line)
+    return wrapped
+
+def _edges(node):
+    return getattr(node, "padding", 0) + getattr(node, "border", 0)
+
+def measure(node, max_width):
+    """Returns the (width, height) the node wants when given at most max_width pixels."""
+    if isinstance(node, Text):
+        lines = wrap_text(node.text, node.font, max_width, node.preserve_newlines)
+        line_px = node.font_size * node.line_height
+        height = len(lines) * line_px
+        if node.max_height is not None:
+            height = min(height, int(node.max_height // line_px) * line_px)
+        width = max((node.font.getlength(line) for line in lines), default=0)
+        return min(width, max_width), height
+
+    if isinstance(node, Picture):
+        img_width, img_height = node.image.size
+        box_width = min(node.width or img_width, max_width)
+        box_height = node.height or img_height
+        scale = min(box_width / img_width, box_height / img_height)
+        return img_width * scale, img_height * scale
+
+    edges = _edges(node) * 2
+    inner_max = (node.width if node.width is not None else max_width) - edges
+    sizes = []
+    remaining = inner_max
+    for child in node.children:
+        size = measure(child, inner_max if node.direction == "column" else max(remaining, 0))
+        sizes.append(size)
+        remaining -= size[0] + node.gap
+    gaps = node.gap * max(len(sizes) - 1, 0)
+
+    if node.direction == "column":
+        width = max((w for w, _ in sizes), default=0)
+        height = sum(h for _, h in sizes) + gaps
+    else:
+        width = sum(w for w, _ in sizes) + gaps
+        height = max((h for _, h in sizes), default=0)
+
+    width = node.width if node.width is not None else width + edges
+    height = node.height if node.height is not None else height + edges
+    return width, height
+
+def layout(node, x, y, width, height):
+    """Assigns a pixel rectangle to the node and all of its descendants."""
+    node.rect = (x, y, width, height)
+    if isinstance(node, Text):
+        node.lines = wrap_text(node.text, node.font, width, node.preserve_newlines)
+        return
+    if isinstance(node, Picture):
+        return
+
+    edges = _edges(node)
+    inner_x, inner_y = x + edges, y + edges
+    inner_w, inner_h = max(width - edges * 2, 0), max(height - edges * 2, 0)
+    column = node.direction == "column"
+    main_size = inner_h if column else inner_w
+    cross_size = inner_w if column else inner_h
+
+    sizes = []
+    remaining = inner_w
+    for child in node.children:
+        child_w, child_h = measure(child, inner_w if column else max(remaining, 0))
+        remaining -= child_w + node.gap
+        sizes.append([child_h, child_w] if column else [child_w, child_h])
+
+    used = sum(main for main, _ in sizes) + node.gap * max(len(sizes) - 1, 0)
+    free = main_size - used
+    total_grow = sum(child.grow for child in node.children)
+    if free > 0 and total_grow:
+        for size, child in zip(sizes, node.children):
+            size[0] += free * child.grow / total_grow
+        free = 0
+    elif free < 0:
+        # shrink the last children first so overflowing content is clipped, not overlapped
+        for size in reversed(sizes):
+            take = min(size[0], -free)
+            size[0] -= take
+            free += take
+            if free >= 0:
+                break
+
+    gap = node.gap
+    offset = 0
+    if node.justify == "center":
+        offset = free / 2
+    elif node.justify == "end":
+        offset = free
+    elif node.justify == "space-between" and len(sizes) > 1:
+        gap += free / (len(sizes) - 1)
+
+    position = offset
+    for (main, cross), child in zip(sizes, node.children):
+        if node.align == "stretch":
+            cross, cross_offset = cross_size, 0
+        else:
+            cross = min(cross, cross_size)
+            cross_offset = {"center": (cross_size - cross) / 2, "end": cross_size - cross}.get(node.align, 0)
+
+        if column:
+            layout(child, inner_x + cross_offset, inner_y + position, cross, main)
+        else:
+            layout(child, inner_x + position, inner_y + cross_offset, main, cross)
+        position += main + gap
+
+def draw(node, image, color="black"):
+    """Paints a laid out node onto the image. Text without a color inherits `color`."""
+    x, y, width, height = node.rect
+    image_draw = ImageDraw.Draw(image)
+
+    if isinstance(node, Text):
+        line_px = node.font_size * node.line_height
+        max_lines = int((height + 0.5) // line_px)
+        for index, line in enumerate(node.lines[:max_lines]):
+            if node.text_align == "center":
+                line_x, anchor = x + width / 2, "mm"
+            elif node.text_align == "right":
+                line_x, anchor = x + width, "rm"
+            else:
+                line_x, anchor = x, "lm"
+            line_y = y + index * line_px + line_px / 2
+            image_draw.text((line_x, line_y), line, font=node.font, fill=node.color or color, anchor=anchor)
+        return
+
+    if isinstance(node, Picture):
+        img_width, img_height = node.image.size
+        scale = min(width / img_width, height / img_height)
+        size = (max(int(img_width * scale), 1), max(int(img_height * scale), 1))
+        picture = node.image.resize(size, Image.LANCZOS)
+        position = (int(x + (width - size[0]) / 2), int(y + (height - size[1]) / 2))
+        image.paste(picture, position, picture if picture.mode == "RGBA" else None)
+        return
+
+    box = [x, y, x + width - 1, y + height - 1]
+    if node.background:
+        image_draw.rectangle(box, fill=node.background)
+    if node.border:
+        image_draw.rectangle(box, outline=node.border_color or color, width=int(node.border))
+    for child in node.children:
+        draw(child, image, color)
+
+def draw_frame(image, frame, rect, color, viewport_width):
+    """Draws one of the base plugin frame styles (see base_plugin/render/plugin.css) around rect."""
+    x0, y0, x1, y1 = rect
+    vw = viewport_width / 100
+    border = max(round(0.7 * vw), 1)
+    image_draw = ImageDraw.Draw(image)
+
+    if frame == "Rectangle":
+        image_draw.rectangle([x0, y0, x1 - 1, y1 - 1], outline=color, width=border)
+    elif frame == "Top and Bottom":
+        image_draw.rectangle([x0, y0, x1 - 1, y0 + border - 1], fill=color)
+        image_draw.rectangle([x0, y1 - border, x1 - 1, y1 - 1], fill=color)
+    elif frame == "Corner":
+        corner = round(10 * vw)
+        thin = max(round(0.5 * vw), 1)
+        image_draw.rectangle([x0, y0, x0 + corner - 1, y0 + border - 1], fill=color)
+        image_draw.rectangle([x0, y0, x0 + border - 1, y0 + corner - 1], fill=color)
+        image_draw.rectangle([x1 - corner, y1 - thin, x1 - 1, y1 - 1], fill=color)
+        image_draw.rectangle([x1 - thin, y1 - corner, x1 - 1, y1 - 1], fill=color)
+
+def frame_border_widths(frame, viewport_width):
+    """Returns the (top, right, bottom, left) border widths a frame style adds to the page."""
+    border = max(round(0.7 * viewport_width / 100), 1)
+    if frame == "Rectangle":
+        return border, border, border, border
+    if frame == "Top and Bottom":
+        return border, 0, border, 0
+    return 0, 0, 0, 0
+
+def render_layout(root, image, rect, color="black"):
+    """Lays out root inside rect = (x, y, width, height) of image and draws it."""
+    layout(root, *rect)
+    draw(root, image, color)
+    return image
@@ -0,0 +1,98 @@
+import logging
+import time
+
+from PIL import Image
+
+from utils.image_utils import get_crop_box, get_orientation_angle, get_render_size, apply_image_enhancement, ORIENTATION_TRANSPOSE
+from utils.quantize import quantize_image, get_color_table, DEFAULT_DITHER_MODE
+
+logger = logging.getLogger(__name__)
+
+class PostProcessor:
+    """
+    Prepares rendered images for the display in as few full image passes as possible.
+
+    Crop and resize run as one resampling call, the orientation change is a lossless
+    transpose, brightness and contrast are folded into a single lookup table pass and
+    stages whose setting is a no-op are skipped. Given a device palette the result is
+    quantized to it, so drivers receive an image they can send without converting, and
+    brightness, contrast and saturation come from a precomputed color table instead. The
+    duration of each stage that ran is kept in `timings` (milliseconds) after every call
+    to process().
+    """
+
+    def __init__(self):
+        self.timings = {}
+
+    def process(self, image, resolution, orientation, inverted=False, image_settings=[],
+                enhancement_settings={}, device_ready=False, palette=None, dither_mode=DEFAULT_DITHER_MODE):
+        """
+        Returns the image cropped, resized and rotated to the device resolution with the
+        device level enhancement settings applied.
+
+        Args:
+            image (PIL.Image): The rendered image.
+            resolution (tuple): Device resolution as (width, height).
+            orientation (str): "horizontal" or "vertical".
+            inverted (bool): Rotate the image by an additional 180 degrees.
+            image_settings (list): Plugin image settings, e.g. "keep-width".
+            enhancement_settings (dict): Brightness, contrast, saturation and sharpness factors.
+            device_ready (bool): The image was rendered at the orientation adjusted resolution.
+            palette (list, optional): Device colors to quantize the result to, as (r, g, b) tuples.
+            dither_mode (str): Dithering used when quantizing, see utils.quantize.
+        """
+        self.timings = {}
+
+        angle = get_orientation_angle(orientation, inverted)
+        render_size = get_render_size(resolution, orientation)
+
+        if device_ready and image.size == render_size:
+            image = self._transpose(image, angle)
+        elif "keep-width" in image_settings:
+            # keep-width crops from the rotated image's edge, so rotate first
+            image = self._transpose(image, angle)
+            image = self._resize(image, resolution, keep_width=True)
+        else:
+            # resize first so the rotation runs on the smaller image
+            image = self._resize(image, render_size)
+            image = self._transpose(image, angle)
+
+        settings = enhancement_settings or {}
+        if not palette:
+            return apply_image_enhancement(image, settings, timings=self.timings)
+
+        # sharpening looks at neighbouring pixels so it cannot be part of the color table
+        image = apply_image_enhancement(image, settings, colors=False, timings=self.timings)
+
+        start = time.perf_counter()
+        color_table = get_color_table(palette, settings)
+        if color_table is not None:
+            self._timed("color_table", start)
+
+        start = time.perf_counter()
+        image = quantize_image(image, palette, dither_mode, color_table)
+        self._timed("quantize", start)
+        return image
+
+    def _timed(self, stage, start):
+        self.timings[stage] = round((time.perf_counter() - start) * 1000, 2)
+
+    def _resize(self, image, size, keep_width=False):
+        size = (int(size[0]), int(size[1]))
+        box = get_crop_box(image.size, size, keep_width)
+        if image.size == size and box == (0, 0, *size):
+            return image
+
+        start = time.perf_counter()
+        image = image.resize(size, Image.LANCZOS, box=box)
+        self._timed("resize", start)
+        return image
+
+    def _transpose(self, image, angle):
+        if angle == 0:
+            return image
+
+        start = time.perf_counter()
+        image = image.transpose(ORIENTATION_TRANSPOSE[angle])
+        self._timed("rotate", start)
+        return image
@@ -0,0 +1,282 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from functools import lru_cache
+
+import numpy as np
+from PIL import Image
+
+from utils.app_utils import get_cache_dir
+from utils.image_utils import get_enhancement_factors
+
+logger = logging.getLogger(__name__)
+
+DITHER_MODES = ("none", "ordered", "blue-noise", "diffusion")
+DEFAULT_DITHER_MODE = "diffusion"
+
+BLUE_NOISE_SIZE = 64
+BAYER_SIZE = 8
+
+# the nearest color table covers 64 levels per channel, built in chunks to bound memory
+LUT_LEVELS = 64
+LUT_CHUNK = 32768
+
+# color tables kept on disk, they only change when the palette or image settings do
+MAX_COLOR_TABLES = 4
+# contrast of a color table pivots around a fixed gray, the frame's mean is not known in advance
+CONTRAST_PIVOT = 128
+
+_threshold_maps = {}
+_threshold_lock = threading.Lock()
+_color_tables = {}
+_color_table_lock = threading.Lock()
+
+def bayer_matrix(size=BAYER_SIZE):
+    """Returns a size x size ordered dither threshold map with values in (0, 1)."""
+    matrix = np.zeros((1, 1), dtype=np.int32)
+    while matrix.shape[0] < size:
+        matrix = np.block([[4 * matrix, 4 * matrix + 2], [4 * matrix + 3, 4 * matrix + 1]])
+    return (matrix + 0.5) / matrix.size
+
+def generate_blue_noise(size=BLUE_NOISE_SIZE, sigma=1.5, seed=0):
+    """
+    Returns a size x size blue noise threshold map with values in (0, 1), built with the
+    void-and-cluster method on a torus so the map tiles without seams.
+    """
+    rng = np.random.default_rng(seed)
+    count = size * size
+    offsets = np.minimum(np.arange(size), size - np.arange(size))
+    kernel = np.exp(-(offsets[:, None] ** 2 + offsets[None, :] ** 2) / (2 * sigma ** 2))
+
+    def splat(energy, index, sign):
+        y, x = divmod(int(index), size)
+        energy += sign * np.roll(np.roll(kernel, y, axis=0), x, axis=1)
+
+    def energy_of(pattern):
+        energy = np.zeros((size, size))
+        for index in np.flatnonzero(pattern):
+            splat(energy, index, 1)
+        return energy
+
+    # initial pattern, relaxed by moving the tightest cluster into the largest void
+    pattern = np.zeros(count, dtype=bool)
+    pattern[rng.choice(count, count // 10, replace=False)] = True
+    energy = energy_of(pattern).ravel()
+    while True:
+        cluster = np.argmax(np.where(pattern, energy, -np.inf))
+        pattern[cluster] = False
+        splat(energy.reshape(size, size), cluster, -1)
+        void = np.argmin(np.where(pattern, np.inf, energy))
+        pattern[void] = True
+        splat(energy.reshape(size, size), void, 1)
+        if void == cluster:
+            break
+
+    ranks = np.zeros(count, dtype=np.int32)
+    initial = int(pattern.sum())
+
+    # rank the initial points by removing the tightest cluster each step
+    remaining = pattern.copy()
+    energy = energy_of(remaining).ravel()
+    for rank in range(initial - 1, -1, -1):
+        cluster = np.argmax(np.where(remaining, energy, -np.inf))
+        remaining[cluster] = False
+        splat(energy.reshape(size, size), cluster, -1)
+        ranks[cluster] = rank
+
+    # rank the rest by filling the largest void each step
+    filled = pattern.copy()
+    energy = energy_of(filled).ravel()
+    for rank in range(initial, count):
+        void = np.argmin(np.where(filled, np.inf, energy))
+        filled[void] = True
+        splat(energy.reshape(size, size), void, 1)
+        ranks[void] = rank
+
+    return ((ranks + 0.5) / count).reshape(size, size)
+
+def get_threshold_map(mode):
+    """Returns the threshold map for "ordered" or "blue-noise" dithering, generating it once."""
+    with _threshold_lock:
+        if mode in _threshold_maps:
+            return _threshold_maps[mode]
+
+        if mode == "ordered":
+            threshold_map = bayer_matrix()
+        else:
+            # the blue noise map takes a moment to generate, keep it on disk
+            path = os.path.join(get_cache_dir("dither"), f"blue_noise_{BLUE_NOISE_SIZE}.npy")
+            try:
+                threshold_map = np.load(path)
+            except (OSError, ValueError):
+                threshold_map = generate_blue_noise()
+                try:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    np.save(path, threshold_map)
+                except OSError as e:
+                    logger.warning(f"Failed to store blue noise map: {e}")
+
+        _threshold_maps[mode] = threshold_map.astype(np.float32)
+        return _threshold_maps[mode]
+
+def cell_indices(pixels):
+    """Returns the lookup table cell of every pixel of an (height, width, 3) uint8 array."""
+    cells = pixels // (256 // LUT_LEVELS)
+    return (cells[:, :, 0].astype(np.uint32) * LUT_LEVELS + cells[:, :, 1]) * LUT_LEVELS + cells[:, :, 2]
+
+def nearest_indices(pixels, palette):
+    """Returns the index of the nearest palette color for every pixel of an (height, width, 3) uint8 array."""
+    lut = get_palette_lut(tuple(tuple(color) for color in palette))
+    return lut[cell_indices(pixels)]
+
+def enhance_colors(colors, brightness=1.0, contrast=1.0, saturation=1.0):
+    """
+    Applies brightness, contrast and saturation to an (n, 3) float array of colors, clipping
+    after each step, the color table counterpart of image_utils.apply_image_enhancement.
+    """
+    colors = np.clip(colors * brightness, 0, 255)
+    colors = np.clip(CONTRAST_PIVOT + (colors - CONTRAST_PIVOT) * contrast, 0, 255)
+    # ImageEnhance.Color blends with the L conversion of the image
+    gray = (colors @ np.array([0.299, 0.587, 0.114], dtype=np.float32))[:, np.newaxis]
+    return np.clip(gray + (colors - gray) * saturation, 0, 255)
+
+class ColorTable:
+    """
+    Lookup table over the RGB cube fusing global enhancement with palette mapping.
+
+    Attributes:
+        colors (numpy.ndarray): Enhanced (r, g, b) color of every cell, uint8 of shape (n, 3).
+        indices (numpy.ndarray): Nearest palette index of every enhanced color, uint8 of shape (n,).
+    """
+
+    def __init__(self, colors, indices):
+        self.colors = colors
+        self.indices = indices
+
+    @classmethod
+    def build(cls, palette, brightness=1.0, contrast=1.0, saturation=1.0):
+        step = 256 // LUT_LEVELS
+        levels = np.arange(LUT_LEVELS, dtype=np.float32) * step + (step - 1) / 2
+        grid = np.stack(np.meshgrid(levels, levels, levels, indexing="ij"), axis=-1).reshape(-1, 3)
+        enhanced = enhance_colors(grid, brightness, contrast, saturation)
+
+        indices = np.empty(len(grid), dtype=np.uint8)
+        palette_colors = np.asarray(palette, dtype=np.float32)
+        for start in range(0, len(grid), LUT_CHUNK):
+            chunk = enhanced[start:start + LUT_CHUNK, np.newaxis, :]
+            indices[start:start + LUT_CHUNK] = ((chunk - palette_colors) ** 2).sum(axis=2).argmin(axis=1)
+        return cls(np.rint(enhanced).astype(np.uint8), indices)
+
+@lru_cache(maxsize=8)
+def get_palette_lut(palette):
+    """
+    Returns the nearest palette index for every color at 6 bits per channel, as a flat array
+    indexed by (r // 4) * 4096 + (g // 4) * 64 + b // 4.
+    """
+    return ColorTable.build(palette).indices
+
+def get_color_table(palette, image_settings={}):
+    """
+    Returns the ColorTable for a palette and the brightness, contrast and saturation of the
+    image settings, or None if the settings leave colors unchanged.
+
+    Tables are kept in memory and under config/cache/color_tables, keyed by the palette and
+    settings, so they are only built again after the settings are changed.
+    """
+    factors = list(get_enhancement_factors(image_settings)[:3])
+    if factors == [1.0, 1.0, 1.0]:
+        return None
+
+    key_data = json.dumps({"palette": [list(color) for color in palette], "factors": factors,
+                           "levels": LUT_LEVELS, "pivot": CONTRAST_PIVOT})
+    key = hashlib.sha1(key_data.encode("utf-8")).hexdigest()[:16]
+
+    with _color_table_lock:
+        if key in _color_tables:
+            return _color_tables[key]
+
+        cache_dir = get_cache_dir("color_tables")
+        path = os.path.join(cache_dir, f"{key}.npz")
+        try:
+            with np.load(path) as data:
+                table = ColorTable(data["colors"], data["indices"])
+            os.utime(path)
+        except (OSError, ValueError, KeyError):
+            table = ColorTable.build(palette, *factors)
+            logger.info(f"Built color table {key} for image settings {factors}")
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                temp_path = f"{path}.tmp.npz"
+                np.savez(temp_path, colors=table.colors, indices=table.indices)
+                os.replace(temp_path, path)
+                _prune_color_tables(cache_dir)
+            except OSError as e:
+                logger.warning(f"Failed to store color table: {e}")
+
+        # settings rarely change, only the current table needs to stay in memory
+        _color_tables.clear()
+        _color_tables[key] = table
+        return table
+
+def _prune_color_tables(cache_dir):
+    entries = sorted((entry for entry in os.scandir(cache_dir) if entry.name.endswith(".npz")),
+                     key=lambda entry: entry.stat().st_mtime, reverse=True)
+    for entry in entries[MAX_COLOR_TABLES:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def make_palette_image(indices, palette):
+    image = Image.fromarray(indices, mode="P")
+    image.putpalette([channel for color in palette for channel in color])
+    return image
+
+def quantize_image(image, palette, mode=DEFAULT_DITHER_MODE, color_table=None):
+    """
+    Quantizes an image to the exact colors of a device palette.
+
+    With a color table the global enhancement is applied by the same lookup, without
+    dithering the lookup directly yields the palette indices.
+
+    Args:
+        image (PIL.Image): The image to quantize.
+        palette (list): (r, g, b) tuples, the position of each color is its index in the result.
+        mode (str): "none" for nearest color, "ordered" for Bayer dithering, "blue-noise" for
+            blue noise threshold dithering or "diffusion" for Floyd-Steinberg error diffusion.
+        color_table (ColorTable, optional): Enhancement to apply, from get_color_table().
+
+    Returns:
+        PIL.Image: A "P" mode image whose pixel values are indices into the palette.
+    """
+    if mode not in DITHER_MODES:
+        logger.warning(f"Unknown dithering mode '{mode}', using {DEFAULT_DITHER_MODE}")
+        mode = DEFAULT_DITHER_MODE
+
+    image = image.convert("RGB")
+    if color_table is not None:
+        cells = cell_indices(np.asarray(image))
+        if mode == "none":
+            return make_palette_image(color_table.indices[cells], palette)
+        image = Image.fromarray(color_table.colors[cells], mode="RGB")
+
+    if mode == "diffusion":
+        # error diffusion is sequential from pixel to pixel, Pillow runs it in C
+        palette_image = Image.new("P", (1, 1))
+        palette_image.putpalette([channel for color in palette for channel in color])
+        return image.quantize(palette=palette_image, dither=Image.Dither.FLOYDSTEINBERG)
+
+    pixels = np.asarray(image)
+    if mode != "none":
+        threshold_map = get_threshold_map(mode)
+        height, width = pixels.shape[:2]
+        size = threshold_map.shape[0]
+        offsets = threshold_map[np.arange(height)[:, None] % size, np.arange(width)[None, :] % size] - 0.5
+
+        # spread the threshold over the gap between neighbouring palette levels
+        levels = max(1, round(len(palette) ** (1 / 3)))
+        pixels = np.clip(pixels + (offsets * (255 / levels))[:, :, np.newaxis], 0, 255).astype(np.uint8)
+
+    return make_palette_image(nearest_indices(pixels, palette), palette)
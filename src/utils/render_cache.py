@@ -0,0 +1,109 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from urllib.parse import unquote, urlparse
+
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+
+# href="...", src="..." and url(...) references in rendered html
+ASSET_PATTERN = re.compile(r"""(?:href|src)\s*=\s*["']([^"']+)["']|url\(\s*["']?([^"')]+)["']?\s*\)""")
+
+def referenced_files(html):
+    """Returns the local file paths referenced by stylesheets, images and fonts in the html."""
+    paths = set()
+    for match in ASSET_PATTERN.finditer(html):
+        reference = (match.group(1) or match.group(2)).strip()
+        if reference.startswith("file://"):
+            reference = unquote(urlparse(reference).path)
+        if os.path.isabs(reference):
+            paths.add(reference)
+    return sorted(paths)
+
+class RenderCache:
+    """
+    On-disk cache of rendered images, addressed by the content that produced them.
+
+    The key covers the final html, the modification time and size of every local file it
+    references (stylesheets, fonts, images) and the render dimensions, so an unchanged page
+    is served from disk without starting a browser. Entries are evicted least recently used
+    first once the cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+    def make_key(self, html, dimensions):
+        digest = hashlib.sha256()
+        digest.update(html.encode("utf-8"))
+        digest.update(f"|{int(dimensions[0])}x{int(dimensions[1])}".encode("utf-8"))
+        for path in referenced_files(html):
+            try:
+                stat = os.stat(path)
+                digest.update(f"|{path}:{stat.st_mtime_ns}:{stat.st_size}".encode("utf-8"))
+            except OSError:
+                digest.update(f"|{path}:missing".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.png")
+
+    def get(self, key):
+        """Returns the cached image for the key, or None on a miss."""
+        path = self._path(key)
+        try:
+            image = Image.open(path)
+            image.load()
+            # touch the entry so eviction sees it as recently used
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        logger.info(f"Render cache hit: {key[:12]}")
+        return image
+
+    def put(self, key, image):
+        """Stores the image under the key and evicts old entries if the cache is over its size limit."""
+        path = self._path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            image.save(temp_path, format="PNG", compress_level=1)
+            os.replace(temp_path, path)
+        except OSError as e:
+            logger.warning(f"Failed to write render cache entry: {e}")
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            return
+        self.evict()
+
+    def evict(self):
+        with self.lock:
+            entries = []
+            total = 0
+            try:
+                with os.scandir(self.cache_dir) as scan:
+                    for entry in scan:
+                        if entry.name.endswith(".png"):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, stat.st_size, entry.path))
+                            total += stat.st_size
+            except OSError:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.debug(f"Evicted render cache entry {os.path.basename(path)}")
+                except OSError:
+                    pass
@@ -0,0 +1,164 @@
+import logging
+import os
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEOUT_SECONDS = 60
+DEFAULT_CPU_SECONDS = 120
+# Chromium reserves several GB of virtual address space on 64-bit systems, so the
+# address space limit is opt-in through the "render_limits" device config
+DEFAULT_MEMORY_MB = None
+
+class RenderLimits:
+    """
+    Resource limits applied to browser render processes.
+
+    Attributes:
+        timeout_seconds (float): Wall-clock deadline for a single render.
+        cpu_seconds (int): CPU time limit (RLIMIT_CPU) of each one-off render process, and
+            the CPU time after which the pooled browser is relaunched between renders.
+        memory_mb (int): Address space limit (RLIMIT_AS) in megabytes, or None for no limit.
+    """
+
+    def __init__(self, timeout_seconds=DEFAULT_TIMEOUT_SECONDS, cpu_seconds=DEFAULT_CPU_SECONDS,
+                 memory_mb=DEFAULT_MEMORY_MB):
+        self.timeout_seconds = timeout_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            timeout_seconds=data.get("timeout_seconds", DEFAULT_TIMEOUT_SECONDS),
+            cpu_seconds=data.get("cpu_seconds", DEFAULT_CPU_SECONDS),
+            memory_mb=data.get("memory_mb", DEFAULT_MEMORY_MB)
+        )
+
+class RenderResult:
+    """Outcome of a supervised render process."""
+
+    def __init__(self, returncode, stdout, stderr, duration, outcome):
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.outcome = outcome
+
+_limits = RenderLimits()
+_stats = deque(maxlen=50)
+_stats_lock = threading.Lock()
+
+def set_render_limits(config):
+    """Sets the limits used for all renders from the "render_limits" device config dictionary."""
+    global _limits
+    _limits = RenderLimits.from_dict(config or {})
+    logger.info(f"Render limits: timeout {_limits.timeout_seconds}s, cpu {_limits.cpu_seconds}s, "
+                f"memory {_limits.memory_mb or 'unlimited'} MB")
+
+def get_render_limits():
+    return _limits
+
+def record_render(label, duration, outcome):
+    """Stores the duration and outcome ("ok", "failed", "timeout" or "killed") of a render."""
+    with _stats_lock:
+        _stats.append({"label": label, "duration_ms": round(duration * 1000), "outcome": outcome, "time": time.time()})
+    log = logger.info if outcome == "ok" else logger.warning
+    log(f"Render {label} finished | outcome: {outcome} | duration: {duration * 1000:.0f} ms")
+
+def get_render_stats():
+    """Returns the most recent render records, oldest first."""
+    with _stats_lock:
+        return list(_stats)
+
+def ulimit_commands(limits, cpu=True):
+    """
+    Returns the bash ulimit commands applying the CPU (RLIMIT_CPU) and address space
+    (RLIMIT_AS) limits, to run in a wrapper shell ahead of exec so every process a browser
+    forks inherits them. Nothing runs in the forked child of this multi-threaded process.
+
+    Args:
+        cpu (bool): Include the CPU limit. RLIMIT_CPU counts over the whole life of a
+            process, so it is left out for long-lived browsers.
+    """
+    commands = []
+    if cpu and limits.cpu_seconds:
+        # SIGXCPU at the soft limit, SIGKILL five seconds of CPU time later, the soft limit
+        # goes first as the hard limit cannot drop below it
+        commands += [f"ulimit -S -t {int(limits.cpu_seconds)}", f"ulimit -H -t {int(limits.cpu_seconds) + 5}"]
+    if limits.memory_mb:
+        commands.append(f"ulimit -v {int(limits.memory_mb) * 1024}")
+    return "".join(f"{command} 2>/dev/null; " for command in commands)
+
+def limited_command(command, limits):
+    """Returns the command wrapped in a shell that applies the render limits before exec."""
+    commands = ulimit_commands(limits)
+    if not commands:
+        return command
+    return ["bash", "-c", f'{commands}exec "$@"', "render"] + list(command)
+
+def process_tree_cpu_seconds(session_id):
+    """
+    Returns the CPU time in seconds used by the processes of a session started with
+    start_new_session=True, including exited children they reaped, or None without /proc.
+    """
+    total = 0
+    try:
+        pids = [entry for entry in os.listdir("/proc") if entry.isdigit()]
+    except OSError:
+        return None
+    for pid in pids:
+        try:
+            with open(f"/proc/{pid}/stat") as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # fields after the parenthesized command name, starting with the state (field 3)
+        fields = stat[stat.rfind(")") + 2:].split()
+        if int(fields[3]) == session_id:
+            total += sum(int(value) for value in fields[11:15])
+    return total / os.sysconf("SC_CLK_TCK")
+
+def kill_process_group(process):
+    """Kills a process started with start_new_session=True along with everything it spawned."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def run_supervised(command, label="screenshot", limits=None):
+    """
+    Runs a render command in its own process group under a wall-clock deadline.
+
+    The process group is killed outright when the deadline passes, so helper processes a
+    browser forks do not outlive it. Returns a RenderResult and records the outcome.
+    """
+    limits = limits or _limits
+    start = time.monotonic()
+    process = subprocess.Popen(limited_command(command, limits), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                               start_new_session=True)
+
+    try:
+        stdout, stderr = process.communicate(timeout=limits.timeout_seconds)
+        if process.returncode == 0:
+            outcome = "ok"
+        elif process.returncode < 0:
+            outcome = "killed"
+        else:
+            outcome = "failed"
+    except subprocess.TimeoutExpired:
+        logger.error(f"Render {label} exceeded {limits.timeout_seconds}s, killing process group {process.pid}")
+        kill_process_group(process)
+        stdout, stderr = process.communicate()
+        outcome = "timeout"
+    finally:
+        # reap anything left behind in the group, e.g. orphaned renderer processes
+        kill_process_group(process)
+
+    duration = time.monotonic() - start
+    record_render(label, duration, outcome)
+    return RenderResult(process.returncode, stdout, stderr, duration, outcome)
@@ -0,0 +1,130 @@
+import logging
+import os
+import tempfile
+import threading
+import uuid
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# directories created for browser profiles, managed by their owners rather than the size cap
+UNMANAGED_PREFIX = "chromium-"
+
+def find_memory_backed_dir():
+    """Returns a writable memory-backed directory, falling back to the system temp directory."""
+    candidates = [
+        os.getenv("RUNTIME_DIRECTORY"),  # set by systemd from RuntimeDirectory=, a tmpfs under /run
+        "/dev/shm",
+        os.getenv("XDG_RUNTIME_DIR"),
+    ]
+    for candidate in candidates:
+        if candidate and os.path.isdir(candidate) and os.access(candidate, os.W_OK):
+            return candidate
+    return tempfile.gettempdir()
+
+class ScratchStore:
+    """
+    Memory-backed storage for transient render artifacts.
+
+    Temporary html pages, screenshots, the current display image and local development frames
+    are written here instead of to the SD card. Files persist only until reboot and the store
+    removes the oldest files once its total size exceeds max_bytes, except pinned files such
+    as the current image the web UI serves.
+    """
+
+    def __init__(self, root=None, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root or os.path.join(find_memory_backed_dir(), "inkywall")
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.pinned = set()
+        os.makedirs(self.root, exist_ok=True)
+
+    def path(self, *names):
+        """Returns the path of a file in the store, creating its parent directory."""
+        path = os.path.join(self.root, *names)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return path
+
+    def pinned_path(self, *names):
+        """Returns the path of a file in the store that enforce_limit never removes."""
+        path = self.path(*names)
+        with self.lock:
+            self.pinned.add(path)
+        return path
+
+    @contextmanager
+    def temp_file(self, suffix="", data=None):
+        """Yields the path of a uniquely named file, optionally pre-filled with data, and removes it afterwards."""
+        path = self.path(f"tmp-{uuid.uuid4().hex}{suffix}")
+        try:
+            if data is not None:
+                with open(path, "wb") as f:
+                    f.write(data)
+            yield path
+        finally:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    def make_temp_dir(self, prefix=UNMANAGED_PREFIX):
+        """Creates a directory in the store that the caller is responsible for removing."""
+        return tempfile.mkdtemp(prefix=prefix, dir=self.root)
+
+    def save_image(self, image, *names, **save_args):
+        """Saves a PIL image into the store, then enforces the size limit. Returns the file path."""
+        path = self.path(*names)
+        image.save(path, **save_args)
+        self.enforce_limit(keep=path)
+        return path
+
+    def save_bytes(self, data, *names):
+        """Writes data to a file in the store, then enforces the size limit. Returns the file path."""
+        path = self.path(*names)
+        with open(path, "wb") as f:
+            f.write(data)
+        self.enforce_limit(keep=path)
+        return path
+
+    def enforce_limit(self, keep=None):
+        """Removes the least recently modified files until the store is under max_bytes."""
+        with self.lock:
+            files = []
+            total = 0
+            for directory, subdirectories, filenames in os.walk(self.root):
+                subdirectories[:] = [d for d in subdirectories if not d.startswith(UNMANAGED_PREFIX)]
+                for filename in filenames:
+                    path = os.path.join(directory, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, path))
+                    total += stat.st_size
+
+            files.sort()
+            for _, size, path in files:
+                if total <= self.max_bytes:
+                    break
+                if path == keep or path in self.pinned:
+                    continue
+                try:
+                    os.remove(path)
+                    total -= size
+                    logger.debug(f"Removed scratch file {path}")
+                except OSError:
+                    pass
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_scratch_store():
+    """Returns the shared scratch store, creating it on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = ScratchStore()
+            logger.info(f"Using scratch directory {_store.root}")
+        return _store
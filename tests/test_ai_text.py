@@ -0,0 +1,42 @@
+import os
+import re
+
+from PIL import Image, ImageDraw
+
+from plugins.ai_text.ai_text import AIText
+from utils.app_utils import get_font, resolve_path
+
+CSS_FILE = resolve_path(os.path.join("plugins", "ai_text", "render", "ai_text.css"))
+
+def css_rule(css, selector):
+    return dict(re.findall(r"([\w-]+)\s*:\s*([^;]+);", re.search(rf"{re.escape(selector)}\s*{{([^}}]*)}}", css).group(1)))
+
+def ink(font, text="Illumination"):
+    image = Image.new("L", (font.size * len(text), font.size * 2), 0)
+    ImageDraw.Draw(image).text((0, 0), text, fill=255, font=font)
+    return sum(image.getdata())
+
+def test_native_layout_matches_template_sizing():
+    with open(CSS_FILE) as f:
+        css = f.read()
+    container, content = css_rule(css, ".text-content"), css_rule(css, ".content")
+    width, height = 700, 400
+    viewport_height = 480
+
+    root = AIText.__new__(AIText).build_native_layout(
+        "ai_text.html", {"title": "Title", "content": "Some text", "width": 800, "height": viewport_height},
+        (width, height))
+    title, text = root.children
+
+    # gap: 1dvh is a percent of the viewport height, not of the content box
+    gap_dvh = float(re.fullmatch(r"([\d.]+)dvh", container["gap"]).group(1))
+    assert root.gap == viewport_height * gap_dvh / 100
+
+    # font-size: min(Xcqh, Ycqi) of the content box
+    cqh, cqi = map(float, re.fullmatch(r"min\(([\d.]+)cqh,\s*([\d.]+)cqi\)", content["font-size"]).groups())
+    assert text.font_size == int(min(height * cqh / 100, width * cqi / 100))
+    assert text.max_height == height * float(content["max-height"].rstrip("%")) / 100
+
+    # font-weight: the light weight draws thinner strokes than the regular one
+    assert content["font-weight"] == "200"
+    assert ink(text.font) < ink(get_font("Jost", text.font_size, "normal")) * 0.8
@@ -0,0 +1,25 @@
+import os
+import time
+
+from model import PlaylistManager, Playlist
+from utils import app_utils
+
+def test_remove_unused_uploads(tmp_path, monkeypatch):
+    monkeypatch.setenv("SRC_DIR", str(tmp_path))
+    saved = tmp_path / app_utils.SAVED_FILE_DIR
+    saved.mkdir(parents=True)
+    for name in (".gitignore", "kept.png", "listed.jpg", "unused.png", "recent.png"):
+        (saved / name).write_bytes(b"")
+    old = time.time() - app_utils.UPLOAD_GRACE_SECONDS - 60
+    for name in ("kept.png", "listed.jpg", "unused.png"):
+        os.utime(saved / name, (old, old))
+
+    playlist = Playlist("Default", "00:00", "24:00", [{
+        "plugin_id": "image_upload",
+        "name": "photos",
+        "plugin_settings": {"imageFile": str(saved / "kept.png"), "imageFiles[]": [str(saved / "listed.jpg")]},
+        "refresh": {"interval": 60}
+    }])
+    app_utils.remove_unused_uploads(PlaylistManager([playlist]))
+
+    assert sorted(os.listdir(saved)) == [".gitignore", "kept.png", "listed.jpg", "recent.png"]
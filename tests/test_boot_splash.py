@@ -0,0 +1,78 @@
+import json
+import threading
+
+from PIL import Image
+
+from display import boot_splash
+from display.framebuffer_cache import framebuffer_hash, get_settings_key
+from utils import app_utils
+from utils.fingerprint import compute_fingerprint
+
+class FakeDisplay:
+    def __init__(self):
+        self.frames = []
+
+    def get_palette(self):
+        return [(0, 0, 0), (255, 255, 255)]
+
+    def show_framebuffer(self, framebuffer, regions):
+        self.frames.append((framebuffer, regions))
+
+class FakePanelConfig:
+    panel_name = None
+
+    def __init__(self, current_image_file):
+        self.current_image_file = current_image_file
+
+    def get_config(self, key, default=None):
+        return default
+
+    def get_resolution(self):
+        return (16, 8)
+
+class FakePanel:
+    def __init__(self):
+        self.name = "default"
+        self.lock = threading.Lock()
+        self.last_framebuffer_hash = None
+        self.last_fingerprint = None
+        self.partial_count = 3
+
+def test_cached_splash_is_shown_and_handed_to_the_panel(tmp_path, monkeypatch):
+    monkeypatch.setattr(app_utils, "get_cache_dir", lambda name: str(tmp_path / name))
+    display = FakeDisplay()
+    panel_config = FakePanelConfig(str(tmp_path / "current_image.png"))
+
+    # a splash cached on an earlier boot
+    image = Image.new("RGB", (16, 8), "white")
+    cache_dir = tmp_path / "splash"
+    cache_dir.mkdir()
+    cache_path = cache_dir / f"default-v{boot_splash.SPLASH_VERSION}-{get_settings_key(panel_config, display)}"
+    image.save(f"{cache_path}.png")
+    with open(f"{cache_path}.bin", "wb") as f:
+        f.write(b"\x0f" * 16)
+    with open(f"{cache_path}.json", "w") as f:
+        json.dump(compute_fingerprint(image).to_dict(), f)
+
+    splash = boot_splash.BootSplash()
+    splash._show_splash("default", panel_config, display)
+    assert display.frames == [(b"\x0f" * 16, None)]
+    assert (tmp_path / "current_image.png").is_file()
+
+    panel = FakePanel()
+    manager = type("DisplayManager", (), {"panels": [panel]})()
+    assert splash.join(manager) == ["default"]
+    assert panel.last_framebuffer_hash == framebuffer_hash(b"\x0f" * 16)
+    assert panel.last_fingerprint.digest == compute_fingerprint(image).digest
+    assert panel.partial_count == 0
+
+def test_start_shows_the_splash_without_the_startup_flag(tmp_path, monkeypatch):
+    started = []
+    monkeypatch.setattr(boot_splash.BootSplash, "start", lambda self: started.append(self.details) or self)
+    config_file = tmp_path / "device.json"
+
+    config_file.write_text(json.dumps({"startup": False}))
+    assert boot_splash.start(str(config_file)).details is False
+    config_file.write_text(json.dumps({"startup": True}))
+    assert boot_splash.start(str(config_file)).details is True
+    assert started == [False, True]
@@ -0,0 +1,254 @@
+import base64
+import json
+import os
+import threading
+import time
+from io import BytesIO
+
+import pytest
+from PIL import Image
+
+from utils import image_utils
+from utils.browser_pool import BrowserPool, DevToolsConnection, DevToolsError, DevToolsTimeout, PipeTransport
+from utils.render_watchdog import RenderLimits, RenderResult
+
+def make_png(size=(8, 6), color="red"):
+    output = BytesIO()
+    Image.new("RGB", size, color).save(output, format="PNG")
+    return output.getvalue()
+
+class FakeBrowser:
+    """
+    Answers DevTools commands over a pair of pipes, like Chromium's --remote-debugging-pipe.
+
+    Args:
+        die_on (str, optional): Closes the pipes instead of answering this command, as a crash would.
+        hang_on (str, optional): Never answers this command, as a hung page would.
+        never_loads (bool): Navigates without ever firing the load event, as a page stuck on a request would.
+        delay (float): Seconds to wait before answering each command, as a slow device would.
+    """
+
+    def __init__(self, die_on=None, hang_on=None, color="red", never_loads=False, delay=0):
+        to_browser_read, to_browser_write = os.pipe()
+        from_browser_read, from_browser_write = os.pipe()
+        self.transport = PipeTransport(from_browser_read, to_browser_write)
+        self.reader = os.fdopen(to_browser_read, "rb", buffering=0)
+        self.writer = os.fdopen(from_browser_write, "wb", buffering=0)
+
+        self.die_on = die_on
+        self.hang_on = hang_on
+        self.color = color
+        self.never_loads = never_loads
+        self.delay = delay
+        self.commands = []
+        self.targets = 0
+        self.exited = threading.Event()
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def connect(self):
+        return DevToolsConnection(self.transport)
+
+    def _serve(self):
+        buffer = b""
+        while True:
+            chunk = self.reader.read(65536)
+            if not chunk:
+                break
+            buffer += chunk
+            while b"\0" in buffer:
+                raw, buffer = buffer.split(b"\0", 1)
+                if not self._handle(json.loads(raw)):
+                    self._exit()
+                    return
+        self._exit()
+
+    def _handle(self, message):
+        method = message["method"]
+        self.commands.append(method)
+        if method == self.die_on:
+            return False
+        if method == self.hang_on:
+            return True
+        time.sleep(self.delay)
+
+        result = {}
+        if method == "Target.createTarget":
+            self.targets += 1
+            result = {"targetId": f"target-{self.targets}"}
+        elif method == "Target.attachToTarget":
+            result = {"sessionId": f"session-{message['params']['targetId']}"}
+        elif method == "Page.captureScreenshot":
+            clip = message["params"]["clip"]
+            png = make_png((clip["width"], clip["height"]), self.color)
+            result = {"data": base64.b64encode(png).decode("ascii")}
+
+        self._send({"id": message["id"], "result": result})
+        if method == "Page.navigate" and not self.never_loads:
+            self._send({"method": "Page.loadEventFired", "params": {}, "sessionId": message.get("sessionId")})
+        return True
+
+    def _send(self, message):
+        self.writer.write(json.dumps(message).encode("utf-8") + b"\0")
+
+    def _exit(self):
+        for stream in (self.writer, self.reader):
+            try:
+                stream.close()
+            except OSError:
+                pass
+        self.exited.set()
+
+def make_pool(*browsers):
+    launched = []
+    pending = list(browsers)
+
+    def connect():
+        browser = pending.pop(0)
+        launched.append(browser)
+        return browser.connect()
+
+    return BrowserPool(connection_factory=connect), launched
+
+def test_connection_round_trip():
+    browser = FakeBrowser()
+    connection = browser.connect()
+    assert connection.send("Target.createTarget", {"url": "about:blank"}, timeout=5) == {"targetId": "target-1"}
+
+    connection.close()
+    assert browser.exited.wait(5)
+
+def test_screenshot_round_trip_reuses_the_page():
+    browser = FakeBrowser()
+    pool, launched = make_pool(browser)
+
+    for _ in range(2):
+        image = Image.open(BytesIO(pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000)))
+        assert image.size == (8, 6)
+        assert image.getpixel((0, 0)) == (255, 0, 0)
+
+    assert len(launched) == 1
+    assert browser.targets == 1
+    assert browser.commands.count("Page.navigate") == 2
+    pool.close()
+
+def test_browser_dying_mid_render_restarts_it():
+    crashing = FakeBrowser(die_on="Page.navigate")
+    healthy = FakeBrowser(color="blue")
+    pool, launched = make_pool(crashing, healthy)
+
+    image = Image.open(BytesIO(pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000)))
+    assert image.getpixel((0, 0)) == (0, 0, 255)
+    assert launched == [crashing, healthy]
+    pool.close()
+
+def test_falls_back_to_a_one_off_browser(monkeypatch):
+    pool, launched = make_pool(FakeBrowser(die_on="Page.navigate"), FakeBrowser(die_on="Page.navigate"))
+    with pytest.raises(DevToolsError):
+        pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000)
+    assert len(launched) == 2
+
+    # the restarted browser dies as well, so take_screenshot launches chromium on its own
+    pool, launched = make_pool(FakeBrowser(die_on="Page.navigate"), FakeBrowser(die_on="Page.navigate"))
+    commands = []
+
+    def run_supervised(command, label="screenshot", limits=None):
+        commands.append(command)
+        path = next(argument for argument in command if argument.startswith("--screenshot=")).partition("=")[2]
+        with open(path, "wb") as f:
+            f.write(make_png(color="green"))
+        return RenderResult(0, b"", b"", 0.1, "ok")
+
+    monkeypatch.setattr(image_utils, "get_chrome_command", lambda is_local_dev=False: "chromium-headless-shell")
+    monkeypatch.setattr(image_utils, "get_browser_pool", lambda chrome_cmd: pool)
+    monkeypatch.setattr(image_utils, "run_supervised", run_supervised)
+
+    image = image_utils.take_screenshot("file:///page.html", (8, 6), timeout_ms=5000)
+    assert image.getpixel((0, 0)) == (0, 128, 0)
+    assert len(launched) == 2
+    assert len(commands) == 1 and "--headless" in commands[0]
+
+def test_reuse_after_timeout():
+    hung = FakeBrowser(hang_on="Page.captureScreenshot")
+    healthy = FakeBrowser()
+    pool, launched = make_pool(hung, healthy)
+
+    with pytest.raises(DevToolsTimeout):
+        pool.screenshot("file:///page.html", (8, 6), timeout_ms=200)
+    # the hung browser is shut down rather than left pinning the CPU
+    assert hung.exited.wait(5)
+
+    image = Image.open(BytesIO(pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000)))
+    assert image.size == (8, 6)
+    assert launched == [hung, healthy]
+    pool.close()
+
+def test_browser_over_cpu_budget_is_relaunched_between_renders(monkeypatch):
+    from utils import browser_pool
+
+    first, second = FakeBrowser(), FakeBrowser(color="blue")
+    pool, launched = make_pool(first, second)
+    pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000)
+
+    # a launched browser has a process, the fake one stands in for it
+    monkeypatch.setattr(pool, "process", type("Process", (), {"pid": 1, "poll": lambda self: None, "wait": lambda self: 0})())
+    monkeypatch.setattr(browser_pool, "process_tree_cpu_seconds", lambda pid: 1000.0)
+    monkeypatch.setattr(browser_pool.os, "killpg", lambda pid, sig: None)
+
+    image = Image.open(BytesIO(pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000)))
+    assert image.getpixel((0, 0)) == (0, 0, 255)
+    assert launched == [first, second]
+    assert first.exited.wait(5)
+    pool.close()
+
+def test_page_still_loading_is_captured_at_the_load_timeout():
+    browser = FakeBrowser(never_loads=True)
+    pool, launched = make_pool(browser)
+
+    start = time.monotonic()
+    image = Image.open(BytesIO(pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000, load_timeout_ms=200)))
+    assert image.size == (8, 6)
+    assert time.monotonic() - start < 2
+    assert "Page.stopLoading" in browser.commands
+    assert "Runtime.evaluate" not in browser.commands
+
+    # the stopped page is closed rather than reused
+    pool.screenshot("file:///page.html", (8, 6), timeout_ms=5000, load_timeout_ms=200)
+    assert browser.targets == 2
+    assert "Target.closeTarget" in browser.commands
+    assert launched == [browser]
+    pool.close()
+
+def test_page_that_never_loads_times_out_without_a_load_timeout():
+    pool, _ = make_pool(FakeBrowser(never_loads=True), FakeBrowser())
+    with pytest.raises(DevToolsTimeout):
+        pool.screenshot("file:///page.html", (8, 6), timeout_ms=200)
+    pool.close()
+
+def test_deadline_covers_the_whole_render():
+    # each command on its own fits the deadline, all of them together do not
+    browser = FakeBrowser(delay=0.15)
+    pool, _ = make_pool(browser, FakeBrowser())
+
+    start = time.monotonic()
+    with pytest.raises(DevToolsTimeout):
+        pool.screenshot("file:///page.html", (8, 6), timeout_ms=400)
+    assert time.monotonic() - start < 1
+    assert "Page.captureScreenshot" not in browser.commands
+    pool.close()
+
+def test_take_screenshot_passes_the_caller_timeout_as_load_timeout(monkeypatch):
+    calls = []
+
+    class Pool:
+        def screenshot(self, url, dimensions, timeout_ms=None, load_timeout_ms=None):
+            calls.append((timeout_ms, load_timeout_ms))
+            return make_png(dimensions)
+
+    monkeypatch.setattr(image_utils, "get_chrome_command", lambda is_local_dev=False: "chromium-headless-shell")
+    monkeypatch.setattr(image_utils, "get_browser_pool", lambda chrome_cmd: Pool())
+    monkeypatch.setattr(image_utils, "get_render_limits", lambda: RenderLimits(timeout_seconds=60))
+
+    image_utils.take_screenshot("https://example.com", (8, 6), timeout_ms=40000)
+    image_utils.take_screenshot("https://example.com", (8, 6), timeout_ms=90000)
+    image_utils.take_screenshot("https://example.com", (8, 6))
+    assert calls == [(60000, 40000), (60000, 48000), (60000, None)]
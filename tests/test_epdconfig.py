@@ -0,0 +1,94 @@
+import importlib
+import sys
+import time
+
+import pytest
+
+from display.waveshare_epd import fake_hardware
+
+EPDCONFIG = "display.waveshare_epd.epdconfig"
+
+@pytest.fixture(scope="module")
+def hardware():
+    saved = {name: sys.modules.get(name) for name in ("spidev", "gpiozero", EPDCONFIG)}
+    # epdconfig picks its implementation on import, so it is imported again with the fakes
+    sys.modules.pop(EPDCONFIG, None)
+    devices = fake_hardware.install(bufsiz=64)
+    epdconfig = importlib.import_module(EPDCONFIG)
+    epdconfig.module_init()
+    yield epdconfig, devices
+
+    fake_hardware.installed = False
+    for name, module in saved.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+
+@pytest.fixture
+def epdconfig(hardware):
+    epdconfig, _ = hardware
+    epdconfig.reset_transfer_stats()
+    return epdconfig
+
+def test_repeated_data_writes_do_not_toggle_dc(epdconfig, hardware):
+    dc_pin = hardware[1]["pins"][epdconfig.DC_PIN]
+    epdconfig.digital_write(epdconfig.DC_PIN, 0)
+    writes = dc_pin.writes
+    dc_writes = epdconfig.get_transfer_stats()["dc_writes"]
+
+    for _ in range(10):
+        epdconfig.digital_write(epdconfig.DC_PIN, 1)
+    epdconfig.digital_write(epdconfig.DC_PIN, 0)
+
+    assert dc_pin.writes == writes + 2
+    assert dc_pin.value == 0
+    assert epdconfig.get_transfer_stats()["dc_writes"] == dc_writes + 2
+
+def test_transfer_stats(epdconfig):
+    epdconfig.spi_writebyte([0x10])
+    epdconfig.spi_writebyte2(bytearray(100))
+
+    stats = epdconfig.get_transfer_stats()
+    assert stats["bytes"] == 101
+    assert stats["transfers"] == 2
+
+    epdconfig.reset_transfer_stats()
+    assert epdconfig.get_transfer_stats()["bytes"] == 0
+
+def test_buffer_larger_than_bufsiz_is_sent_intact(epdconfig, hardware):
+    spi = hardware[1]["spi"][-1]
+    data = bytes(range(256)) * 2
+
+    epdconfig.spi_writebyte2(data)
+
+    assert spi.get_data().endswith(data)
+    assert all(len(write) <= spi.bufsiz for write in spi.writes)
+
+def test_wait_for_level_times_out(epdconfig, hardware):
+    busy_pin = hardware[1]["pins"][epdconfig.BUSY_PIN]
+    busy_pin.set(1)
+
+    waited = epdconfig.wait_for_level(epdconfig.BUSY_PIN, 0, timeout_ms=50)
+
+    assert 0.04 <= waited < 1
+    stats = epdconfig.get_transfer_stats()
+    assert stats["busy_waits"] == 1
+    assert stats["busy_timeouts"] == 1
+
+def test_wait_for_level_returns_on_edge(epdconfig, hardware):
+    busy_pin = hardware[1]["pins"][epdconfig.BUSY_PIN]
+    busy_pin.set(1)
+    busy_pin.set(0, after=0.05)
+
+    start = time.perf_counter()
+    epdconfig.wait_for_level(epdconfig.BUSY_PIN, 0, timeout_ms=5000)
+
+    assert time.perf_counter() - start < 2
+    stats = epdconfig.get_transfer_stats()
+    assert stats["busy_waits"] == 1
+    assert stats["busy_timeouts"] == 0
+
+def test_wait_for_level_only_waits_on_busy(epdconfig):
+    with pytest.raises(ValueError):
+        epdconfig.wait_for_level(epdconfig.DC_PIN, 1)
@@ -0,0 +1,38 @@
+from PIL import Image, ImageDraw
+
+from model import RefreshInfo
+from utils.fingerprint import ImageFingerprint, compute_fingerprint
+
+def test_changed_tiles_of_an_unaligned_image():
+    image = Image.new("RGB", (150, 100), "white")
+    changed = image.copy()
+    # the last, narrower column and band
+    ImageDraw.Draw(changed).point((149, 99), fill="black")
+
+    assert compute_fingerprint(changed).changed_tiles(compute_fingerprint(image)) == [(128, 64, 150, 100)]
+    assert compute_fingerprint(image).digest == compute_fingerprint(image.copy()).digest
+
+def test_one_bit_images_hash_the_packed_rows():
+    image = Image.new("1", (70, 10), 1)
+    changed = image.copy()
+    changed.putpixel((69, 0), 0)
+
+    assert compute_fingerprint(changed).changed_tiles(compute_fingerprint(image)) == [(64, 0, 70, 10)]
+
+def test_palette_is_part_of_the_fingerprint():
+    image = Image.new("P", (64, 64), 1)
+    image.putpalette([0, 0, 0, 255, 255, 255])
+    recolored = image.copy()
+    recolored.putpalette([0, 0, 0, 255, 0, 0])
+
+    assert compute_fingerprint(image).digest != compute_fingerprint(recolored).digest
+
+def test_fingerprint_round_trips_through_a_dict():
+    fingerprint = compute_fingerprint(Image.new("L", (130, 70), 128))
+    restored = ImageFingerprint.from_dict(fingerprint.to_dict())
+    assert restored.changed_tiles(fingerprint) == []
+
+def test_tile_hashes_are_not_stored_in_the_refresh_info():
+    refresh_info = RefreshInfo.from_dict({"refresh_time": None, "image_hash": "abc", "refresh_type": "Playlist",
+                                          "plugin_id": "clock", "tile_hashes": ["00000000"] * 475})
+    assert "tile_hashes" not in refresh_info.to_dict()
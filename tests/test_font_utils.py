@@ -0,0 +1,34 @@
+import os
+
+from utils import font_utils
+
+def test_characters_include_script_string_literals():
+    html = """<p>Now</p>
+    <script>const labels = ["6 PM", '7 PM']; const unit = `°F`; const max = Math.max(1, 2);</script>"""
+
+    characters = font_utils.get_used_characters(html)
+
+    assert {"P", "M", "°", "F"} <= characters
+    # Chart.js formats numbers the page never spells out
+    assert set("0123456789.:-%") <= characters
+    # identifiers outside literals are not text
+    assert "x" not in characters
+
+def test_prune_spares_subsets_in_use(tmp_path):
+    paths = []
+    for index in range(3):
+        path = tmp_path / f"Font-{index}.ttf"
+        path.write_bytes(b"")
+        os.utime(path, (1000 + index, 1000))
+        paths.append(str(path))
+
+    # the oldest subset is still referenced by a page being rendered
+    font_utils._hold_subset(paths[0])
+    try:
+        font_utils.prune_subsets(str(tmp_path), keep=1)
+        assert sorted(os.listdir(tmp_path)) == ["Font-0.ttf", "Font-2.ttf"]
+    finally:
+        font_utils.release_font_faces([{"url": paths[0]}])
+
+    font_utils.prune_subsets(str(tmp_path), keep=1)
+    assert os.listdir(tmp_path) == ["Font-2.ttf"]
@@ -0,0 +1,53 @@
+import json
+import os
+
+from PIL import Image
+
+from utils.image_store import ImageStore, INDEX_FILE
+
+def blob_files(root):
+    return sorted(filename for _, _, filenames in os.walk(os.path.join(root, "blobs")) for filename in filenames)
+
+def test_shared_blob_is_removed_with_its_last_entry(tmp_path):
+    store = ImageStore(str(tmp_path))
+    red = Image.new("RGB", (8, 8), "red")
+    store.put("a", red)
+    store.put("b", red)
+    assert len(blob_files(tmp_path)) == 1
+
+    store.remove("a")
+    assert len(blob_files(tmp_path)) == 1
+    store.remove("b")
+    assert blob_files(tmp_path) == []
+
+def test_replaced_image_releases_its_blob(tmp_path):
+    store = ImageStore(str(tmp_path))
+    store.put("a", Image.new("RGB", (8, 8), "red"))
+    store.put("a", Image.new("RGB", (8, 8), "blue"))
+    store.put("a", Image.new("RGB", (8, 8), "blue"))
+
+    assert len(blob_files(tmp_path)) == 1
+    assert list(store.blobs.values())[0]["refs"] == 1
+
+def test_eviction_uses_the_tracked_sizes(tmp_path, monkeypatch):
+    store = ImageStore(str(tmp_path))
+    for index, color in enumerate(("red", "green", "blue")):
+        store.put(str(index), Image.new("RGB", (8, 8), color))
+    store.max_bytes = sum(blob["size"] for blob in store.blobs.values()) - 1
+
+    # the blobs are never listed from disk
+    monkeypatch.setattr(os, "walk", None)
+    store.put("3", Image.new("RGB", (8, 8), "white"))
+
+    assert sorted(store.index) == ["2", "3"]
+    assert len(store.blobs) == 2
+
+def test_reads_index_without_blobs(tmp_path):
+    store = ImageStore(str(tmp_path))
+    store.put("a", Image.new("RGB", (8, 8), "red"))
+    store.put("b", Image.new("RGB", (8, 8), "red"))
+    with open(tmp_path / INDEX_FILE, "w") as f:
+        json.dump(store.index, f)
+
+    reread = ImageStore(str(tmp_path))
+    assert reread.blobs == store.blobs
@@ -0,0 +1,47 @@
+import pytest
+from PIL import Image
+
+from utils.image_utils import open_image
+
+def save(image, tmp_path, name, **params):
+    path = tmp_path / name
+    image.save(path, **params)
+    return str(path)
+
+def make_palette_image(size=(2000, 1500)):
+    image = Image.new("P", size, 0)
+    image.putpalette([255, 0, 0, 0, 0, 255] + [0] * 762)
+    image.paste(1, (0, 0, size[0] // 2, size[1]))
+    return image
+
+@pytest.mark.parametrize("name", ["palette.png", "palette.gif"])
+def test_open_large_palette_image(tmp_path, name):
+    path = save(make_palette_image(), tmp_path, name)
+
+    image = open_image(path, (400, 300))
+    assert image.size == (400, 300)
+    assert image.mode == "RGB"
+    assert image.getpixel((10, 10)) == (0, 0, 255)
+    assert image.getpixel((390, 10)) == (255, 0, 0)
+
+def test_open_large_palette_png_with_transparency(tmp_path):
+    path = save(make_palette_image(), tmp_path, "transparent.png", transparency=0)
+
+    image = open_image(path, (400, 300))
+    assert image.size == (400, 300)
+    assert image.mode == "RGBA"
+    assert image.getpixel((10, 10)) == (0, 0, 255, 255)
+    assert image.getpixel((390, 10))[3] == 0
+
+@pytest.mark.parametrize("mode, expected_mode", [("1", "L"), ("I;16", "I")])
+def test_open_large_non_reducible_image(tmp_path, mode, expected_mode):
+    path = save(Image.new(mode, (2000, 1500), 1), tmp_path, "image.png")
+
+    image = open_image(path, (400, 300))
+    assert image.size == (400, 300)
+    assert image.mode == expected_mode
+
+def test_small_palette_image_keeps_its_mode(tmp_path):
+    path = save(make_palette_image((300, 200)), tmp_path, "small.png")
+
+    assert open_image(path, (400, 300)).mode == "P"
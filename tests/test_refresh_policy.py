@@ -0,0 +1,26 @@
+from display.refresh_policy import RefreshPolicy, INIT_FULL, INIT_FAST, INIT_PARTIAL, POWER_OFF
+
+def test_panel_stays_awake_between_partial_refreshes():
+    policy = RefreshPolicy()
+
+    assert policy.should_sleep(INIT_FULL)
+    assert policy.should_sleep(INIT_FAST)
+    assert not policy.should_sleep(INIT_PARTIAL)
+    assert not RefreshPolicy(sleep=False).should_sleep(INIT_FULL)
+
+def test_sleep_loses_the_partial_base():
+    policy = RefreshPolicy()
+    assert not policy.base_held
+
+    policy.record_init(INIT_FULL)
+    policy.record_update(INIT_FULL, cleared=True)
+    policy.record_base()
+    assert policy.base_held
+
+    policy.record_sleep()
+    assert policy.power_state == POWER_OFF
+    assert not policy.base_held
+
+    # waking alone does not bring the base back
+    policy.record_init(INIT_PARTIAL)
+    assert not policy.base_held
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from model import Playlist, PlaylistManager, RefreshInfo
+from refresh_task import RefreshTask
+
+class FakePanelConfig:
+    def __init__(self, name, playlist=None):
+        self.panel_name = name
+        self.playlist = playlist
+
+    def get_config(self, key, default=None):
+        return self.playlist if key == "playlist" else default
+
+    def get_refresh_info(self):
+        return RefreshInfo("Playlist", "clock", None, None)
+
+def make_playlist(name, count=3):
+    plugins = [{"plugin_id": "clock", "name": f"{name} {index}", "plugin_settings": {}, "refresh": {}} for index in range(count)]
+    return Playlist(name, "00:00", "24:00", plugins)
+
+def test_panels_share_a_playlist_step_per_refresh_check():
+    playlist = make_playlist("Default")
+    manager = PlaylistManager([playlist])
+    task = RefreshTask.__new__(RefreshTask)
+    panels = [FakePanelConfig("left"), FakePanelConfig("middle"), FakePanelConfig("right")]
+    now = datetime.now(timezone.utc)
+
+    shown = []
+    for _ in range(3):
+        next_plugins = {}
+        shown.append([task._determine_next_plugin(manager, panel, now, next_plugins)[1].name for panel in panels])
+
+    assert shown == [["Default 0"] * 3, ["Default 1"] * 3, ["Default 2"] * 3]
+
+def test_bound_panel_keeps_its_own_playlist():
+    shared, bound = make_playlist("Default"), make_playlist("Photos", count=2)
+    manager = PlaylistManager([shared, bound])
+    task = RefreshTask.__new__(RefreshTask)
+    panels = [FakePanelConfig("left"), FakePanelConfig("right", playlist="Photos")]
+    now = datetime.now(timezone.utc)
+
+    shown = []
+    for _ in range(2):
+        next_plugins = {}
+        shown.append([task._determine_next_plugin(manager, panel, now, next_plugins)[1].name for panel in panels])
+
+    assert shown == [["Default 0", "Photos 0"], ["Default 1", "Photos 1"]]
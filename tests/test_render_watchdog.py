@@ -0,0 +1,29 @@
+import subprocess
+
+from utils.render_watchdog import RenderLimits, limited_command, process_tree_cpu_seconds, run_supervised
+
+def test_limited_command_applies_limits_before_exec():
+    limits = RenderLimits(cpu_seconds=42, memory_mb=2048)
+    output = subprocess.run(limited_command(["bash", "-c", "ulimit -S -t; ulimit -H -t; ulimit -v"], limits),
+                            capture_output=True, text=True, check=True).stdout.split()
+    assert output == ["42", "47", str(2048 * 1024)]
+
+def test_limited_command_without_limits_is_unchanged():
+    assert limited_command(["chromium"], RenderLimits(cpu_seconds=None)) == ["chromium"]
+
+def test_run_supervised_kills_on_deadline():
+    result = run_supervised(["sleep", "10"], label="test", limits=RenderLimits(timeout_seconds=0.2))
+    assert result.outcome == "timeout"
+    assert result.duration < 5
+
+def test_process_tree_cpu_seconds_counts_the_session():
+    # a forked child burns the CPU and exits, so it is only counted through its parent
+    script = "(for ((i = 0; i < 200000; i++)); do :; done); echo done; sleep 5"
+    process = subprocess.Popen(["bash", "-c", script], stdout=subprocess.PIPE, start_new_session=True)
+    try:
+        assert process.stdout.readline() == b"done\n"
+        used = process_tree_cpu_seconds(process.pid)
+        assert used is not None and used >= 0.1
+    finally:
+        process.kill()
+        process.wait()
@@ -0,0 +1,25 @@
+import os
+import subprocess
+import sys
+
+from utils.scratch import ScratchStore
+
+def test_enforce_limit_never_removes_pinned_files(tmp_path):
+    store = ScratchStore(str(tmp_path), max_bytes=100)
+    current_image = store.pinned_path("current_image.png")
+    with open(current_image, "wb") as f:
+        f.write(bytes(80))
+    os.utime(current_image, (0, 0))
+
+    store.save_bytes(bytes(80), "screenshot.png")
+    store.save_bytes(bytes(80), "frame.png")
+
+    assert sorted(os.listdir(tmp_path)) == ["current_image.png", "frame.png"]
+
+def test_importing_config_creates_no_scratch_dir(tmp_path):
+    # a fresh interpreter, the app modules only run their module level code once
+    env = {**os.environ, "RUNTIME_DIRECTORY": str(tmp_path)}
+    src_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    subprocess.run([sys.executable, "-c", "import config"], cwd=src_dir, env=env, check=True)
+
+    assert os.listdir(tmp_path) == []